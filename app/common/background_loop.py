@@ -0,0 +1,45 @@
+import asyncio
+import concurrent.futures
+import logging
+import threading
+from typing import Any, Coroutine, TypeVar
+
+from app.common.singleton import Singleton
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class BackgroundEventLoop(metaclass=Singleton):
+    """
+    A single asyncio event loop running in a daemon thread.
+    The pipelines run in worker threads and use this loop to fan out I/O bound work, e.g. LLM
+    and database calls, as coroutines. Async clients bound to this loop keep their connection
+    pools across requests, as the loop lives as long as the process.
+    """
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(
+            target=self._run_loop, name="background-event-loop", daemon=True
+        )
+        self.thread.start()
+        logger.info("Background event loop started")
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def submit(self, coroutine: Coroutine[Any, Any, T]) -> concurrent.futures.Future[T]:
+        """Schedule the coroutine on the loop and return a future for its result"""
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+
+    def run(self, coroutine: Coroutine[Any, Any, T]) -> T:
+        """Run the coroutine on the loop and block the calling thread until it is done"""
+        if threading.current_thread() is self.thread:
+            coroutine.close()
+            raise RuntimeError(
+                "BackgroundEventLoop.run must not be called from the loop itself, await instead"
+            )
+        return self.submit(coroutine).result()
@@ -43,3 +43,15 @@ class PipelineNotFoundException(HTTPException):
                 "errorMessage": "Pipeline not found",
             },
         )
+
+
+class JobQueueFullException(HTTPException):
+    def __init__(self, retry_after: int):
+        super().__init__(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail={
+                "type": "queue_full",
+                "errorMessage": "Too many pending jobs, please try again later",
+            },
+            headers={"Retry-After": str(retry_after)},
+        )
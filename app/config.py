@@ -1,6 +1,8 @@
 import os
 from pathlib import Path
-from pydantic import BaseModel
+from typing import Literal, Optional
+
+from pydantic import BaseModel, Field
 import yaml
 
 
@@ -14,10 +16,216 @@ class WeaviateSettings(BaseModel):
     grpc_port: int
 
 
+class SchedulerSettings(BaseModel):
+    # Number of worker threads per feature if not configured explicitly in workers
+    default_workers: int = 4
+    # Number of jobs per feature that may wait for a free worker before requests are rejected
+    queue_size: int = 32
+    # Worker threads per feature, e.g. {"lecture_ingestion": 2}
+    workers: dict[str, int] = Field(default_factory=dict)
+    # Seconds a client is asked to wait before retrying a rejected request
+    retry_after: int = 10
+    # Maximum number of jobs running at the same time across all features
+    max_concurrent_jobs: int = 16
+    # Job slots only usable by the given priority or higher, e.g. {"interactive": 8}
+    reserved_workers: dict[str, int] = Field(default_factory=dict)
+
+
+class RenderSettings(BaseModel):
+    # Largest side and short side limit of images the vision model processes, larger images are scaled down
+    max_image_size: int = 2048
+    max_short_side: int = 768
+    # Tile size and token costs used by the vision model to bill high detail images
+    tile_size: int = 512
+    tokens_per_tile: int = 170
+    base_tokens: int = 85
+    # Largest side of low detail images
+    low_detail_size: int = 512
+    # Share of the page that images must cover for the page to be sent in high detail
+    high_detail_min_image_coverage: float = 0.2
+    # Upper bound of the render scale, 1 is 72 dpi
+    max_scale: float = 5
+    jpeg_quality: int = 85
+
+
+class IngestionSettings(BaseModel):
+    # Number of lecture pages that are rendered and interpreted at the same time
+    page_parallelism: int = 4
+    # Path of the SQLite database caching slide interpretations, it is disabled if not set
+    interpretation_cache_path: Optional[str] = None
+    # Number of slide interpretations kept in the cache, the oldest ones are evicted first
+    interpretation_cache_max_entries: int = 100000
+    render: RenderSettings = Field(default_factory=RenderSettings)
+
+
+class RequestLoggingSettings(BaseModel):
+    # Share of successful requests whose metadata is logged, errors are always logged
+    sample_rate: float = 1.0
+    # Maximum number of bytes of a request or response body that is logged
+    max_payload_bytes: int = 2048
+    # Path prefixes for which truncated payloads are logged at DEBUG level
+    payload_routes: list[str] = Field(default_factory=list)
+
+
+class StatusUpdateSettings(BaseModel):
+    # Number of threads sending status updates to Artemis
+    workers: int = 8
+    # Number of keep-alive connections per Artemis base URL
+    pool_size: int = 10
+    # Retries of a failed status update, with exponential backoff
+    max_retries: int = 3
+    backoff_factor: float = 0.5
+    # Seconds to wait for Artemis to answer a status update
+    timeout: float = 10
+    # Seconds during which in-progress updates of the same stage are merged, 0 disables it
+    coalesce_window: float = 0.25
+
+
+class EmbeddingCacheSettings(BaseModel):
+    enabled: bool = True
+    # Number of embeddings kept in memory
+    max_entries: int = 10000
+    # Path of the SQLite database of the persistent tier, it is disabled if not set
+    sqlite_path: Optional[str] = None
+    # Number of embeddings kept on disk
+    max_disk_entries: int = 1000000
+
+
+class PromptSettings(BaseModel):
+    # Reload prompt files when they change on disk, useful while developing prompts
+    hot_reload: bool = False
+
+
+class PipelinePoolSettings(BaseModel):
+    # Number of idle pipelines kept per pipeline class and variant
+    max_idle: int = 8
+
+
+class RetrievalCacheSettings(BaseModel):
+    enabled: bool = True
+    # Seconds a retrieval result is reused, 0 disables the cache
+    ttl: float = 300
+    max_entries: int = 1000
+    # Number of recent chat messages that are part of the cache key, the query rewrites use the last four
+    history_messages: int = 4
+
+
+class SemanticQueryCacheSettings(BaseModel):
+    # Disabled by default, as a hit returns the chunks retrieved for another, similar question
+    enabled: bool = False
+    # Cosine similarity to an earlier query of the course above which its results are reused
+    similarity_threshold: float = 0.92
+    # Seconds an earlier query is reused
+    ttl: float = 3600
+    # Number of earlier queries kept per retrieval context, i.e. course, recent chat history and parameters
+    max_entries_per_context: int = 500
+    # Number of earlier queries kept in total, the least recently used contexts are dropped first
+    max_entries: int = 20000
+
+
+class CourseMetadataSettings(BaseModel):
+    # Seconds the language and the indexed content of a course are cached, 0 disables the cache
+    ttl: float = 600
+    # Number of courses whose metadata is kept, the least recently used ones are dropped first
+    max_entries: int = 10000
+
+
+class FastPathSettings(BaseModel):
+    # Search short, self-contained queries as they are, without the rewrite and HyDE LLM calls
+    enabled: bool = False
+    # Maximum number of words of a query that is searched as it is
+    max_words: int = 8
+    # Words that refer to the chat history, queries containing them are rewritten
+    referential_words: list[str] = Field(
+        default_factory=lambda: [
+            "it",
+            "its",
+            "this",
+            "that",
+            "these",
+            "those",
+            "they",
+            "them",
+            "their",
+            "he",
+            "she",
+            "above",
+            "previous",
+            "same",
+            "again",
+            "es",
+            "das",
+            "dies",
+            "diese",
+            "dieser",
+            "dieses",
+            "davon",
+            "dazu",
+            "oben",
+            "vorherige",
+        ]
+    )
+    # Beginnings of queries that continue the previous question, e.g. "and what about"
+    continuation_prefixes: list[str] = Field(
+        default_factory=lambda: ["and ", "also ", "what about", "how about", "und "]
+    )
+
+
+class SpeculativeRetrievalSettings(BaseModel):
+    # Start the lecture and FAQ retrieval of the chat agents when the request arrives
+    enabled: bool = False
+    # Threads running speculative retrievals
+    workers: int = 8
+
+
+class RetrievalSettings(BaseModel):
+    # Search for the rewritten query and the hypothetical answer with one fused hybrid query
+    fused_search: bool = False
+    # Constant of the reciprocal rank fusion, higher values flatten the rank differences
+    rrf_k: int = 60
+    # Reranker of the lecture retrieval, "llm" asks an LLM to select the relevant paragraphs,
+    # "embedding" ranks them locally by the cosine similarity of their embeddings to the query
+    reranker: Literal["llm", "embedding"] = "llm"
+    # Reranker per pipeline, e.g. {"course_chat_pipeline": "embedding"}
+    pipeline_rerankers: dict[str, Literal["llm", "embedding"]] = Field(
+        default_factory=dict
+    )
+    # Maximum number and minimum cosine similarity of paragraphs the embedding reranker selects
+    embedding_reranker_top_k: int = 5
+    embedding_reranker_min_similarity: float = 0.0
+    cache: RetrievalCacheSettings = Field(default_factory=RetrievalCacheSettings)
+    semantic_cache: SemanticQueryCacheSettings = Field(
+        default_factory=SemanticQueryCacheSettings
+    )
+    course_metadata: CourseMetadataSettings = Field(
+        default_factory=CourseMetadataSettings
+    )
+    fast_path: FastPathSettings = Field(default_factory=FastPathSettings)
+    speculative: SpeculativeRetrievalSettings = Field(
+        default_factory=SpeculativeRetrievalSettings
+    )
+
+    def get_reranker(self, pipeline_id: str) -> str:
+        """Get the reranker mode configured for the pipeline with the given implementation id"""
+        return self.pipeline_rerankers.get(pipeline_id, self.reranker)
+
+
 class Settings(BaseModel):
     api_keys: list[APIKeyConfig]
     env_vars: dict[str, str]
     weaviate: WeaviateSettings
+    scheduler: SchedulerSettings = Field(default_factory=SchedulerSettings)
+    ingestion: IngestionSettings = Field(default_factory=IngestionSettings)
+    request_logging: RequestLoggingSettings = Field(
+        default_factory=RequestLoggingSettings
+    )
+    status_updates: StatusUpdateSettings = Field(default_factory=StatusUpdateSettings)
+    embedding_cache: EmbeddingCacheSettings = Field(
+        default_factory=EmbeddingCacheSettings
+    )
+    prompts: PromptSettings = Field(default_factory=PromptSettings)
+    pipeline_pool: PipelinePoolSettings = Field(default_factory=PipelinePoolSettings)
+    retrieval: RetrievalSettings = Field(default_factory=RetrievalSettings)
 
     @classmethod
     def get_settings(cls):
@@ -1,8 +1,10 @@
 from pydantic import BaseModel, Field, ConfigDict
-from typing import Optional
+from typing import Literal, Optional
 
 
 class ImageMessageContentDTO(BaseModel):
     base64: str = Field(..., alias="pdfFile")
     prompt: Optional[str] = None
+    # Detail level the vision model should process the image with, defaults to high
+    detail: Optional[Literal["low", "high", "auto"]] = None
     model_config = ConfigDict(populate_by_name=True)
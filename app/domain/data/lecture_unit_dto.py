@@ -1,3 +1,5 @@
+from typing import Optional
+
 from pydantic import BaseModel, Field
 
 
@@ -11,3 +13,5 @@ class LectureUnitDTO(BaseModel):
     course_id: int = Field(alias="courseId")
     course_name: str = Field(default="", alias="courseName")
     course_description: str = Field(default="", alias="courseDescription")
+    # Set when the PDF was streamed to a temporary file instead of being kept in pdf_file_base64
+    pdf_file_path: Optional[str] = Field(default=None, exclude=True)
@@ -0,0 +1,118 @@
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+from ..common import Singleton
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def interpretation_cache_key(
+    page_render: bytes, prompt_version: str, language: str
+) -> str:
+    """Key of a slide interpretation, identical renders of a page share the interpretation"""
+    key = hashlib.sha256(page_render)
+    key.update(f"\0{prompt_version}\0{language}".encode("utf-8"))
+    return key.hexdigest()
+
+
+class InterpretationCache(metaclass=Singleton):
+    """
+    Persistent cache of interpreted slides, i.e. the page text merged with the interpretation
+    of the rendered page. It is stored in SQLite and disabled if no path is configured.
+    The oldest interpretations are evicted once the cache holds more than the configured maximum.
+    """
+
+    def __init__(self):
+        path = settings.ingestion.interpretation_cache_path
+        self.enabled = path is not None
+        self.max_entries = settings.ingestion.interpretation_cache_max_entries
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        if not self.enabled:
+            return
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS interpretations "
+            "(key TEXT PRIMARY KEY, content TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+        self.connection.execute(
+            "CREATE INDEX IF NOT EXISTS interpretations_created_at "
+            "ON interpretations (created_at)"
+        )
+        self.connection.commit()
+        self.size = self.connection.execute(
+            "SELECT COUNT(*) FROM interpretations"
+        ).fetchone()[0]
+
+    def get(self, key: str) -> Optional[str]:
+        if not self.enabled:
+            return None
+        with self.lock:
+            try:
+                row = self.connection.execute(
+                    "SELECT content FROM interpretations WHERE key = ?", (key,)
+                ).fetchone()
+            except sqlite3.Error as e:
+                logger.warning(
+                    f"Error reading slide interpretation from the cache: {e}"
+                )
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return row[0]
+
+    def put(self, key: str, content: str):
+        if not self.enabled:
+            return
+        with self.lock:
+            try:
+                self._insert(key, content)
+            except sqlite3.Error as e:
+                logger.error(f"Error writing slide interpretation to the cache: {e}")
+                self._recount()
+
+    def _recount(self):
+        """Count the entries again after a failed write, which may have been partially applied"""
+        try:
+            self.connection.rollback()
+            self.size = self.connection.execute(
+                "SELECT COUNT(*) FROM interpretations"
+            ).fetchone()[0]
+        except sqlite3.Error as e:
+            logger.error(f"Error counting the cached slide interpretations: {e}")
+
+    def _insert(self, key: str, content: str):
+        # The key covers the render, prompt version and language, an existing row is equivalent
+        cursor = self.connection.execute(
+            "INSERT OR IGNORE INTO interpretations (key, content, created_at) VALUES (?, ?, ?)",
+            (key, content, time.time()),
+        )
+        self.size += cursor.rowcount
+        if self.size > self.max_entries:
+            # Evict a tenth of the cache at once, so eviction does not run on every insert
+            evict = self.size - self.max_entries + self.max_entries // 10
+            cursor = self.connection.execute(
+                "DELETE FROM interpretations WHERE key IN "
+                "(SELECT key FROM interpretations ORDER BY created_at LIMIT ?)",
+                (evict,),
+            )
+            self.size -= cursor.rowcount
+        self.connection.commit()
+
+    def get_stats(self) -> dict[str, int]:
+        """Get the hit and miss counters of the cache"""
+        with self.lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": self.size if self.enabled else 0,
+            }
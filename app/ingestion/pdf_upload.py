@@ -0,0 +1,175 @@
+import base64
+import os
+import tempfile
+from asyncio.log import logger
+from typing import Optional
+
+PDF_FIELD_NAME = b"pdfFile"
+# Number of bytes that are decoded and written at once
+DECODE_CHUNK_SIZE = 4 * 1024 * 1024
+
+
+class Base64FileWriter:
+    """
+    Decodes base64 data incrementally and writes the decoded bytes to a temporary file.
+    """
+
+    path: str
+
+    def __init__(self, suffix: str = ".pdf"):
+        fd, self.path = tempfile.mkstemp(suffix=suffix)
+        self._file = os.fdopen(fd, "wb")
+        self._remainder = b""
+        self.bytes_written = 0
+
+    def write(self, data: bytes):
+        data = self._remainder + data.translate(None, b" \t\r\n")
+        complete = len(data) - len(data) % 4
+        if complete:
+            decoded = base64.b64decode(data[:complete])
+            self._file.write(decoded)
+            self.bytes_written += len(decoded)
+        self._remainder = data[complete:]
+
+    def close(self):
+        if self._remainder:
+            raise ValueError("Invalid base64 data: incomplete final block")
+        self._file.close()
+
+    def discard(self):
+        self._file.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def decode_base64_to_file(data: str, suffix: str = ".pdf") -> str:
+    """
+    Decode a base64 string into a temporary file chunk by chunk, without holding
+    a second full copy of the file in memory.
+    """
+    writer = Base64FileWriter(suffix=suffix)
+    try:
+        for start in range(0, len(data), DECODE_CHUNK_SIZE):
+            end = start + DECODE_CHUNK_SIZE
+            writer.write(data[start:end].encode("ascii"))
+        writer.close()
+    except Exception as e:
+        logger.error(f"Failed to write to temporary file {writer.path}: {e}")
+        writer.discard()
+        raise
+    return writer.path
+
+
+class StreamingPdfUpload:
+    """
+    Scans a JSON request body chunk by chunk and diverts the base64 encoded value of the
+    "pdfFile" property directly into a temporary file. The rest of the JSON document is
+    kept in memory with an empty string in place of the PDF, so memory usage does not
+    depend on the size of the PDF.
+    """
+
+    def __init__(self):
+        self._json = bytearray()
+        self._writer: Optional[Base64FileWriter] = None
+        self._in_string = False
+        self._escape = False
+        self._string = bytearray()
+        self._last_string: Optional[bytes] = None
+        self._divert_next = False
+        self._diverting = False
+
+    @property
+    def pdf_file_path(self) -> Optional[str]:
+        """The path of the decoded PDF, or None if the body did not contain a PDF"""
+        if self._writer is None or self._writer.bytes_written == 0:
+            return None
+        return self._writer.path
+
+    def feed(self, chunk: bytes):
+        position = 0
+        while position < len(chunk):
+            if self._diverting:
+                position = self._feed_pdf(chunk, position)
+            else:
+                position = self._feed_json(chunk, position)
+
+    def _feed_pdf(self, chunk: bytes, position: int) -> int:
+        """Write base64 data to the file until the end of the JSON string"""
+        if self._escape:
+            # Base64 only contains "/" as a character that may be escaped in JSON
+            if chunk[position] == ord("/"):
+                self._writer.write(b"/")
+            self._escape = False
+            return position + 1
+        end = len(chunk)
+        quote = chunk.find(b'"', position)
+        backslash = chunk.find(b"\\", position)
+        for index in (quote, backslash):
+            if index != -1:
+                end = min(end, index)
+        self._writer.write(chunk[position:end])
+        if end == len(chunk):
+            return end
+        if end == backslash:
+            self._escape = True
+        else:
+            self._diverting = False
+            self._json += b'"'
+        return end + 1
+
+    def _feed_json(self, chunk: bytes, position: int) -> int:
+        """Copy JSON data into memory until the PDF string starts"""
+        while position < len(chunk):
+            byte = bytes((chunk[position],))
+            position += 1
+            if self._in_string:
+                self._json += byte
+                if self._escape:
+                    self._escape = False
+                elif byte == b"\\":
+                    self._escape = True
+                elif byte == b'"':
+                    self._in_string = False
+                    self._last_string = bytes(self._string)
+                else:
+                    if len(self._string) <= len(PDF_FIELD_NAME):
+                        self._string += byte
+                continue
+            if byte in b" \t\r\n":
+                self._json += byte
+                continue
+            if byte == b":":
+                self._divert_next = self._last_string == PDF_FIELD_NAME
+                self._last_string = None
+                self._json += byte
+                continue
+            self._last_string = None
+            self._json += byte
+            if byte == b'"':
+                if self._divert_next:
+                    self._divert_next = False
+                    self._writer = self._writer or Base64FileWriter()
+                    self._diverting = True
+                    return position
+                self._in_string = True
+                self._string = bytearray()
+            self._divert_next = False
+        return position
+
+    def finish(self) -> bytes:
+        """Finish the upload and return the JSON document without the PDF data"""
+        if self._diverting or self._in_string:
+            self.discard()
+            raise ValueError("Unexpected end of JSON body")
+        if self._writer is not None:
+            self._writer.close()
+            if self._writer.bytes_written == 0:
+                # An empty "pdfFile" is treated as no PDF, the empty file is not kept
+                self._writer.discard()
+                self._writer = None
+        return bytes(self._json)
+
+    def discard(self):
+        """Remove the temporary file, e.g. if the request is rejected"""
+        if self._writer is not None:
+            self._writer.discard()
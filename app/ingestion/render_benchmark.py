@@ -0,0 +1,82 @@
+"""
+Compare the previous fixed rendering of lecture pages with the adaptive render policy.
+
+Usage: python -m app.ingestion.render_benchmark <lecture.pdf> [<lecture.pdf> ...]
+
+For every page with images, the encoded size, the estimated vision tokens and the render
+time of both approaches are printed, followed by the totals.
+"""
+
+import base64
+import sys
+import time
+
+import fitz
+
+from app.config import settings
+from app.ingestion.render_policy import RenderPolicy, estimate_image_tokens
+
+# Rendering used before the render policy was introduced
+LEGACY_SCALE = 5
+
+
+def benchmark_page(page: fitz.Page, policy: RenderPolicy) -> tuple[dict, dict]:
+    config = policy.config
+    start = time.perf_counter()
+    pix = page.get_pixmap(matrix=fitz.Matrix(LEGACY_SCALE, LEGACY_SCALE))
+    legacy_bytes = len(base64.b64encode(pix.tobytes("jpg")))
+    legacy = {
+        "bytes": legacy_bytes,
+        "tokens": estimate_image_tokens(pix.width, pix.height, "high", config),
+        "seconds": time.perf_counter() - start,
+    }
+
+    start = time.perf_counter()
+    rendered = policy.render(page)
+    adaptive = {
+        "bytes": len(rendered.image_base64),
+        "tokens": estimate_image_tokens(
+            rendered.width, rendered.height, rendered.detail, config
+        ),
+        "seconds": time.perf_counter() - start,
+        "detail": rendered.detail,
+    }
+    return legacy, adaptive
+
+
+def main(paths: list[str]):
+    policy = RenderPolicy(settings.ingestion.render)
+    totals = {"legacy": [0, 0, 0.0], "adaptive": [0, 0, 0.0]}
+    print(
+        f"{'page':>28} | {'legacy bytes':>12} {'tokens':>7} {'ms':>7} | "
+        f"{'adaptive bytes':>14} {'tokens':>7} {'ms':>7} detail"
+    )
+    for path in paths:
+        doc = fitz.open(path)
+        for page in doc:
+            if not page.get_images(full=False):
+                continue
+            legacy, adaptive = benchmark_page(page, policy)
+            for name, result in (("legacy", legacy), ("adaptive", adaptive)):
+                totals[name][0] += result["bytes"]
+                totals[name][1] += result["tokens"]
+                totals[name][2] += result["seconds"]
+            print(
+                f"{path[-20:]:>20} p.{page.number + 1:<4} | "
+                f"{legacy['bytes']:>12} {legacy['tokens']:>7} {legacy['seconds'] * 1000:>7.1f} | "
+                f"{adaptive['bytes']:>14} {adaptive['tokens']:>7} {adaptive['seconds'] * 1000:>7.1f} "
+                f"{adaptive['detail']}"
+            )
+        doc.close()
+    legacy, adaptive = totals["legacy"], totals["adaptive"]
+    print(
+        f"{'total':>28} | {legacy[0]:>12} {legacy[1]:>7} {legacy[2] * 1000:>7.1f} | "
+        f"{adaptive[0]:>14} {adaptive[1]:>7} {adaptive[2] * 1000:>7.1f}"
+    )
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    main(sys.argv[1:])
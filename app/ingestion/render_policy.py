@@ -0,0 +1,93 @@
+import base64
+import math
+from typing import Literal
+
+import fitz
+from pydantic import BaseModel
+
+from ..config import RenderSettings
+
+
+class RenderedPage(BaseModel):
+    """A page rendered as JPEG for a vision model"""
+
+    image_base64: str
+    detail: Literal["low", "high"]
+    scale: float
+    width: int
+    height: int
+    num_bytes: int
+
+
+def estimate_image_tokens(
+    width: int, height: int, detail: str, config: RenderSettings
+) -> int:
+    """
+    Estimate the input tokens of an image for OpenAI vision models.
+    Low detail images have a fixed cost, high detail images are scaled to fit the
+    maximum image size and the short side limit and then billed per started tile.
+    """
+    if detail == "low":
+        return config.base_tokens
+    scale = min(
+        1.0,
+        config.max_image_size / max(width, height),
+        config.max_short_side / min(width, height),
+    )
+    tiles = math.ceil(width * scale / config.tile_size) * math.ceil(
+        height * scale / config.tile_size
+    )
+    return config.base_tokens + tiles * config.tokens_per_tile
+
+
+class RenderPolicy:
+    """
+    Chooses how a page is rendered for the image interpretation.
+    The resolution is chosen so that the image is not larger than what the model uses anyway,
+    and pages whose images only cover a small part of the page are sent in low detail.
+    """
+
+    def __init__(self, config: RenderSettings):
+        self.config = config
+
+    def choose_detail(self, page: fitz.Page) -> Literal["low", "high"]:
+        """Choose the detail level by the share of the page that is covered by images"""
+        page_area = page.rect.width * page.rect.height
+        if page_area <= 0:
+            return "high"
+        image_area = 0.0
+        for image in page.get_image_info():
+            bbox = fitz.Rect(image["bbox"]) & page.rect
+            if not bbox.is_empty:
+                image_area += bbox.width * bbox.height
+        coverage = min(1.0, image_area / page_area)
+        if coverage < self.config.high_detail_min_image_coverage:
+            return "low"
+        return "high"
+
+    def choose_scale(self, page: fitz.Page, detail: str) -> float:
+        """Choose the largest scale at which the model does not downscale the image again"""
+        long_side = max(page.rect.width, page.rect.height)
+        short_side = min(page.rect.width, page.rect.height)
+        if detail == "low":
+            scale = self.config.low_detail_size / long_side
+        else:
+            scale = min(
+                self.config.max_image_size / long_side,
+                self.config.max_short_side / short_side,
+            )
+        return min(scale, self.config.max_scale)
+
+    def render(self, page: fitz.Page) -> RenderedPage:
+        detail = self.choose_detail(page)
+        scale = self.choose_scale(page, detail)
+        pix = page.get_pixmap(matrix=fitz.Matrix(scale, scale))
+        img_bytes = pix.tobytes("jpg", jpg_quality=self.config.jpeg_quality)
+        return RenderedPage(
+            image_base64=base64.b64encode(img_bytes).decode("utf-8"),
+            detail=detail,
+            scale=scale,
+            width=pix.width,
+            height=pix.height,
+            num_bytes=len(img_bytes),
+        )
@@ -61,10 +61,10 @@ def calculate_capability_scores(
         # The normalization here is based on the position of the score in the sorted list to balance out
         # the different ranges of the capabilities
         sorted_scores = sorted(set(scores))
+        ranks = {score: rank for rank, score in enumerate(sorted_scores, start=1)}
         weight_modifier = capability_weights[requirement]
         normalized_scores = [
-            ((sorted_scores.index(score) + 1) / len(sorted_scores)) * weight_modifier
-            for score in scores
+            (ranks[score] / len(sorted_scores)) * weight_modifier for score in scores
         ]
         all_scores.append(normalized_scores)
 
@@ -45,3 +45,7 @@ class RequirementList:
         self.self_hosted = self_hosted
         self.image_recognition = image_recognition
         self.json_mode = json_mode
+
+    def key(self) -> tuple:
+        """Get a hashable representation of the requirements, e.g. for caching"""
+        return tuple(self.__dict__.items())
@@ -0,0 +1,184 @@
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from typing import Optional
+
+from ..common import Singleton
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def embedding_cache_key(model_id: str, text: str) -> bytes:
+    """Content-addressed key of an embedding, the same text embedded by the same model has the same key"""
+    return hashlib.sha256(f"{model_id}\0{text}".encode("utf-8")).digest()
+
+
+class SqliteEmbeddingStore:
+    """
+    Persistent tier of the embedding cache.
+    Vectors are stored as float32 blobs, the least recently used entries are evicted
+    once the store holds more than max_entries embeddings. Reads do not write to the database,
+    the last use of read entries is recorded with the next insert.
+    """
+
+    # Maximum number of read entries whose last use waits for the next insert
+    MAX_PENDING_USES = 10000
+
+    def __init__(self, path: str, max_entries: int):
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings "
+            "(key BLOB PRIMARY KEY, vector BLOB NOT NULL, last_used REAL NOT NULL)"
+        )
+        self.connection.execute(
+            "CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)"
+        )
+        self.connection.commit()
+        self.size = self.connection.execute(
+            "SELECT COUNT(*) FROM embeddings"
+        ).fetchone()[0]
+        self.pending_uses: dict[bytes, float] = {}
+
+    def get(self, key: bytes) -> Optional[array]:
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT vector FROM embeddings WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if (
+                key in self.pending_uses
+                or len(self.pending_uses) < self.MAX_PENDING_USES
+            ):
+                self.pending_uses[key] = time.time()
+        vector = array("f")
+        vector.frombytes(row[0])
+        return vector
+
+    def put_many(self, items: list[tuple[bytes, array]]):
+        now = time.time()
+        rows = [(key, vector.tobytes(), now) for key, vector in items]
+        with self.lock:
+            try:
+                self._insert(rows)
+            except sqlite3.Error:
+                # The size is counted again, as the failed insert may have been partially applied
+                self.connection.rollback()
+                self.size = self.connection.execute(
+                    "SELECT COUNT(*) FROM embeddings"
+                ).fetchone()[0]
+                raise
+
+    def _insert(self, rows: list[tuple[bytes, bytes, float]]):
+        if self.pending_uses:
+            # Recorded before the eviction below, so recently read entries are kept
+            self.connection.executemany(
+                "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                [(last_used, key) for key, last_used in self.pending_uses.items()],
+            )
+            self.pending_uses = {}
+        # Keys are content-addressed, an existing row already holds the same vector. The size is
+        # tracked from the inserted rows, so no insert has to count the table.
+        cursor = self.connection.executemany(
+            "INSERT OR IGNORE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)",
+            rows,
+        )
+        self.size += cursor.rowcount
+        if self.size > self.max_entries:
+            # Evict a tenth of the store at once, so eviction does not run on every insert
+            evict = self.size - self.max_entries + self.max_entries // 10
+            cursor = self.connection.execute(
+                "DELETE FROM embeddings WHERE key IN "
+                "(SELECT key FROM embeddings ORDER BY last_used LIMIT ?)",
+                (evict,),
+            )
+            self.size -= cursor.rowcount
+        self.connection.commit()
+
+
+class EmbeddingCache(metaclass=Singleton):
+    """
+    Cache for embeddings keyed by model id and a hash of the embedded text.
+    The first tier is an in-process LRU, the optional second tier a SQLite database on disk.
+    Both keep the vectors as float32 arrays, which take a fraction of the memory of float lists.
+    """
+
+    def __init__(self):
+        config = settings.embedding_cache
+        self.enabled = config.enabled
+        self.max_entries = config.max_entries
+        self.lock = threading.Lock()
+        self.entries: OrderedDict[bytes, array] = OrderedDict()
+        self.store = (
+            SqliteEmbeddingStore(config.sqlite_path, config.max_disk_entries)
+            if config.enabled and config.sqlite_path
+            else None
+        )
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def get_many(self, model_id: str, texts: list[str]) -> list[Optional[list[float]]]:
+        """Get the cached embeddings of the texts, None for every text that is not cached"""
+        results = []
+        for text in texts:
+            key = embedding_cache_key(model_id, text)
+            with self.lock:
+                embedding = self.entries.get(key)
+                if embedding is not None:
+                    self.entries.move_to_end(key)
+                    self.memory_hits += 1
+            if embedding is None and self.store is not None:
+                try:
+                    embedding = self.store.get(key)
+                except sqlite3.Error as e:
+                    logger.warning(f"Error reading embeddings from the disk cache: {e}")
+                if embedding is not None:
+                    self._put_in_memory(key, embedding)
+                    with self.lock:
+                        self.disk_hits += 1
+            if embedding is None:
+                with self.lock:
+                    self.misses += 1
+            results.append(embedding.tolist() if embedding is not None else None)
+        return results
+
+    def put_many(self, model_id: str, texts: list[str], embeddings: list[list[float]]):
+        """Add the embeddings of the texts to all cache tiers"""
+        items = [
+            (embedding_cache_key(model_id, text), array("f", embedding))
+            for text, embedding in zip(texts, embeddings)
+        ]
+        for key, embedding in items:
+            self._put_in_memory(key, embedding)
+        if self.store is not None:
+            try:
+                self.store.put_many(items)
+            except sqlite3.Error as e:
+                logger.error(f"Error writing embeddings to the disk cache: {e}")
+
+    def _put_in_memory(self, key: bytes, embedding: array):
+        with self.lock:
+            self.entries[key] = embedding
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def get_stats(self) -> dict[str, int]:
+        """Get the hit and miss counters and the size of the cache tiers"""
+        with self.lock:
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "memory_entries": len(self.entries),
+                "disk_entries": self.store.size if self.store is not None else 0,
+            }
@@ -1,3 +1,4 @@
+import asyncio
 from abc import ABCMeta, abstractmethod
 from typing import Sequence, Union, Dict, Any, Type, Callable
 
@@ -56,6 +57,17 @@ class ChatModel(LanguageModel, metaclass=ABCMeta):
             f"The LLM {self.__str__()} does not support chat completion"
         )
 
+    async def achat(
+        self,
+        messages: list[PyrisMessage],
+        arguments: CompletionArguments,
+        tools: Optional[
+            Sequence[Union[Dict[str, Any], Type[BaseModel], Callable, BaseTool]]
+        ],
+    ) -> PyrisMessage:
+        """Create a completion from the chat messages without blocking the event loop"""
+        return await asyncio.to_thread(self.chat, messages, arguments, tools)
+
 
 class EmbeddingModel(LanguageModel, metaclass=ABCMeta):
     """Abstract class for the llm embedding wrappers"""
@@ -71,6 +83,18 @@ class EmbeddingModel(LanguageModel, metaclass=ABCMeta):
             f"The LLM {self.__str__()} does not support embeddings"
         )
 
+    def embed_many(self, texts: list[str]) -> list[list[float]]:
+        """Create embeddings for multiple texts, in the same order as the texts"""
+        return [self.embed(text) for text in texts]
+
+    async def aembed(self, text: str) -> list[float]:
+        """Create an embedding from the text without blocking the event loop"""
+        return await asyncio.to_thread(self.embed, text)
+
+    async def aembed_many(self, texts: list[str]) -> list[list[float]]:
+        """Create embeddings for multiple texts without blocking the event loop"""
+        return await asyncio.to_thread(self.embed_many, texts)
+
 
 class ImageGenerationModel(LanguageModel, metaclass=ABCMeta):
     """Abstract class for the llm image generation wrappers"""
@@ -1,23 +1,27 @@
+import asyncio
 import json
 import logging
+import threading
 import time
 from datetime import datetime
 from typing import Literal, Any, Sequence, Union, Dict, Type, Callable, Optional
 
+import httpx
 from langchain_core.tools import BaseTool
 from langchain_core.utils.function_calling import convert_to_openai_tool
 from openai import (
+    AsyncOpenAI,
     OpenAI,
     APIError,
     APITimeoutError,
     RateLimitError,
     ContentFilterFinishReasonError,
 )
-from openai.lib.azure import AzureOpenAI
+from openai.lib.azure import AsyncAzureOpenAI, AzureOpenAI
 from openai.types import CompletionUsage
 from openai.types.chat import ChatCompletionMessage, ChatCompletionMessageParam
 from openai.types.shared_params import ResponseFormatJSONObject
-from pydantic import BaseModel
+from pydantic import BaseModel, PrivateAttr
 
 from app.domain.data.text_message_content_dto import TextMessageContentDTO
 from ...common.message_converters import map_role_to_str, map_str_to_role
@@ -38,7 +42,7 @@ def convert_content_to_openai_format(content):
             "type": "image_url",
             "image_url": {
                 "url": f"data:image/jpeg;base64,{c.base64}",
-                "detail": "high",
+                "detail": c.detail or "high",
             },
         },
         TextMessageContentDTO: lambda c: {"type": "text", "text": c.text_content},
@@ -200,6 +204,133 @@ def convert_to_iris_message(
 class OpenAIChatModel(ChatModel):
     model: str
     api_key: str
+    # Connection pool of the long-lived HTTP client shared by all calls to this model
+    max_connections: int = 100
+    max_keepalive_connections: int = 20
+    keepalive_expiry: float = 60
+    # Timeouts in seconds for a whole request and for establishing a connection
+    timeout: float = 600
+    connect_timeout: float = 10
+    _client: OpenAI
+    # Used by the async path, which runs on the shared background event loop
+    _async_client: AsyncOpenAI
+    _metrics_lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+    _in_flight: int = PrivateAttr(default=0)
+    _peak_in_flight: int = PrivateAttr(default=0)
+    _total_requests: int = PrivateAttr(default=0)
+
+    def create_http_client(self) -> httpx.Client:
+        """Create the pooled HTTP client, httpx clients are thread-safe and can be shared"""
+        return httpx.Client(
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_keepalive_connections,
+                keepalive_expiry=self.keepalive_expiry,
+            ),
+            timeout=httpx.Timeout(self.timeout, connect=self.connect_timeout),
+        )
+
+    def create_async_http_client(self) -> httpx.AsyncClient:
+        """Create the pooled HTTP client of the async path with the same limits"""
+        return httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_keepalive_connections,
+                keepalive_expiry=self.keepalive_expiry,
+            ),
+            timeout=httpx.Timeout(self.timeout, connect=self.connect_timeout),
+        )
+
+    def get_pool_stats(self) -> dict[str, int | float]:
+        """Get the utilisation of the connection pool of this model"""
+        with self._metrics_lock:
+            return {
+                "in_flight": self._in_flight,
+                "peak_in_flight": self._peak_in_flight,
+                "total_requests": self._total_requests,
+                "max_connections": self.max_connections,
+                "utilisation": self._in_flight / self.max_connections,
+            }
+
+    def _track_request_start(self):
+        with self._metrics_lock:
+            self._in_flight += 1
+            self._total_requests += 1
+            self._peak_in_flight = max(self._peak_in_flight, self._in_flight)
+
+    def _track_request_end(self):
+        with self._metrics_lock:
+            self._in_flight -= 1
+
+    def _create_completion(self, params: dict):
+        self._track_request_start()
+        try:
+            return self._client.chat.completions.create(**params)
+        finally:
+            self._track_request_end()
+
+    async def _acreate_completion(self, params: dict):
+        self._track_request_start()
+        try:
+            return await self._async_client.chat.completions.create(**params)
+        finally:
+            self._track_request_end()
+
+    def _create_params(
+        self,
+        messages: list[PyrisMessage],
+        arguments: CompletionArguments,
+        tools: Optional[
+            Sequence[Union[Dict[str, Any], Type[BaseModel], Callable, BaseTool]]
+        ],
+    ) -> dict:
+        for message in messages:
+            if message.sender == "SYSTEM":
+                logging.debug("SYSTEM MESSAGE: " + message.contents[0].text_content)
+                break
+
+        params = {
+            "model": self.model,
+            "messages": convert_to_open_ai_messages(messages),
+        }
+
+        if arguments.temperature is not None:
+            params["temperature"] = arguments.temperature
+
+        if arguments.max_tokens is not None:
+            params["max_tokens"] = arguments.max_tokens
+
+        if arguments.response_format == "JSON":
+            params["response_format"] = ResponseFormatJSONObject(type="json_object")
+
+        if tools:
+            params["tools"] = [convert_to_openai_tool(tool) for tool in tools]
+            logging.info(f"Using tools: {tools}")
+        return params
+
+    @staticmethod
+    def _convert_response(response) -> PyrisMessage:
+        choice = response.choices[0]
+        usage = response.usage
+        model = response.model
+        if choice.finish_reason == "content_filter":
+            # I figured that an openai error would be automatically raised if the content filter activated,
+            # but it seems that that is not the case.
+            # We don't want to retry because the same message will likely be rejected again.
+            # Raise an exception to trigger the global error handler and report a fatal error to the client.
+            raise ContentFilterFinishReasonError()
+
+        if (
+            choice.message is None
+            or choice.message.content is None
+            or len(choice.message.content) == 0
+        ):
+            logging.error("Model returned an empty message")
+            logging.error("Finish reason: " + choice.finish_reason)
+            if choice.message is not None and choice.message.refusal is not None:
+                logging.error("Refusal: " + choice.message.refusal)
+
+        return convert_to_iris_message(choice.message, usage, model)
 
     def chat(
         self,
@@ -213,63 +344,13 @@ class OpenAIChatModel(ChatModel):
         retries = 5
         backoff_factor = 2
         initial_delay = 1
-        client = self.get_client()
         # Maximum wait time: 1 + 2 + 4 + 8 + 16 = 31 seconds
 
-        for message in messages:
-            if message.sender == "SYSTEM":
-                print("SYSTEM MESSAGE: " + message.contents[0].text_content)
-                break
-
-        messages = convert_to_open_ai_messages(messages)
+        params = self._create_params(messages, arguments, tools)
 
         for attempt in range(retries):
             try:
-                params = {
-                    "model": self.model,
-                    "messages": messages,
-                }
-                
-                if arguments.temperature is not None:
-                    params["temperature"] = arguments.temperature
-
-                if arguments.max_tokens is not None:
-                    params["max_tokens"] = arguments.max_tokens
-
-                if arguments.response_format == "JSON":
-                    params["response_format"] = ResponseFormatJSONObject(
-                        type="json_object"
-                    )
-
-                if tools:
-                    params["tools"] = [convert_to_openai_tool(tool) for tool in tools]
-                    logging.info(f"Using tools: {tools}")
-
-                response = client.chat.completions.create(**params)
-                choice = response.choices[0]
-                usage = response.usage
-                model = response.model
-                if choice.finish_reason == "content_filter":
-                    # I figured that an openai error would be automatically raised if the content filter activated,
-                    # but it seems that that is not the case.
-                    # We don't want to retry because the same message will likely be rejected again.
-                    # Raise an exception to trigger the global error handler and report a fatal error to the client.
-                    raise ContentFilterFinishReasonError()
-
-                if (
-                    choice.message is None
-                    or choice.message.content is None
-                    or len(choice.message.content) == 0
-                ):
-                    logging.error("Model returned an empty message")
-                    logging.error("Finish reason: " + choice.finish_reason)
-                    if (
-                        choice.message is not None
-                        and choice.message.refusal is not None
-                    ):
-                        logging.error("Refusal: " + choice.message.refusal)
-
-                return convert_to_iris_message(choice.message, usage, model)
+                return self._convert_response(self._create_completion(params))
             except (
                 APIError,
                 APITimeoutError,
@@ -281,12 +362,45 @@ class OpenAIChatModel(ChatModel):
                 time.sleep(wait_time)
         raise Exception(f"Failed to get response from OpenAI after {retries} retries")
 
+    async def achat(
+        self,
+        messages: list[PyrisMessage],
+        arguments: CompletionArguments,
+        tools: Optional[
+            Sequence[Union[Dict[str, Any], Type[BaseModel], Callable, BaseTool]]
+        ],
+    ) -> PyrisMessage:
+        retries = 5
+        backoff_factor = 2
+        initial_delay = 1
+
+        params = self._create_params(messages, arguments, tools)
+
+        for attempt in range(retries):
+            try:
+                return self._convert_response(await self._acreate_completion(params))
+            except (
+                APIError,
+                APITimeoutError,
+                RateLimitError,
+            ):
+                wait_time = initial_delay * (backoff_factor**attempt)
+                logging.exception(f"OpenAI error on attempt {attempt + 1}:")
+                logging.info(f"Retrying in {wait_time} seconds...")
+                await asyncio.sleep(wait_time)
+        raise Exception(f"Failed to get response from OpenAI after {retries} retries")
+
 
 class DirectOpenAIChatModel(OpenAIChatModel):
     type: Literal["openai_chat"]
 
-    def get_client(self) -> OpenAI:
-        return OpenAI(api_key=self.api_key)
+    def model_post_init(self, __context: Any) -> None:
+        self._client = OpenAI(
+            api_key=self.api_key, http_client=self.create_http_client()
+        )
+        self._async_client = AsyncOpenAI(
+            api_key=self.api_key, http_client=self.create_async_http_client()
+        )
 
     def __str__(self):
         return f"OpenAIChat('{self.model}')"
@@ -298,12 +412,20 @@ class AzureOpenAIChatModel(OpenAIChatModel):
     azure_deployment: str
     api_version: str
 
-    def get_client(self) -> OpenAI:
-        return AzureOpenAI(
+    def model_post_init(self, __context: Any) -> None:
+        self._client = AzureOpenAI(
+            azure_endpoint=self.endpoint,
+            azure_deployment=self.azure_deployment,
+            api_version=self.api_version,
+            api_key=self.api_key,
+            http_client=self.create_http_client(),
+        )
+        self._async_client = AsyncAzureOpenAI(
             azure_endpoint=self.endpoint,
             azure_deployment=self.azure_deployment,
             api_version=self.api_version,
             api_key=self.api_key,
+            http_client=self.create_async_http_client(),
         )
 
     def __str__(self):
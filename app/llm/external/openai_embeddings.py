@@ -1,24 +1,65 @@
+import asyncio
 import logging
 from typing import Literal, Any
 from openai import (
+    AsyncOpenAI,
     OpenAI,
     APIError,
     APITimeoutError,
     RateLimitError,
     InternalServerError,
 )
-from openai.lib.azure import AzureOpenAI
+from openai.lib.azure import AsyncAzureOpenAI, AzureOpenAI
 
 from ...llm.external.model import EmbeddingModel
 import time
 
 
+def estimate_token_count(text: str) -> int:
+    """
+    Estimate the number of tokens of the text.
+    English text averages about four characters per token, so three is a safe upper bound.
+    """
+    return len(text) // 3 + 1
+
+
+def split_into_batches(
+    texts: list[str], max_batch_size: int, max_batch_tokens: int
+) -> list[list[str]]:
+    """
+    Split the texts into consecutive batches that respect both the maximum number of
+    inputs and the estimated maximum number of tokens per embeddings request.
+    """
+    batches = []
+    current_batch = []
+    current_tokens = 0
+    for text in texts:
+        tokens = estimate_token_count(text)
+        if current_batch and (
+            len(current_batch) >= max_batch_size
+            or current_tokens + tokens > max_batch_tokens
+        ):
+            batches.append(current_batch)
+            current_batch = []
+            current_tokens = 0
+        current_batch.append(text)
+        current_tokens += tokens
+    if current_batch:
+        batches.append(current_batch)
+    return batches
+
+
 class OpenAIEmbeddingModel(EmbeddingModel):
     model: str
     api_key: str
+    # Maximum number of inputs per embeddings request
+    max_batch_size: int = 2048
+    # Maximum estimated number of tokens per embeddings request
+    max_batch_tokens: int = 100000
     _client: OpenAI
+    _async_client: AsyncOpenAI
 
-    def embed(self, text: str) -> list[float]:
+    def _create_embeddings(self, inputs: str | list[str]) -> list[list[float]]:
         retries = 5
         backoff_factor = 2
         initial_delay = 1
@@ -28,10 +69,13 @@ class OpenAIEmbeddingModel(EmbeddingModel):
             try:
                 response = self._client.embeddings.create(
                     model=self.model,
-                    input=text,
+                    input=inputs,
                     encoding_format="float",
                 )
-                return response.data[0].embedding
+                return [
+                    item.embedding
+                    for item in sorted(response.data, key=lambda item: item.index)
+                ]
             except (
                 APIError,
                 APITimeoutError,
@@ -44,12 +88,62 @@ class OpenAIEmbeddingModel(EmbeddingModel):
                 time.sleep(wait_time)
         raise Exception(f"Failed to get embedding from OpenAI after {retries} retries.")
 
+    async def _acreate_embeddings(self, inputs: str | list[str]) -> list[list[float]]:
+        retries = 5
+        backoff_factor = 2
+        initial_delay = 1
+
+        for attempt in range(retries):
+            try:
+                response = await self._async_client.embeddings.create(
+                    model=self.model,
+                    input=inputs,
+                    encoding_format="float",
+                )
+                return [
+                    item.embedding
+                    for item in sorted(response.data, key=lambda item: item.index)
+                ]
+            except (
+                APIError,
+                APITimeoutError,
+                RateLimitError,
+                InternalServerError,
+            ):
+                wait_time = initial_delay * (backoff_factor**attempt)
+                logging.exception(f"OpenAI error on attempt {attempt + 1}")
+                logging.info(f"Retrying in {wait_time} seconds...")
+                await asyncio.sleep(wait_time)
+        raise Exception(f"Failed to get embedding from OpenAI after {retries} retries.")
+
+    def embed(self, text: str) -> list[float]:
+        return self._create_embeddings(text)[0]
+
+    def embed_many(self, texts: list[str]) -> list[list[float]]:
+        embeddings = []
+        for batch in split_into_batches(
+            texts, self.max_batch_size, self.max_batch_tokens
+        ):
+            embeddings.extend(self._create_embeddings(batch))
+        return embeddings
+
+    async def aembed(self, text: str) -> list[float]:
+        return (await self._acreate_embeddings(text))[0]
+
+    async def aembed_many(self, texts: list[str]) -> list[list[float]]:
+        batches = split_into_batches(texts, self.max_batch_size, self.max_batch_tokens)
+        results = await asyncio.gather(
+            *(self._acreate_embeddings(batch) for batch in batches)
+        )
+        return [embedding for result in results for embedding in result]
+
 
 class DirectOpenAIEmbeddingModel(OpenAIEmbeddingModel):
     type: Literal["openai_embedding"]
 
     def model_post_init(self, __context: Any) -> None:
         self._client = OpenAI(api_key=self.api_key)
+        self._async_client = AsyncOpenAI(api_key=self.api_key)
 
     def __str__(self):
         return f"OpenAIEmbedding('{self.model}')"
@@ -68,6 +162,12 @@ class AzureOpenAIEmbeddingModel(OpenAIEmbeddingModel):
             api_version=self.api_version,
             api_key=self.api_key,
         )
+        self._async_client = AsyncAzureOpenAI(
+            azure_endpoint=self.endpoint,
+            azure_deployment=self.azure_deployment,
+            api_version=self.api_version,
+            api_key=self.api_key,
+        )
 
     def __str__(self):
         return f"AzureEmbedding('{self.model}')"
@@ -2,7 +2,10 @@ import logging
 from logging import Logger
 from typing import List, Optional, Any, Sequence, Union, Dict, Type, Callable
 
-from langchain_core.callbacks import CallbackManagerForLLMRun
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForLLMRun,
+    CallbackManagerForLLMRun,
+)
 from langchain_core.language_models import LanguageModelInput
 from langchain_core.language_models.chat_models import (
     BaseChatModel,
@@ -15,6 +18,7 @@ from langchain_core.tools import BaseTool
 from pydantic import BaseModel, Field
 
 from app.common.PipelineEnum import PipelineEnum
+from app.common.pyris_message import PyrisMessage
 from app.common.token_usage_dto import TokenUsageDTO
 from ...common.message_converters import (
     convert_langchain_message_to_iris_message,
@@ -83,8 +87,24 @@ class IrisLangchainChatModel(BaseChatModel):
         iris_message = self.request_handler.chat(
             iris_messages, self.completion_args, self.tools
         )
+        return self._create_chat_result(iris_message)
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        iris_messages = [convert_langchain_message_to_iris_message(m) for m in messages]
+        self.completion_args.stop = stop
+        iris_message = await self.request_handler.achat(
+            iris_messages, self.completion_args, self.tools
+        )
+        return self._create_chat_result(iris_message)
+
+    def _create_chat_result(self, iris_message: PyrisMessage) -> ChatResult:
         base_message = convert_iris_message_to_langchain_message(iris_message)
-        chat_generation = ChatGeneration(message=base_message)
         self.tokens = TokenUsageDTO(
             model=iris_message.token_usage.model_info,
             numInputTokens=iris_message.token_usage.num_input_tokens,
@@ -93,6 +113,9 @@ class IrisLangchainChatModel(BaseChatModel):
             costPerMillionOutputToken=iris_message.token_usage.cost_per_output_token,
             pipeline=PipelineEnum.NOT_SET,
         )
+        # Concurrent async calls overwrite self.tokens, so the usage also travels with the message
+        base_message.response_metadata["token_usage"] = self.tokens
+        chat_generation = ChatGeneration(message=base_message)
         return ChatResult(generations=[chat_generation])
 
     @property
@@ -21,15 +21,18 @@ class LlmList(BaseModel):
 
 class LlmManager(metaclass=Singleton):
     entries: list[LanguageModel]
+    entries_by_id: dict[str, LanguageModel]
+    # Memoized results of get_llms_sorted_by_capabilities_score, reset whenever the llms are reloaded
+    routing_table: dict[tuple, list[LanguageModel]]
 
     def __init__(self):
         self.entries = []
+        self.entries_by_id = {}
+        self.routing_table = {}
         self.load_llms()
 
     def get_llm_by_id(self, llm_id):
-        for llm in self.entries:
-            if llm.id == llm_id:
-                return llm
+        return self.entries_by_id.get(llm_id)
 
     def load_llms(self):
         """Load the llms from the config file"""
@@ -41,18 +44,50 @@ class LlmManager(metaclass=Singleton):
             loaded_llms = yaml.safe_load(file)
 
         self.entries = LlmList.model_validate({"llms": loaded_llms}).llms
+        self.entries_by_id = {llm.id: llm for llm in self.entries}
+        self.routing_table = {}
 
     def get_llms_sorted_by_capabilities_score(
-        self, requirements: RequirementList, invert_cost: bool = False
-    ):
+        self,
+        requirements: RequirementList,
+        invert_cost: bool = False,
+        type_filter: type = LanguageModel,
+    ) -> list[LanguageModel]:
+        """
+        Get the llms of the given type sorted by their capability to requirement scores.
+        The result is computed once per combination of arguments and then served from the routing table.
+        """
+        key = (requirements.key(), invert_cost, type_filter)
+        llms = self.routing_table.get(key)
+        if llms is None:
+            llms = [
+                llm
+                for llm in self._sort_llms_by_capabilities_score(
+                    requirements, invert_cost
+                )
+                if isinstance(llm, type_filter)
+            ]
+            self.routing_table[key] = llms
+        return llms
+
+    def _sort_llms_by_capabilities_score(
+        self, requirements: RequirementList, invert_cost: bool
+    ) -> list[LanguageModel]:
         valid_llms = [
             llm
             for llm in self.entries
             if capabilities_fulfill_requirements(llm.capabilities, requirements)
         ]
-        """Get the llms sorted by their capability to requirement scores"""
         scores = calculate_capability_scores(
             [llm.capabilities for llm in valid_llms], requirements, invert_cost
         )
         sorted_llms = sorted(zip(scores, valid_llms), key=lambda pair: -pair[0])
         return [llm for _, llm in sorted_llms]
+
+    def get_pool_stats(self) -> dict[str, dict]:
+        """Get the connection pool utilisation of all llms that keep a pooled client"""
+        return {
+            llm.id: llm.get_pool_stats()
+            for llm in self.entries
+            if hasattr(llm, "get_pool_stats")
+        }
@@ -1,3 +1,4 @@
+import asyncio
 from typing import Optional, Sequence, Union, Dict, Any, Type, Callable
 
 from langchain_core.tools import BaseTool
@@ -9,6 +10,7 @@ from app.domain.data.image_message_content_dto import ImageMessageContentDTO
 from app.llm import LanguageModel
 from app.llm.request_handler import RequestHandler
 from app.llm.completion_arguments import CompletionArguments
+from app.llm.embedding_cache import EmbeddingCache
 from app.llm.llm_manager import LlmManager
 
 
@@ -42,9 +44,92 @@ class BasicRequestHandler(RequestHandler):
         llm = self.llm_manager.get_llm_by_id(self.model_id)
         return llm.chat(messages, arguments, tools)
 
+    async def achat(
+        self,
+        messages: list[PyrisMessage],
+        arguments: CompletionArguments,
+        tools: Optional[
+            Sequence[Union[Dict[str, Any], Type[BaseModel], Callable, BaseTool]]
+        ],
+    ) -> PyrisMessage:
+        llm = self.llm_manager.get_llm_by_id(self.model_id)
+        return await llm.achat(messages, arguments, tools)
+
     def embed(self, text: str) -> list[float]:
+        return self.embed_many([text])[0]
+
+    def embed_many(self, texts: list[str]) -> list[list[float]]:
+        """Embed the texts, only texts that are not in the embedding cache are sent to the model"""
+        llm = self.llm_manager.get_llm_by_id(self.model_id)
+        cache = EmbeddingCache()
+        if not cache.enabled:
+            return llm.embed_many(texts)
+
+        embeddings, missing_texts = self._get_cached_embeddings(cache, texts)
+        if missing_texts:
+            if len(missing_texts) == 1:
+                new_embeddings = [llm.embed(missing_texts[0])]
+            else:
+                new_embeddings = llm.embed_many(missing_texts)
+            self._fill_missing_embeddings(
+                cache, texts, embeddings, missing_texts, new_embeddings
+            )
+        return embeddings
+
+    async def aembed(self, text: str) -> list[float]:
+        return (await self.aembed_many([text]))[0]
+
+    async def aembed_many(self, texts: list[str]) -> list[list[float]]:
+        """Async variant of embed_many that uses the same embedding cache"""
         llm = self.llm_manager.get_llm_by_id(self.model_id)
-        return llm.embed(text)
+        cache = EmbeddingCache()
+        if not cache.enabled:
+            return await llm.aembed_many(texts)
+
+        # The cache may read from and write to SQLite, which must not block the event loop
+        embeddings, missing_texts = await asyncio.to_thread(
+            self._get_cached_embeddings, cache, texts
+        )
+        if missing_texts:
+            if len(missing_texts) == 1:
+                new_embeddings = [await llm.aembed(missing_texts[0])]
+            else:
+                new_embeddings = await llm.aembed_many(missing_texts)
+            await asyncio.to_thread(
+                self._fill_missing_embeddings,
+                cache,
+                texts,
+                embeddings,
+                missing_texts,
+                new_embeddings,
+            )
+        return embeddings
+
+    def _get_cached_embeddings(
+        self, cache: EmbeddingCache, texts: list[str]
+    ) -> tuple[list[list[float] | None], list[str]]:
+        """Look up the texts in the cache, every distinct missing text is returned only once"""
+        embeddings = cache.get_many(self.model_id, texts)
+        missing_texts = list(
+            dict.fromkeys(
+                text for text, embedding in zip(texts, embeddings) if embedding is None
+            )
+        )
+        return embeddings, missing_texts
+
+    def _fill_missing_embeddings(
+        self,
+        cache: EmbeddingCache,
+        texts: list[str],
+        embeddings: list[list[float] | None],
+        missing_texts: list[str],
+        new_embeddings: list[list[float]],
+    ):
+        cache.put_many(self.model_id, missing_texts, new_embeddings)
+        embeddings_by_text = dict(zip(missing_texts, new_embeddings))
+        for i, text in enumerate(texts):
+            if embeddings[i] is None:
+                embeddings[i] = embeddings_by_text[text]
 
     def bind_tools(
         self,
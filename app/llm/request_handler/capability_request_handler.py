@@ -63,17 +63,43 @@ class CapabilityRequestHandler(RequestHandler):
         message.token_usage.cost_per_output_token = llm.capabilities.output_cost.value
         return message
 
+    async def achat(
+        self,
+        messages: list[PyrisMessage],
+        arguments: CompletionArguments,
+        tools: Optional[
+            Sequence[Union[Dict[str, Any], Type[BaseModel], Callable, BaseTool]]
+        ],
+    ) -> PyrisMessage:
+        llm = self._select_model(ChatModel)
+        message = await llm.achat(messages, arguments, tools)
+        message.token_usage.cost_per_input_token = llm.capabilities.input_cost.value
+        message.token_usage.cost_per_output_token = llm.capabilities.output_cost.value
+        return message
+
     def embed(self, text: str) -> list[float]:
         llm = self._select_model(EmbeddingModel)
         return llm.embed(text)
 
+    def embed_many(self, texts: list[str]) -> list[list[float]]:
+        llm = self._select_model(EmbeddingModel)
+        return llm.embed_many(texts)
+
+    async def aembed(self, text: str) -> list[float]:
+        llm = self._select_model(EmbeddingModel)
+        return await llm.aembed(text)
+
+    async def aembed_many(self, texts: list[str]) -> list[list[float]]:
+        llm = self._select_model(EmbeddingModel)
+        return await llm.aembed_many(texts)
+
     def _select_model(self, type_filter: type) -> LanguageModel:
         """Select the best/worst model based on the requirements and the selection mode"""
         llms = self.llm_manager.get_llms_sorted_by_capabilities_score(
             self.requirements,
             self.selection_mode == CapabilityRequestHandlerSelectionMode.WORST,
+            type_filter,
         )
-        llms = [llm for llm in llms if isinstance(llm, type_filter)]
 
         if self.selection_mode == CapabilityRequestHandlerSelectionMode.BEST:
             llm = llms[0]
@@ -45,11 +45,38 @@ class RequestHandler(BaseModel, metaclass=ABCMeta):
         """Create a completion from the chat messages"""
         raise NotImplementedError
 
+    @abstractmethod
+    async def achat(
+        self,
+        messages: list[any],
+        arguments: CompletionArguments,
+        tools: Optional[
+            Sequence[Union[Dict[str, Any], Type[BaseModel], Callable, BaseTool]]
+        ],
+    ) -> PyrisMessage:
+        """Create a completion from the chat messages asynchronously"""
+        raise NotImplementedError
+
     @abstractmethod
     def embed(self, text: str) -> list[float]:
         """Create an embedding from the text"""
         raise NotImplementedError
 
+    @abstractmethod
+    def embed_many(self, texts: list[str]) -> list[list[float]]:
+        """Create embeddings for multiple texts"""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def aembed(self, text: str) -> list[float]:
+        """Create an embedding from the text asynchronously"""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def aembed_many(self, texts: list[str]) -> list[list[float]]:
+        """Create embeddings for multiple texts asynchronously"""
+        raise NotImplementedError
+
     @abstractmethod
     def bind_tools(
         self,
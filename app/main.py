@@ -1,9 +1,12 @@
+from contextlib import asynccontextmanager
+
 from fastapi.responses import ORJSONResponse
-from starlette.background import BackgroundTask
-from starlette.responses import Response
 
 from app.config import settings
 import app.sentry as sentry
+from app.pipeline.prompt_registry import PromptRegistry
+from app.vector_database.database import VectorDatabase
+from app.web.request_logging import RequestLoggingMiddleware
 from app.web.routers.health import router as health_router
 from app.web.routers.pipelines import router as pipelines_router
 from app.web.routers.webhooks import router as webhooks_router
@@ -18,7 +21,22 @@ settings.set_env_vars()
 
 sentry.init()
 
-app = FastAPI(default_response_class=ORJSONResponse)
+# Load all prompt templates once at startup
+PromptRegistry()
+
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    # Connect to Weaviate and initialize or migrate the schemas once before serving requests
+    try:
+        VectorDatabase()
+    except Exception as e:
+        logging.error(f"Failed to initialize the vector database at startup: {e}")
+    yield
+    VectorDatabase.close_async_client()
+
+
+app = FastAPI(default_response_class=ORJSONResponse, lifespan=lifespan)
 
 
 def custom_openapi():
@@ -49,29 +67,7 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
     )
 
 
-def log_info(req_body, res_body):
-    logging.info(req_body)
-    logging.info(res_body)
-
-
-@app.middleware("http")
-async def some_middleware(request: Request, call_next):
-    req_body = await request.body()
-    response = await call_next(request)
-
-    res_body = b""
-    async for chunk in response.body_iterator:
-        res_body += chunk
-
-    task = BackgroundTask(log_info, req_body, res_body)
-    return Response(
-        content=res_body,
-        status_code=response.status_code,
-        headers=dict(response.headers),
-        media_type=response.media_type,
-        background=task,
-    )
-
+app.add_middleware(RequestLoggingMiddleware, config=settings.request_logging)
 
 app.include_router(health_router)
 app.include_router(pipelines_router)
@@ -1,5 +1,4 @@
 import logging
-import os
 from typing import Dict, Optional, List
 
 from langchain_core.output_parsers import StrOutputParser
@@ -17,6 +16,7 @@ from ...llm import CompletionArguments
 from app.common.PipelineEnum import PipelineEnum
 from ...llm.langchain import IrisLangchainChatModel
 from ...pipeline import Pipeline
+from ...pipeline.prompt_registry import PromptRegistry
 from ...web.status.status_update import StatusCallback
 
 logger = logging.getLogger(__name__)
@@ -61,19 +61,9 @@ class CodeFeedbackPipeline(Pipeline):
             request_handler=request_handler, completion_args=completion_args
         )
         self.callback = callback
-        # Load prompt from file
-        dirname = os.path.dirname(__file__)
-        with open(
-            os.path.join(dirname, "../prompts/code_feedback_prompt.txt"), "r"
-        ) as file:
-            prompt_str = file.read()
-
         self.output_parser = StrOutputParser()
-        # Create the prompt
-        self.default_prompt = PromptTemplate(
-            template=prompt_str,
-            input_variables=["files", "feedbacks", "chat_history", "question"],
-        )
+        # Get the prompt from the registry
+        self.default_prompt = PromptRegistry().get_template("code_feedback_prompt")
         # Create the pipeline
         self.pipeline = self.llm | self.output_parser
 
@@ -14,7 +14,6 @@ from langchain_core.prompts import (
 )
 from langchain_core.runnables import Runnable
 from langsmith import traceable
-from weaviate.collections.classes.filters import Filter
 
 from .interaction_suggestion_pipeline import (
     InteractionSuggestionPipeline,
@@ -45,6 +44,9 @@ from app.common.PipelineEnum import PipelineEnum
 from ...retrieval.faq_retrieval import FaqRetrieval
 from ...retrieval.faq_retrieval_utils import should_allow_faq_tool, format_faqs
 from ...retrieval.lecture_retrieval import LectureRetrieval
+from ...retrieval.speculative_retrieval import SpeculativeRetrieval
+from ...config import settings
+from ...retrieval.course_metadata_cache import CourseMetadataCache
 from ...vector_database.database import VectorDatabase
 from ...vector_database.lecture_schema import LectureSchema
 from ...web.status.status_update import (
@@ -54,6 +56,7 @@ from ...llm import CompletionArguments
 from ...llm.langchain import IrisLangchainChatModel
 
 from ..pipeline import Pipeline
+from ..pipeline_pool import RunContextMixin
 
 logger = logging.getLogger(__name__)
 
@@ -69,8 +72,11 @@ def get_mastery(progress, confidence):
     return min(100, max(0, round(progress * confidence)))
 
 
-class CourseChatPipeline(Pipeline):
-    """Course chat pipeline that answers course related questions from students."""
+class CourseChatPipeline(RunContextMixin, Pipeline):
+    """
+    Course chat pipeline that answers course related questions from students.
+    Instances are reused by the PipelinePool, everything that belongs to a single run lives in its ChatRunContext.
+    """
 
     llm_big: IrisLangchainChatModel
     llm_small: IrisLangchainChatModel
@@ -81,20 +87,16 @@ class CourseChatPipeline(Pipeline):
     callback: CourseChatStatusCallback
     prompt: ChatPromptTemplate
     variant: str
-    event: str | None
-    retrieved_paragraphs: List[dict] = None
-    retrieved_faqs: List[dict] = None
 
     def __init__(
         self,
-        callback: CourseChatStatusCallback,
+        callback: CourseChatStatusCallback | None,
         variant: str = "default",
         event: str | None = None,
     ):
         super().__init__(implementation_id="course_chat_pipeline")
 
         self.variant = variant
-        self.event = event
 
         # Set the langchain chat model
         completion_args = CompletionArguments(temperature=0.5, max_tokens=2000)
@@ -114,17 +116,27 @@ class CourseChatPipeline(Pipeline):
             ),
             completion_args=completion_args,
         )
-        self.callback = callback
 
         self.db = VectorDatabase()
-        self.lecture_retriever = LectureRetrieval(self.db.client)
+        self.lecture_retriever = LectureRetrieval(
+            self.db.client,
+            reranker_mode=settings.retrieval.get_reranker(self.implementation_id),
+        )
         self.faq_retriever = FaqRetrieval(self.db.client)
         self.suggestion_pipeline = InteractionSuggestionPipeline(variant="course")
         self.citation_pipeline = CitationPipeline()
 
         # Create the pipeline
         self.pipeline = self.llm_big | JsonOutputParser()
-        self.tokens = []
+        if callback is not None:
+            self.start_run(callback, event)
+
+    def reset_run_state(self):
+        self.lecture_retriever.tokens = []
+        self.lecture_retriever.reranker_pipeline.tokens = []
+        self.faq_retriever.tokens = []
+        self.citation_pipeline.tokens = []
+        self.suggestion_pipeline.tokens = None
 
     def __repr__(self):
         return f"{self.__class__.__name__}(llm_big={self.llm_big}, llm_small={self.llm_small})"
@@ -276,6 +288,32 @@ class CourseChatPipeline(Pipeline):
                 for comp in competency_metrics.competency_information
             ]
 
+        lecture_retrieval = SpeculativeRetrieval(
+            "lecture",
+            lambda: self.lecture_retriever(
+                chat_history=retrieval_history,
+                student_query=query.contents[0].text_content,
+                result_limit=5,
+                course_name=dto.course.name,
+                course_id=dto.course.id,
+                base_url=dto.settings.artemis_base_url,
+            ),
+            lambda: self.lecture_retriever.tokens
+            + self.lecture_retriever.reranker_pipeline.tokens,
+        )
+        faq_retrieval = SpeculativeRetrieval(
+            "faq",
+            lambda: self.faq_retriever(
+                chat_history=retrieval_history,
+                student_query=query.contents[0].text_content,
+                result_limit=10,
+                course_name=dto.course.name,
+                course_id=dto.course.id,
+                base_url=dto.settings.artemis_base_url,
+            ),
+            lambda: self.faq_retriever.tokens,
+        )
+
         def lecture_content_retrieval() -> str:
             """
             Retrieve content from indexed lecture slides.
@@ -286,14 +324,7 @@ class CourseChatPipeline(Pipeline):
             Only use this once.
             """
             self.callback.in_progress("Retrieving lecture content ...")
-            self.retrieved_paragraphs = self.lecture_retriever(
-                chat_history=history,
-                student_query=query.contents[0].text_content,
-                result_limit=5,
-                course_name=dto.course.name,
-                course_id=dto.course.id,
-                base_url=dto.settings.artemis_base_url,
-            )
+            self.retrieved_paragraphs = lecture_retrieval.result()
 
             result = ""
             for paragraph in self.retrieved_paragraphs:
@@ -319,14 +350,7 @@ class CourseChatPipeline(Pipeline):
             This tool should only be used once per query.
             """
             self.callback.in_progress("Retrieving faq content ...")
-            self.retrieved_faqs = self.faq_retriever(
-                chat_history=history,
-                student_query=query.contents[0].text_content,
-                result_limit=10,
-                course_name=dto.course.name,
-                course_id=dto.course.id,
-                base_url=dto.settings.artemis_base_url,
-            )
+            self.retrieved_faqs = faq_retrieval.result()
 
             result = format_faqs(self.retrieved_faqs)
             return result
@@ -350,6 +374,17 @@ class CourseChatPipeline(Pipeline):
             query: Optional[PyrisMessage] = (
                 dto.chat_history[-1] if dto.chat_history else None
             )
+            # The retrieval gets the query separately, like in the exercise chat agent
+            retrieval_history: List[PyrisMessage] = dto.chat_history[-6:-1]
+
+            allow_lecture_tool = self.should_allow_lecture_tool(dto.course.id)
+            allow_faq_tool = should_allow_faq_tool(self.db, dto.course.id)
+            if settings.retrieval.speculative.enabled and query is not None:
+                # Retrieve while the agent decides whether it needs the retrieval tools
+                if allow_lecture_tool:
+                    lecture_retrieval.start()
+                if allow_faq_tool:
+                    faq_retrieval.start()
 
             # Set up the initial prompt
             initial_prompt_with_date = iris_initial_system_prompt.replace(
@@ -426,10 +461,10 @@ class CourseChatPipeline(Pipeline):
                 get_student_exercise_metrics,
                 get_competency_list,
             ]
-            if self.should_allow_lecture_tool(dto.course.id):
+            if allow_lecture_tool:
                 tool_list.append(lecture_content_retrieval)
 
-            if should_allow_faq_tool(self.db, dto.course.id):
+            if allow_faq_tool:
                 tool_list.append(faq_content_retrieval)
 
             tools = generate_structured_tools_from_functions(tool_list)
@@ -496,6 +531,9 @@ class CourseChatPipeline(Pipeline):
                 "An error occurred while running the course chat pipeline.",
                 tokens=self.tokens,
             )
+        finally:
+            lecture_retrieval.discard(self.run_context)
+            faq_retrieval.discard(self.run_context)
 
     def should_allow_lecture_tool(self, course_id: int) -> bool:
         """
@@ -504,17 +542,7 @@ class CourseChatPipeline(Pipeline):
         :param course_id: The course ID
         :return: True if there are indexed lectures for the course, False otherwise
         """
-        if course_id:
-            # Fetch the first object that matches the course ID with the language property
-            result = self.db.lectures.query.fetch_objects(
-                filters=Filter.by_property(LectureSchema.COURSE_ID.value).equal(
-                    course_id
-                ),
-                limit=1,
-                return_properties=[LectureSchema.COURSE_NAME.value],
-            )
-            return len(result.objects) > 0
-        return False
+        return CourseMetadataCache().get(course_id).has_lectures
 
 
 def datetime_to_string(dt: Optional[datetime]) -> str:
@@ -15,6 +15,7 @@ from langsmith import traceable
 from .code_feedback_pipeline import CodeFeedbackPipeline
 from .interaction_suggestion_pipeline import InteractionSuggestionPipeline
 from ..pipeline import Pipeline
+from ..pipeline_pool import RunContextMixin
 from ..prompts.iris_exercise_chat_agent_prompts import (
     tell_iris_initial_system_prompt,
     tell_begin_agent_prompt,
@@ -42,9 +43,11 @@ from ...llm.langchain import IrisLangchainChatModel
 from ...retrieval.faq_retrieval import FaqRetrieval
 from ...retrieval.faq_retrieval_utils import should_allow_faq_tool, format_faqs
 from ...retrieval.lecture_retrieval import LectureRetrieval
+from ...retrieval.speculative_retrieval import SpeculativeRetrieval
+from ...config import settings
+from ...retrieval.course_metadata_cache import CourseMetadataCache
 from ...vector_database.database import VectorDatabase
 from ...vector_database.lecture_schema import LectureSchema
-from weaviate.collections.classes.filters import Filter
 from ...web.status.status_update import ExerciseChatStatusCallback
 
 logger = logging.getLogger()
@@ -93,8 +96,11 @@ def convert_chat_history_to_str(chat_history: List[PyrisMessage]) -> str:
     )
 
 
-class ExerciseChatAgentPipeline(Pipeline):
-    """Exercise chat agent pipeline that answers exercises related questions from students."""
+class ExerciseChatAgentPipeline(RunContextMixin, Pipeline):
+    """
+    Exercise chat agent pipeline that answers exercises related questions from students.
+    The state of a run is kept in its run context, so the pipeline can be pooled and reused.
+    """
 
     llm_big: IrisLangchainChatModel
     llm_small: IrisLangchainChatModel
@@ -104,12 +110,10 @@ class ExerciseChatAgentPipeline(Pipeline):
     code_feedback_pipeline: CodeFeedbackPipeline
     prompt: ChatPromptTemplate
     variant: str
-    event: str | None
-    retrieved_faqs: List[dict] = None
 
     def __init__(
         self,
-        callback: ExerciseChatStatusCallback,
+        callback: ExerciseChatStatusCallback | None,
         variant: str = "default",
         event: str | None = None,
     ):
@@ -133,19 +137,30 @@ class ExerciseChatAgentPipeline(Pipeline):
             completion_args=completion_args,
         )
         self.variant = variant
-        self.event = event
-        self.callback = callback
 
         # Create the pipelines
         self.db = VectorDatabase()
         self.suggestion_pipeline = InteractionSuggestionPipeline(variant="exercise")
-        self.lecture_retriever = LectureRetrieval(self.db.client)
+        self.lecture_retriever = LectureRetrieval(
+            self.db.client,
+            reranker_mode=settings.retrieval.get_reranker(self.implementation_id),
+        )
         self.faq_retriever = FaqRetrieval(self.db.client)
         self.reranker_pipeline = RerankerPipeline()
         self.code_feedback_pipeline = CodeFeedbackPipeline()
         self.pipeline = self.llm_big | JsonOutputParser()
         self.citation_pipeline = CitationPipeline()
-        self.tokens = []
+        if callback is not None:
+            self.start_run(callback, event)
+
+    def reset_run_state(self):
+        self.lecture_retriever.tokens = []
+        self.lecture_retriever.reranker_pipeline.tokens = []
+        self.faq_retriever.tokens = []
+        self.reranker_pipeline.tokens = []
+        self.citation_pipeline.tokens = []
+        self.code_feedback_pipeline.tokens = None
+        self.suggestion_pipeline.tokens = None
 
     def __repr__(self):
         return f"{self.__class__.__name__}(llm_big={self.llm_big}, llm_small={self.llm_small})"
@@ -367,6 +382,32 @@ class ExerciseChatAgentPipeline(Pipeline):
                 return "{}:\n{}\n".format(file_path, repository[file_path])
             return "File not found or does not exist in the repository."
 
+        lecture_retrieval = SpeculativeRetrieval(
+            "lecture",
+            lambda: self.lecture_retriever(
+                chat_history=chat_history,
+                student_query=query.contents[0].text_content,
+                result_limit=5,
+                course_name=dto.course.name,
+                course_id=dto.course.id,
+                base_url=dto.settings.artemis_base_url,
+            ),
+            lambda: self.lecture_retriever.tokens
+            + self.lecture_retriever.reranker_pipeline.tokens,
+        )
+        faq_retrieval = SpeculativeRetrieval(
+            "faq",
+            lambda: self.faq_retriever(
+                chat_history=chat_history,
+                student_query=query.contents[0].text_content,
+                result_limit=10,
+                course_name=dto.course.name,
+                course_id=dto.course.id,
+                base_url=dto.settings.artemis_base_url,
+            ),
+            lambda: self.faq_retriever.tokens,
+        )
+
         def lecture_content_retrieval() -> str:
             """
             Retrieve content from indexed lecture slides.
@@ -377,14 +418,7 @@ class ExerciseChatAgentPipeline(Pipeline):
             Only use this once.
             """
             self.callback.in_progress("Retrieving lecture content ...")
-            self.retrieved_paragraphs = self.lecture_retriever(
-                chat_history=chat_history,
-                student_query=query.contents[0].text_content,
-                result_limit=5,
-                course_name=dto.course.name,
-                course_id=dto.course.id,
-                base_url=dto.settings.artemis_base_url,
-            )
+            self.retrieved_paragraphs = lecture_retrieval.result()
 
             result = ""
             for paragraph in self.retrieved_paragraphs:
@@ -410,14 +444,7 @@ class ExerciseChatAgentPipeline(Pipeline):
             This tool should only be used once per query.
             """
             self.callback.in_progress("Retrieving faq content ...")
-            self.retrieved_faqs = self.faq_retriever(
-                chat_history=chat_history,
-                student_query=query.contents[0].text_content,
-                result_limit=10,
-                course_name=dto.course.name,
-                course_id=dto.course.id,
-                base_url=dto.settings.artemis_base_url,
-            )
+            self.retrieved_faqs = faq_retrieval.result()
 
             result = format_faqs(self.retrieved_faqs)
             return result
@@ -441,6 +468,15 @@ class ExerciseChatAgentPipeline(Pipeline):
                 dto.chat_history[-5:] if query is None else dto.chat_history[-6:-1]
             )
 
+            allow_lecture_tool = self.should_allow_lecture_tool(dto.course.id)
+            allow_faq_tool = should_allow_faq_tool(self.db, dto.course.id)
+            if settings.retrieval.speculative.enabled and query is not None:
+                # Retrieve while the agent decides whether it needs the retrieval tools
+                if allow_lecture_tool:
+                    lecture_retrieval.start()
+                if allow_faq_tool:
+                    faq_retrieval.start()
+
             # Set up the initial prompt
             initial_prompt_with_date = iris_initial_system_prompt.replace(
                 "{current_date}",
@@ -538,10 +574,10 @@ class ExerciseChatAgentPipeline(Pipeline):
                 repository_files,
                 file_lookup,
             ]
-            if self.should_allow_lecture_tool(dto.course.id):
+            if allow_lecture_tool:
                 tool_list.append(lecture_content_retrieval)
 
-            if should_allow_faq_tool(self.db, dto.course.id):
+            if allow_faq_tool:
                 tool_list.append(faq_content_retrieval)
 
             tools = generate_structured_tools_from_functions(tool_list)
@@ -637,6 +673,9 @@ class ExerciseChatAgentPipeline(Pipeline):
             self.callback.error(
                 "An error occurred while running the course chat pipeline."
             )
+        finally:
+            lecture_retrieval.discard(self.run_context)
+            faq_retrieval.discard(self.run_context)
 
     def should_allow_lecture_tool(self, course_id: int) -> bool:
         """
@@ -645,14 +684,4 @@ class ExerciseChatAgentPipeline(Pipeline):
         :param course_id: The course ID
         :return: True if there are indexed lectures for the course, False otherwise
         """
-        if course_id:
-            # Fetch the first object that matches the course ID with the language property
-            result = self.db.lectures.query.fetch_objects(
-                filters=Filter.by_property(LectureSchema.COURSE_ID.value).equal(
-                    course_id
-                ),
-                limit=1,
-                return_properties=[LectureSchema.COURSE_NAME.value],
-            )
-            return len(result.objects) > 0
-        return False
+        return CourseMetadataCache().get(course_id).has_lectures
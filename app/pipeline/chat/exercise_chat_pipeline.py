@@ -10,7 +10,6 @@ from langchain_core.prompts import (
 )
 from langchain_core.runnables import Runnable
 from langsmith import traceable, get_current_run_tree
-from weaviate.collections.classes.filters import Filter
 
 from .code_feedback_pipeline import CodeFeedbackPipeline
 from .interaction_suggestion_pipeline import InteractionSuggestionPipeline
@@ -40,6 +39,8 @@ from ...llm import CompletionArguments
 from app.common.PipelineEnum import PipelineEnum
 from ...llm.langchain import IrisLangchainChatModel
 from ...retrieval.lecture_retrieval import LectureRetrieval
+from ...config import settings
+from ...retrieval.course_metadata_cache import CourseMetadataCache
 from ...vector_database.database import VectorDatabase
 from ...vector_database.lecture_schema import LectureSchema
 from ...web.status.status_update import ExerciseChatStatusCallback
@@ -85,7 +86,10 @@ class ExerciseChatPipeline(Pipeline):
         # Create the pipelines
         self.db = VectorDatabase()
         self.suggestion_pipeline = InteractionSuggestionPipeline(variant="exercise")
-        self.retriever = LectureRetrieval(self.db.client)
+        self.retriever = LectureRetrieval(
+            self.db.client,
+            reranker_mode=settings.retrieval.get_reranker(self.implementation_id),
+        )
         self.reranker_pipeline = RerankerPipeline()
         self.code_feedback_pipeline = CodeFeedbackPipeline()
         self.pipeline = self.llm | StrOutputParser()
@@ -420,14 +424,4 @@ class ExerciseChatPipeline(Pipeline):
         :param course_id: The course ID
         :return: True if the lecture pipeline should be executed
         """
-        if course_id:
-            # Fetch the first object that matches the course ID with the language property
-            result = self.db.lectures.query.fetch_objects(
-                filters=Filter.by_property(LectureSchema.COURSE_ID.value).equal(
-                    course_id
-                ),
-                limit=1,
-                return_properties=[LectureSchema.COURSE_NAME.value],
-            )
-            return len(result.objects) > 0
-        return False
+        return CourseMetadataCache().get(course_id).has_lectures
@@ -18,6 +18,7 @@ from ...domain.chat.lecture_chat.lecture_chat_pipeline_execution_dto import (
 from ...llm import CapabilityRequestHandler, RequirementList
 from app.common.PipelineEnum import PipelineEnum
 from ...retrieval.lecture_retrieval import LectureRetrieval
+from ...config import settings
 from ...vector_database.database import VectorDatabase
 from ...vector_database.lecture_schema import LectureSchema
 
@@ -86,7 +87,10 @@ class LectureChatPipeline(Pipeline):
         )
         # Create the pipelines
         self.db = VectorDatabase()
-        self.retriever = LectureRetrieval(self.db.client)
+        self.retriever = LectureRetrieval(
+            self.db.client,
+            reranker_mode=settings.retrieval.get_reranker(self.implementation_id),
+        )
         self.pipeline = self.llm | StrOutputParser()
         self.citation_pipeline = CitationPipeline()
         self.tokens = []
@@ -11,7 +11,8 @@ from app.domain.ingestion.ingestion_pipeline_execution_dto import (
     FaqIngestionPipelineExecutionDto,
 )
 from ..llm.langchain import IrisLangchainChatModel
-from ..vector_database.faq_schema import FaqSchema, init_faq_schema
+from ..vector_database.database import VectorDatabase
+from ..vector_database.faq_schema import FaqSchema
 from ..ingestion.abstract_ingestion import AbstractIngestion
 from ..llm import (
     BasicRequestHandler,
@@ -35,7 +36,7 @@ class FaqIngestionPipeline(AbstractIngestion, Pipeline):
     ):
         super().__init__()
         self.client = client
-        self.collection = init_faq_schema(client)
+        self.collection = VectorDatabase().faqs
         self.dto = dto
         self.llm_embedding = BasicRequestHandler("embedding-small")
         self.callback = callback
@@ -84,23 +85,23 @@ class FaqIngestionPipeline(AbstractIngestion, Pipeline):
         Weaviate limitation.
         """
         global batch_update_lock
-        with batch_update_lock:
-            with self.collection.batch.rate_limit(requests_per_minute=600) as batch:
-                try:
-                    embed_chunk = self.llm_embedding.embed(
-                        f"{faq.question_title} : {faq.question_answer}"
-                    )
-                    faq_dict = faq.model_dump()
-
+        try:
+            # Embed before taking the lock, so other ingestions are not blocked by the request
+            embed_chunk = self.llm_embedding.embed(
+                f"{faq.question_title} : {faq.question_answer}"
+            )
+            faq_dict = faq.model_dump()
+            with batch_update_lock:
+                with self.collection.batch.rate_limit(requests_per_minute=600) as batch:
                     batch.add_object(properties=faq_dict, vector=embed_chunk)
 
-                except Exception as e:
-                    logger.error(f"Error updating faq: {e}")
-                    self.callback.error(
-                        f"Failed to ingest faqs into the database: {e}",
-                        exception=e,
-                        tokens=self.tokens,
-                    )
+        except Exception as e:
+            logger.error(f"Error updating faq: {e}")
+            self.callback.error(
+                f"Failed to ingest faqs into the database: {e}",
+                exception=e,
+                tokens=self.tokens,
+            )
 
     def delete_old_faqs(self, faqs: list[FaqDTO]):
         """
@@ -1,13 +1,12 @@
-import base64
+import hashlib
 import os
-import tempfile
 import threading
 from asyncio.log import logger
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional
 
 import fitz
 from langchain_core.output_parsers import StrOutputParser
-from langchain_core.prompts import ChatPromptTemplate
 from unstructured.cleaners.core import clean
 from weaviate import WeaviateClient
 from weaviate.classes.query import Filter
@@ -21,9 +20,18 @@ from app.domain.ingestion.ingestion_pipeline_execution_dto import (
 )
 from ..domain.data.text_message_content_dto import TextMessageContentDTO
 from app.common.PipelineEnum import PipelineEnum
+from app.config import settings
 from ..llm.langchain import IrisLangchainChatModel
-from ..vector_database.lecture_schema import init_lecture_schema, LectureSchema
+from .prompt_registry import PromptRegistry
+from ..vector_database.database import VectorDatabase
+from ..vector_database.lecture_schema import LectureSchema
 from ..ingestion.abstract_ingestion import AbstractIngestion
+from ..ingestion.interpretation_cache import (
+    InterpretationCache,
+    interpretation_cache_key,
+)
+from ..ingestion.pdf_upload import decode_base64_to_file
+from ..ingestion.render_policy import RenderPolicy
 from ..llm import (
     BasicRequestHandler,
     CompletionArguments,
@@ -36,11 +44,20 @@ from ..web.status import ingestion_status_callback
 
 batch_update_lock = threading.Lock()
 
+# Change this whenever pages are chunked or interpreted differently, so all pages are reingested
+FINGERPRINT_VERSION = "1"
+# Change this whenever the interpretation or merge prompts change, so cached interpretations are not reused
+INTERPRETATION_PROMPT_VERSION = "1"
+# Maximum number of chunks fetched when comparing a lecture unit with the database
+MAX_CHUNKS_PER_LECTURE_UNIT = 10000
+
 
 def cleanup_temporary_file(file_path):
     """
     Cleanup the temporary file
     """
+    if not os.path.exists(file_path):
+        return
     try:
         os.remove(file_path)
     except OSError as e:
@@ -51,22 +68,11 @@ def save_pdf(pdf_file_base64):
     """
     Save the pdf file to a temporary file
     """
-    binary_data = base64.b64decode(pdf_file_base64)
-    fd, temp_pdf_file_path = tempfile.mkstemp(suffix=".pdf")
-    os.close(fd)
-    with open(temp_pdf_file_path, "wb") as temp_pdf_file:
-        try:
-            temp_pdf_file.write(binary_data)
-        except Exception as e:
-            logger.error(
-                f"Failed to write to temporary PDF file {temp_pdf_file_path}: {e}"
-            )
-            raise
-    return temp_pdf_file_path
+    return decode_base64_to_file(pdf_file_base64, suffix=".pdf")
 
 
 def create_page_data(
-    page_num, page_splits, lecture_unit_dto, course_language, base_url
+    page_num, page_splits, lecture_unit_dto, course_language, base_url, fingerprint
 ):
     """
     Create and return a list of dictionnaries to be ingested in the Vector Database.
@@ -85,11 +91,43 @@ def create_page_data(
             LectureSchema.COURSE_LANGUAGE.value: course_language,
             LectureSchema.PAGE_NUMBER.value: page_num + 1,
             LectureSchema.PAGE_TEXT_CONTENT.value: page_split.page_content,
+            LectureSchema.PAGE_FINGERPRINT.value: fingerprint,
         }
         for page_split in page_splits
     ]
 
 
+def lecture_unit_filter(course_id, lecture_id, lecture_unit_id, base_url):
+    """
+    Filter matching all chunks of a lecture unit
+    """
+    return (
+        Filter.by_property(LectureSchema.BASE_URL.value).equal(base_url)
+        & Filter.by_property(LectureSchema.COURSE_ID.value).equal(course_id)
+        & Filter.by_property(LectureSchema.LECTURE_ID.value).equal(lecture_id)
+        & Filter.by_property(LectureSchema.LECTURE_UNIT_ID.value).equal(lecture_unit_id)
+    )
+
+
+def compute_page_fingerprint(
+    page: fitz.Page, page_text: str, previous_page_text: str, unit_metadata: str
+) -> str:
+    """
+    Hash everything the chunks of a page are created from: the unit metadata stored with
+    every chunk, the page text and, for pages with images, the rendered page and the text
+    of the previous page, which is used as context for the image interpretation.
+    """
+    fingerprint = hashlib.sha256()
+    for part in (unit_metadata, page_text):
+        fingerprint.update(part.encode("utf-8"))
+        fingerprint.update(b"\0")
+    if page.get_images(full=False):
+        fingerprint.update(previous_page_text.encode("utf-8"))
+        fingerprint.update(b"\0")
+        fingerprint.update(page.get_pixmap().samples)
+    return fingerprint.hexdigest()
+
+
 class LectureIngestionPipeline(AbstractIngestion, Pipeline):
 
     def __init__(
@@ -99,11 +137,12 @@ class LectureIngestionPipeline(AbstractIngestion, Pipeline):
         callback: ingestion_status_callback,
     ):
         super().__init__()
-        self.collection = init_lecture_schema(client)
+        self.collection = VectorDatabase().lectures
         self.dto = dto
         self.llm_vision = BasicRequestHandler("azure-gpt-4-omni")
         self.llm_chat = BasicRequestHandler("azure-gpt-35-turbo")
         self.llm_embedding = BasicRequestHandler("embedding-small")
+        self.render_policy = RenderPolicy(settings.ingestion.render)
         self.callback = callback
         request_handler = CapabilityRequestHandler(
             requirements=RequirementList(
@@ -116,30 +155,51 @@ class LectureIngestionPipeline(AbstractIngestion, Pipeline):
         self.llm = IrisLangchainChatModel(
             request_handler=request_handler, completion_args=completion_args
         )
-        self.pipeline = self.llm | StrOutputParser()
         self.tokens = []
 
     def __call__(self) -> bool:
         try:
-            self.callback.in_progress("Deleting old slides from database...")
-            self.delete_lecture_unit(
-                self.dto.lecture_unit.course_id,
-                self.dto.lecture_unit.lecture_id,
-                self.dto.lecture_unit.lecture_unit_id,
-                self.dto.settings.artemis_base_url,
+            self.callback.in_progress("Comparing slides with the database...")
+            lecture_unit = self.dto.lecture_unit
+            base_url = self.dto.settings.artemis_base_url
+            # Streamed uploads are already on disk, otherwise decode the base64 payload
+            pdf_path = lecture_unit.pdf_file_path or save_pdf(
+                lecture_unit.pdf_file_base64
             )
-            self.callback.done("Old slides removed")
-            self.callback.in_progress("Chunking and interpreting lecture...")
-            chunks = []
-            pdf_path = save_pdf(self.dto.lecture_unit.pdf_file_base64)
-            chunks.extend(
-                self.chunk_data(
+            try:
+                fingerprints = self.compute_page_fingerprints(pdf_path, lecture_unit)
+                stored_fingerprints = self.get_stored_page_fingerprints(
+                    lecture_unit, base_url
+                )
+                # Only pages whose chunks were all created from the same content are kept
+                changed_pages = [
+                    page_num
+                    for page_num, fingerprint in enumerate(fingerprints)
+                    if stored_fingerprints.get(page_num + 1) != {fingerprint}
+                ]
+                removed_pages = [
+                    page_number
+                    for page_number in stored_fingerprints
+                    if page_number > len(fingerprints)
+                ]
+                self.delete_pages(
+                    lecture_unit,
+                    base_url,
+                    [page_num + 1 for page_num in changed_pages] + removed_pages,
+                )
+                self.callback.done(
+                    f"Old slides removed, {len(changed_pages)} of {len(fingerprints)} slides changed"
+                )
+                self.callback.in_progress("Chunking and interpreting lecture...")
+                chunks = self.chunk_data(
                     lecture_pdf=pdf_path,
-                    lecture_unit_dto=self.dto.lecture_unit,
-                    base_url=self.dto.settings.artemis_base_url,
+                    lecture_unit_dto=lecture_unit,
+                    base_url=base_url,
+                    page_fingerprints=fingerprints,
+                    page_nums=changed_pages,
                 )
-            )
-            cleanup_temporary_file(pdf_path)
+            finally:
+                cleanup_temporary_file(pdf_path)
             self.callback.done("Lecture Chunking and interpretation Finished")
             self.callback.in_progress("Ingesting lecture chunks into database...")
             self.batch_update(chunks)
@@ -165,73 +225,230 @@ class LectureIngestionPipeline(AbstractIngestion, Pipeline):
         Weaviate limitation.
         """
         global batch_update_lock
-        with batch_update_lock:
-            with self.collection.batch.rate_limit(requests_per_minute=600) as batch:
-                try:
-                    for index, chunk in enumerate(chunks):
-                        embed_chunk = self.llm_embedding.embed(
-                            chunk[LectureSchema.PAGE_TEXT_CONTENT.value]
-                        )
-                        batch.add_object(properties=chunk, vector=embed_chunk)
-                except Exception as e:
-                    logger.error(f"Error updating lecture unit: {e}")
-                    self.callback.error(
-                        f"Failed to ingest lectures into the database: {e}",
-                        exception=e,
-                        tokens=self.tokens,
-                    )
+        if not chunks:
+            return
+        try:
+            # Embed all chunks in as few requests as possible before taking the lock
+            embeddings = self.llm_embedding.embed_many(
+                [chunk[LectureSchema.PAGE_TEXT_CONTENT.value] for chunk in chunks]
+            )
+            with batch_update_lock:
+                with self.collection.batch.rate_limit(requests_per_minute=600) as batch:
+                    for chunk, embedding in zip(chunks, embeddings):
+                        batch.add_object(properties=chunk, vector=embedding)
+        except Exception as e:
+            logger.error(f"Error updating lecture unit: {e}")
+            self.callback.error(
+                f"Failed to ingest lectures into the database: {e}",
+                exception=e,
+                tokens=self.tokens,
+            )
+
+    def compute_page_fingerprints(
+        self, lecture_pdf: str, lecture_unit_dto: LectureUnitDTO
+    ) -> list[str]:
+        """
+        Compute the fingerprint of every page of the lecture
+        """
+        unit_metadata = "\0".join(
+            str(value)
+            for value in (
+                FINGERPRINT_VERSION,
+                lecture_unit_dto.lecture_name,
+                lecture_unit_dto.lecture_unit_name,
+                lecture_unit_dto.lecture_unit_link,
+                lecture_unit_dto.course_name,
+                lecture_unit_dto.course_description,
+            )
+        )
+        doc = fitz.open(lecture_pdf)
+        try:
+            page_texts = [page.get_text() for page in doc]
+            return [
+                compute_page_fingerprint(
+                    doc.load_page(page_num),
+                    page_texts[page_num],
+                    page_texts[page_num - 1] if page_num > 0 else "",
+                    unit_metadata,
+                )
+                for page_num in range(doc.page_count)
+            ]
+        finally:
+            doc.close()
+
+    def get_stored_page_fingerprints(
+        self, lecture_unit_dto: LectureUnitDTO, base_url: str
+    ) -> dict[int, set[Optional[str]]]:
+        """
+        Get the fingerprints of the chunks stored for each page number of the lecture unit
+        """
+        result = self.collection.query.fetch_objects(
+            filters=lecture_unit_filter(
+                lecture_unit_dto.course_id,
+                lecture_unit_dto.lecture_id,
+                lecture_unit_dto.lecture_unit_id,
+                base_url,
+            ),
+            limit=MAX_CHUNKS_PER_LECTURE_UNIT,
+            return_properties=[
+                LectureSchema.PAGE_NUMBER.value,
+                LectureSchema.PAGE_FINGERPRINT.value,
+            ],
+        )
+        fingerprints = {}
+        for obj in result.objects:
+            fingerprints.setdefault(
+                obj.properties[LectureSchema.PAGE_NUMBER.value], set()
+            ).add(obj.properties.get(LectureSchema.PAGE_FINGERPRINT.value))
+        return fingerprints
+
+    def delete_pages(
+        self, lecture_unit_dto: LectureUnitDTO, base_url: str, page_numbers: list[int]
+    ):
+        """
+        Delete the chunks of the given pages of the lecture unit
+        """
+        if not page_numbers:
+            return
+        self.collection.data.delete_many(
+            where=lecture_unit_filter(
+                lecture_unit_dto.course_id,
+                lecture_unit_dto.lecture_id,
+                lecture_unit_dto.lecture_unit_id,
+                base_url,
+            )
+            & Filter.by_property(LectureSchema.PAGE_NUMBER.value).contains_any(
+                page_numbers
+            )
+        )
 
     def chunk_data(
         self,
         lecture_pdf: str,
         lecture_unit_dto: LectureUnitDTO = None,
         base_url: str = None,
+        page_fingerprints: list[str] = None,
+        page_nums: Optional[list[int]] = None,
     ):
         """
-        Chunk the data from the lecture into smaller pieces
+        Chunk the data from the lecture into smaller pieces.
+        If page_nums is given, only these pages (zero-based) are chunked.
         """
         doc = fitz.open(lecture_pdf)
-        course_language = self.get_course_language(
-            doc.load_page(min(5, doc.page_count - 1)).get_text()
-        )
+        try:
+            if page_nums is None:
+                page_nums = list(range(doc.page_count))
+            if not page_nums:
+                return []
+            course_language = self.get_course_language(
+                doc.load_page(min(5, doc.page_count - 1)).get_text()
+            )
+            raw_page_texts = [
+                doc.load_page(page_num).get_text() for page_num in range(doc.page_count)
+            ]
+            # PyMuPDF documents must not be used by multiple threads at the same time
+            doc_lock = threading.Lock()
+
+            def process_page(page_num: int) -> tuple[str, bool]:
+                return self.process_page(
+                    doc,
+                    doc_lock,
+                    page_num,
+                    raw_page_texts[page_num],
+                    raw_page_texts[page_num - 1] if page_num > 0 else "",
+                    lecture_unit_dto.lecture_name,
+                    course_language,
+                )
+
+            # Pages are interpreted concurrently, map keeps them in page order
+            with ThreadPoolExecutor(
+                max_workers=settings.ingestion.page_parallelism
+            ) as executor:
+                pages = list(executor.map(process_page, page_nums))
+        finally:
+            doc.close()
+
         data = []
         text_splitter = RecursiveCharacterTextSplitter(
             chunk_size=512, chunk_overlap=102
         )
-        old_page_text = ""
-        for page_num in range(doc.page_count):
-            page = doc.load_page(page_num)
-            page_text = page.get_text()
-            if page.get_images(full=False):
-                # more pixels thus more details and better quality
-                matrix = fitz.Matrix(5, 5)
-                pix = page.get_pixmap(matrix=matrix)
-                img_bytes = pix.tobytes("jpg")
-                img_base64 = base64.b64encode(img_bytes).decode("utf-8")
-                image_interpretation = self.interpret_image(
-                    img_base64,
-                    old_page_text,
-                    lecture_unit_dto.lecture_name,
-                    course_language,
-                )
-                page_text = self.merge_page_content_and_image_interpretation(
-                    page_text, image_interpretation
-                )
+        for page_num, (page_text, interpreted) in zip(page_nums, pages):
             page_splits = text_splitter.create_documents([page_text])
+            # Pages whose interpretation failed get no fingerprint, so they are retried next time
+            fingerprint = (
+                page_fingerprints[page_num]
+                if page_fingerprints and interpreted
+                else None
+            )
             data.extend(
                 create_page_data(
-                    page_num, page_splits, lecture_unit_dto, course_language, base_url
+                    page_num,
+                    page_splits,
+                    lecture_unit_dto,
+                    course_language,
+                    base_url,
+                    fingerprint,
                 )
             )
-            old_page_text = page_text
         return data
 
+    def process_page(
+        self,
+        doc: fitz.Document,
+        doc_lock: threading.Lock,
+        page_num: int,
+        page_text: str,
+        previous_page_text: str,
+        name_of_lecture: str,
+        course_language: str,
+    ) -> tuple[str, bool]:
+        """
+        Render a page and merge the interpretation of its images into the page text.
+        The raw text of the previous page is used as context for the interpretation.
+        Pages that were interpreted before, e.g. in a copied lecture, are served from the cache.
+        Returns the page text and whether the page was interpreted successfully or had no images.
+        """
+        cache = InterpretationCache()
+        with doc_lock:
+            page = doc.load_page(page_num)
+            if not page.get_images(full=False):
+                return page_text, True
+            # The low resolution render identifies the page, it also contains the page text
+            cache_key = interpretation_cache_key(
+                page.get_pixmap().samples,
+                INTERPRETATION_PROMPT_VERSION,
+                course_language,
+            )
+        cached_page_text = cache.get(cache_key)
+        if cached_page_text is not None:
+            return cached_page_text, True
+        with doc_lock:
+            # Render only as many pixels as the vision model actually uses
+            rendered_page = self.render_policy.render(page)
+        image_interpretation = self.interpret_image(
+            rendered_page.image_base64,
+            previous_page_text,
+            name_of_lecture,
+            course_language,
+            rendered_page.detail,
+        )
+        merged_page_text = self.merge_page_content_and_image_interpretation(
+            page_text, image_interpretation
+        )
+        # Failed interpretations are neither cached nor fingerprinted, so they are retried
+        # on the next ingestion
+        if image_interpretation is None:
+            return merged_page_text, False
+        cache.put(cache_key, merged_page_text)
+        return merged_page_text, True
+
     def interpret_image(
         self,
         img_base64: str,
         last_page_content: str,
         name_of_lecture: str,
         course_language: str,
+        detail: Optional[str] = None,
     ):
         """
         Interpret the image passed
@@ -245,7 +462,7 @@ class LectureIngestionPipeline(AbstractIngestion, Pipeline):
             f" Only repond with the slide explanation and interpretation in {course_language}, "
             f"do not add anything else to your response.Your explanation should not exceed 350 words."
         )
-        image = ImageMessageContentDTO(base64=img_base64)
+        image = ImageMessageContentDTO(base64=img_base64, detail=detail)
         iris_message = PyrisMessage(
             sender=IrisMessageRole.USER, contents=[image_interpretation_prompt, image]
         )
@@ -267,27 +484,25 @@ class LectureIngestionPipeline(AbstractIngestion, Pipeline):
         """
         Merge the text and image together
         """
-        dirname = os.path.dirname(__file__)
-        prompt_file_path = os.path.join(
-            dirname, ".", "prompts", "content_image_interpretation_merge_prompt.txt"
-        )
-        with open(prompt_file_path, "r") as file:
-            logger.info("Loading ingestion prompt...")
-            lecture_ingestion_prompt = file.read()
-        prompt = ChatPromptTemplate.from_messages(
-            [
-                ("system", lecture_ingestion_prompt),
-            ]
+        prompt = PromptRegistry().get_system_template(
+            "content_image_interpretation_merge_prompt"
         )
-        prompt_val = prompt.format_messages(
-            page_content=page_content,
-            image_interpretation=image_interpretation,
+        # Pages are merged concurrently, so every call needs its own model to track its tokens
+        llm = IrisLangchainChatModel(
+            request_handler=self.llm.request_handler,
+            completion_args=self.llm.completion_args,
         )
-        prompt = ChatPromptTemplate.from_messages(prompt_val)
         clean_output = clean(
-            (prompt | self.pipeline).invoke({}), bullets=True, extra_whitespace=True
+            (prompt | llm | StrOutputParser()).invoke(
+                {
+                    "page_content": page_content,
+                    "image_interpretation": image_interpretation,
+                }
+            ),
+            bullets=True,
+            extra_whitespace=True,
         )
-        self._append_tokens(self.llm.tokens, PipelineEnum.IRIS_LECTURE_INGESTION)
+        self._append_tokens(llm.tokens, PipelineEnum.IRIS_LECTURE_INGESTION)
         return clean_output
 
     def get_course_language(self, page_content: str) -> str:
@@ -337,11 +552,8 @@ class LectureIngestionPipeline(AbstractIngestion, Pipeline):
         """
         try:
             self.collection.data.delete_many(
-                where=Filter.by_property(LectureSchema.BASE_URL.value).equal(base_url)
-                & Filter.by_property(LectureSchema.COURSE_ID.value).equal(course_id)
-                & Filter.by_property(LectureSchema.LECTURE_ID.value).equal(lecture_id)
-                & Filter.by_property(LectureSchema.LECTURE_UNIT_ID.value).equal(
-                    lecture_unit_id
+                where=lecture_unit_filter(
+                    course_id, lecture_id, lecture_unit_id, base_url
                 )
             )
             return True
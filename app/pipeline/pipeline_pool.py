@@ -0,0 +1,141 @@
+import logging
+import threading
+from concurrent.futures import Future
+from contextlib import contextmanager
+from typing import Iterator, List, Optional, TypeVar
+
+from ..common import Singleton
+from ..common.token_usage_dto import TokenUsageDTO
+from ..config import settings
+from ..web.status.status_update import StatusCallback
+
+logger = logging.getLogger(__name__)
+
+PipelineType = TypeVar("PipelineType")
+
+
+class ChatRunContext:
+    """
+    State of a single run of a chat pipeline.
+    Keeping it apart from the pipeline allows the pipeline to be reused for later runs.
+    """
+
+    callback: StatusCallback
+    event: str | None
+    tokens: List[TokenUsageDTO]
+    retrieved_paragraphs: Optional[List[dict]]
+    retrieved_faqs: Optional[List[dict]]
+    # Background work of the run that still uses the pipeline, e.g. a discarded speculative retrieval
+    pending: List[Future]
+
+    def __init__(self, callback: StatusCallback, event: str | None = None):
+        self.callback = callback
+        self.event = event
+        self.tokens = []
+        self.retrieved_paragraphs = None
+        self.retrieved_faqs = None
+        self.pending = []
+
+
+class RunContextMixin:
+    """
+    Mixin for pipelines that keep their per-run state in a ChatRunContext.
+    The state of the current run is accessible as attributes of the pipeline.
+    """
+
+    run_context: Optional[ChatRunContext] = None
+
+    def start_run(self, callback: StatusCallback, event: str | None = None):
+        """Prepare the pipeline for a new run, nothing of a previous run is kept"""
+        self.run_context = ChatRunContext(callback, event)
+        self.reset_run_state()
+
+    def end_run(self):
+        self.run_context = None
+
+    def reset_run_state(self):
+        """Reset the state that sub-pipelines keep between runs, e.g. their tokens"""
+        pass
+
+    @property
+    def callback(self) -> StatusCallback:
+        return self.run_context.callback
+
+    @property
+    def event(self) -> str | None:
+        return self.run_context.event
+
+    @property
+    def tokens(self) -> List[TokenUsageDTO]:
+        return self.run_context.tokens
+
+    @tokens.setter
+    def tokens(self, tokens: List[TokenUsageDTO]):
+        self.run_context.tokens = tokens
+
+    @property
+    def retrieved_paragraphs(self) -> Optional[List[dict]]:
+        return self.run_context.retrieved_paragraphs
+
+    @retrieved_paragraphs.setter
+    def retrieved_paragraphs(self, retrieved_paragraphs: Optional[List[dict]]):
+        self.run_context.retrieved_paragraphs = retrieved_paragraphs
+
+    @property
+    def retrieved_faqs(self) -> Optional[List[dict]]:
+        return self.run_context.retrieved_faqs
+
+    @retrieved_faqs.setter
+    def retrieved_faqs(self, retrieved_faqs: Optional[List[dict]]):
+        self.run_context.retrieved_faqs = retrieved_faqs
+
+
+class PipelinePool(metaclass=Singleton):
+    """
+    Keeps constructed pipelines per pipeline class and variant, so building the pipeline,
+    its sub-pipelines, models and database handles does not happen on every request.
+    A pipeline is checked out exclusively by one run and returned to the pool afterwards.
+    """
+
+    def __init__(self):
+        self.max_idle = settings.pipeline_pool.max_idle
+        self.lock = threading.Lock()
+        self.idle: dict[tuple, list] = {}
+
+    @contextmanager
+    def checkout(
+        self,
+        pipeline_class: type[PipelineType],
+        variant: str,
+        callback: StatusCallback,
+        event: str | None = None,
+    ) -> Iterator[PipelineType]:
+        """Check out a pipeline prepared for a run with the given callback and event"""
+        key = (pipeline_class, variant)
+        with self.lock:
+            idle = self.idle.get(key)
+            pipeline = idle.pop() if idle else None
+        if pipeline is None:
+            logger.info(f"Creating {pipeline_class.__name__} ({variant}) for the pool")
+            pipeline = pipeline_class(callback=None, variant=variant)
+        pipeline.start_run(callback, event)
+        run_context = pipeline.run_context
+        try:
+            yield pipeline
+        finally:
+            pipeline.end_run()
+        # A pipeline whose run raised may be left in an inconsistent state and is not reused
+        self._check_in_when_done(key, pipeline, run_context.pending)
+
+    def _check_in_when_done(self, key: tuple, pipeline, pending: List[Future]):
+        """Return the pipeline to the pool once the background work of its run is done"""
+        for future in pending:
+            if not future.done():
+                future.add_done_callback(
+                    lambda _: self._check_in_when_done(key, pipeline, pending)
+                )
+                return
+        with self.lock:
+            idle = self.idle.setdefault(key, [])
+            if len(idle) < self.max_idle:
+                idle.append(pipeline)
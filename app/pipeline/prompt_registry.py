@@ -0,0 +1,80 @@
+import logging
+import os
+import threading
+
+from langchain_core.prompts import ChatPromptTemplate, PromptTemplate
+
+from ..common import Singleton
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+PROMPTS_DIRECTORY = os.path.join(os.path.dirname(__file__), "prompts")
+
+
+class PromptRegistry(metaclass=Singleton):
+    """
+    Process-wide registry of the prompt templates stored as .txt files in the prompts directory.
+    All files are read once when the registry is created and templates are only built once,
+    so pipelines can fetch them on every request without touching the disk.
+    With prompts.hot_reload enabled, changed files are picked up on the next access.
+    """
+
+    def __init__(self):
+        self.hot_reload = settings.prompts.hot_reload
+        self.lock = threading.Lock()
+        self.prompts: dict[str, str] = {}
+        self.modified_times: dict[str, float] = {}
+        self.templates: dict[tuple, PromptTemplate | ChatPromptTemplate] = {}
+        for file_name in sorted(os.listdir(PROMPTS_DIRECTORY)):
+            if file_name.endswith(".txt"):
+                self._load(file_name[: -len(".txt")])
+        logger.info(f"Loaded {len(self.prompts)} prompts")
+
+    def _load(self, name: str):
+        path = os.path.join(PROMPTS_DIRECTORY, f"{name}.txt")
+        with open(path, "r") as file:
+            self.prompts[name] = file.read()
+        self.modified_times[name] = os.path.getmtime(path)
+        # Drop the templates built from the previous version of the prompt
+        self.templates = {
+            key: template for key, template in self.templates.items() if key[0] != name
+        }
+
+    def _reload_if_modified(self, name: str):
+        path = os.path.join(PROMPTS_DIRECTORY, f"{name}.txt")
+        if os.path.getmtime(path) != self.modified_times.get(name):
+            logger.info(f"Reloading prompt {name}...")
+            self._load(name)
+
+    def get_prompt(self, name: str) -> str:
+        """Get the raw text of the prompt with the given file name, without the .txt extension"""
+        with self.lock:
+            if self.hot_reload:
+                self._reload_if_modified(name)
+            return self.prompts[name]
+
+    def _get_template(self, key: tuple, build):
+        prompt = self.get_prompt(key[0])
+        with self.lock:
+            template = self.templates.get(key)
+            if template is None:
+                template = build(prompt)
+                self.templates[key] = template
+            return template
+
+    def get_template(self, name: str, **partial_variables: str) -> PromptTemplate:
+        """Get the prompt as PromptTemplate, optionally with some variables already filled in"""
+        return self._get_template(
+            (name, "text", tuple(sorted(partial_variables.items()))),
+            lambda prompt: PromptTemplate.from_template(
+                prompt, partial_variables=partial_variables
+            ),
+        )
+
+    def get_system_template(self, name: str) -> ChatPromptTemplate:
+        """Get the prompt as ChatPromptTemplate consisting of a single system message"""
+        return self._get_template(
+            (name, "system"),
+            lambda prompt: ChatPromptTemplate.from_messages([("system", prompt)]),
+        )
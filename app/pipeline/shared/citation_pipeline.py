@@ -1,16 +1,16 @@
-import os
 from asyncio.log import logger
 from enum import Enum
 from typing import List, Union
 
 from langchain_core.output_parsers import StrOutputParser
-from langchain_core.prompts import ChatPromptTemplate, PromptTemplate
+from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.runnables import Runnable
 
 from app.llm import CapabilityRequestHandler, RequirementList, CompletionArguments
 from app.common.PipelineEnum import PipelineEnum
 from app.llm.langchain import IrisLangchainChatModel
 from app.pipeline import Pipeline
+from app.pipeline.prompt_registry import PromptRegistry
 from app.vector_database.faq_schema import FaqSchema
 
 from app.vector_database.lecture_schema import LectureSchema
@@ -26,7 +26,6 @@ class CitationPipeline(Pipeline):
 
     llm: IrisLangchainChatModel
     pipeline: Runnable
-    prompt_str: str
     prompt: ChatPromptTemplate
 
     def __init__(self):
@@ -41,15 +40,6 @@ class CitationPipeline(Pipeline):
             request_handler=request_handler,
             completion_args=CompletionArguments(temperature=0, max_tokens=4000),
         )
-        dirname = os.path.dirname(__file__)
-        prompt_file_path = os.path.join(dirname, "..", "prompts", "citation_prompt.txt")
-        with open(prompt_file_path, "r") as file:
-            self.lecture_prompt_str = file.read()
-        prompt_file_path = os.path.join(
-            dirname, "..", "prompts", "faq_citation_prompt.txt"
-        )
-        with open(prompt_file_path, "r") as file:
-            self.faq_prompt_str = file.read()
         self.pipeline = self.llm | StrOutputParser()
         self.tokens = []
 
@@ -114,16 +104,12 @@ class CitationPipeline(Pipeline):
             paras = self.create_formatted_faq_string(
                 information, kwargs.get("base_url")
             )
-            self.prompt_str = self.faq_prompt_str
+            self.default_prompt = PromptRegistry().get_template("faq_citation_prompt")
         if information_type == InformationType.PARAGRAPHS:
             paras = self.create_formatted_lecture_string(information)
-            self.prompt_str = self.lecture_prompt_str
+            self.default_prompt = PromptRegistry().get_template("citation_prompt")
 
         try:
-            self.default_prompt = PromptTemplate(
-                template=self.prompt_str,
-                input_variables=["Answer", "Paragraphs"],
-            )
             response = (self.default_prompt | self.pipeline).invoke(
                 {"Answer": answer, "Paragraphs": paras}
             )
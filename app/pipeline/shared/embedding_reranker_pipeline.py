@@ -0,0 +1,57 @@
+import logging
+from typing import List, Optional, Union
+
+import numpy as np
+from langchain_core.prompts import PromptTemplate
+from langsmith import traceable
+
+from app.common.pyris_message import PyrisMessage
+from app.config import settings
+from app.llm import BasicRequestHandler
+from app.pipeline.shared.reranker import Reranker, get_paragraph_texts
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingRerankerPipeline(Reranker):
+    """
+    Fast reranker that ranks the paragraphs by the cosine similarity of their embeddings to the
+    embedding of the query, without an LLM call. Paragraph embeddings usually come from the
+    embedding cache, as the same chunks were embedded during ingestion.
+    """
+
+    def __init__(self):
+        super().__init__(implementation_id="embedding_reranker_pipeline")
+        self.llm_embedding = BasicRequestHandler("embedding-small")
+        self.top_k = settings.retrieval.embedding_reranker_top_k
+        self.min_similarity = settings.retrieval.embedding_reranker_min_similarity
+        self.tokens = []
+
+    @traceable(name="Lecture Retrieval: Embedding Paragraph Selection")
+    def __call__(
+        self,
+        paragraphs: Union[List[dict], List[str]],
+        query: str,
+        prompt: Optional[PromptTemplate] = None,
+        chat_history: list[PyrisMessage] = None,
+        **kwargs,
+    ) -> List[int]:
+        """
+        Runs the pipeline, the prompt and the chat history are not used
+            :param paragraphs: List of paragraphs which can be list of dicts or list of strings
+            :param query: The query
+            :return: Indices of the selected paragraphs, most similar first
+        """
+        texts = get_paragraph_texts(paragraphs)
+        embeddings = np.asarray(
+            self.llm_embedding.embed_many([query] + texts), dtype=np.float32
+        )
+        norms = np.linalg.norm(embeddings, axis=1)
+        norms[norms == 0] = 1.0
+        embeddings /= norms[:, np.newaxis]
+        similarities = embeddings[1:] @ embeddings[0]
+
+        ranking = np.argsort(-similarities, kind="stable")[: self.top_k]
+        selected = [int(i) for i in ranking if similarities[i] >= self.min_similarity]
+        logger.debug(f"Selected paragraphs {selected} of {len(texts)}")
+        return selected
@@ -0,0 +1,40 @@
+from abc import abstractmethod
+from typing import List, Optional, Union
+
+from langchain_core.prompts import PromptTemplate
+
+from app.common.pyris_message import PyrisMessage
+from app.pipeline import Pipeline
+from app.vector_database.lecture_schema import LectureSchema
+
+
+def get_paragraph_texts(paragraphs: Union[List[dict], List[str]]) -> List[str]:
+    """Get the texts of paragraphs given as lecture chunks or as strings"""
+    if paragraphs and isinstance(paragraphs[0], dict):
+        return [
+            paragraph.get(LectureSchema.PAGE_TEXT_CONTENT.value, "")
+            for paragraph in paragraphs
+        ]
+    elif paragraphs and isinstance(paragraphs[0], str):
+        return list(paragraphs)
+    raise ValueError(
+        "Invalid input type for paragraphs. Must be a list of dictionaries or a list of strings."
+    )
+
+
+class Reranker(Pipeline):
+    """
+    Interface of the rerankers, which select the paragraphs that are relevant to a query.
+    The indices of the selected paragraphs are returned, sorted from most to least relevant.
+    """
+
+    @abstractmethod
+    def __call__(
+        self,
+        paragraphs: Union[List[dict], List[str]],
+        query: str,
+        prompt: Optional[PromptTemplate] = None,
+        chat_history: list[PyrisMessage] = None,
+        **kwargs,
+    ) -> List[int]:
+        raise NotImplementedError
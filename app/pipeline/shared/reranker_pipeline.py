@@ -1,4 +1,3 @@
-import os
 from asyncio.log import logger
 from typing import Optional, List, Union
 
@@ -11,19 +10,20 @@ from app.common.pyris_message import PyrisMessage
 from app.llm import CapabilityRequestHandler, RequirementList, CompletionArguments
 from app.common.PipelineEnum import PipelineEnum
 from app.llm.langchain import IrisLangchainChatModel
-from app.pipeline import Pipeline
+from app.config import settings
+from app.pipeline.prompt_registry import PromptRegistry
 from app.pipeline.chat.output_models.output_models.selected_paragraphs import (
     SelectedParagraphs,
 )
-from app.vector_database.lecture_schema import LectureSchema
+from app.pipeline.shared.embedding_reranker_pipeline import EmbeddingRerankerPipeline
+from app.pipeline.shared.reranker import Reranker, get_paragraph_texts
 
 
-class RerankerPipeline(Pipeline):
+class RerankerPipeline(Reranker):
     """A generic reranker pipeline that can be used to rerank a list of documents based on a question"""
 
     llm: IrisLangchainChatModel
     pipeline: Runnable
-    prompt_str: str
     prompt: ChatPromptTemplate
 
     def __init__(self):
@@ -38,22 +38,10 @@ class RerankerPipeline(Pipeline):
             request_handler=request_handler,
             completion_args=CompletionArguments(temperature=0, max_tokens=4000),
         )
-        dirname = os.path.dirname(__file__)
-        prompt_file_path = os.path.join(dirname, "..", "prompts", "reranker_prompt.txt")
-        with open(prompt_file_path, "r") as file:
-            logger.info("Loading reranker prompt...")
-            prompt_str = file.read()
-
         self.output_parser = PydanticOutputParser(pydantic_object=SelectedParagraphs)
-        self.default_prompt = PromptTemplate(
-            template=prompt_str,
-            input_variables=[
-                "question",
-                "paragraphs" "chat_history",
-            ],
-            partial_variables={
-                "format_instructions": self.output_parser.get_format_instructions()
-            },
+        self.default_prompt = PromptRegistry().get_template(
+            "reranker_prompt",
+            format_instructions=self.output_parser.get_format_instructions(),
         )
         logger.debug(self.output_parser.get_format_instructions())
         self.pipeline = self.llm | self.output_parser
@@ -73,27 +61,16 @@ class RerankerPipeline(Pipeline):
         prompt: Optional[PromptTemplate] = None,
         chat_history: list[PyrisMessage] = None,
         **kwargs,
-    ) -> List[str]:
+    ) -> List[int]:
         """
         Runs the pipeline
             :param paragraphs: List of paragraphs which can be list of dicts or list of strings
             :param query: The query
             :return: Selected file content
         """
-        # Determine if paragraphs are a list of dicts or strings and prepare data accordingly
         paras = ""
-        if paragraphs and isinstance(paragraphs[0], dict):
-            for i, paragraph in enumerate(paragraphs):
-                paras += "Paragraph {}:\n{}\n".format(
-                    str(i), paragraph.get(LectureSchema.PAGE_TEXT_CONTENT.value, "")
-                )
-        elif paragraphs and isinstance(paragraphs[0], str):
-            for i, paragraph in enumerate(paragraphs):
-                paras += "Paragraph {}:\n{}\n".format(str(i), paragraph)
-        else:
-            raise ValueError(
-                "Invalid input type for paragraphs. Must be a list of dictionaries or a list of strings."
-            )
+        for i, paragraph in enumerate(get_paragraph_texts(paragraphs)):
+            paras += "Paragraph {}:\n{}\n".format(str(i), paragraph)
 
         text_chat_history = [
             chat_history[-i - 1].contents[0].text_content
@@ -112,3 +89,14 @@ class RerankerPipeline(Pipeline):
         response = (prompt | self.pipeline).invoke(data)
         self._append_tokens(self.llm.tokens, PipelineEnum.IRIS_RERANKER_PIPELINE)
         return response.selected_paragraphs
+
+
+def create_reranker(mode: Optional[str] = None) -> Reranker:
+    """
+    Create the reranker for the given mode, "llm" or "embedding".
+    Without a mode, the default of the retrieval settings is used.
+    """
+    mode = mode or settings.retrieval.reranker
+    if mode == "embedding":
+        return EmbeddingRerankerPipeline()
+    return RerankerPipeline()
@@ -1,13 +1,13 @@
 import logging
-import os
 
 from langchain_core.output_parsers import StrOutputParser
-from langchain_core.prompts import ChatPromptTemplate, SystemMessagePromptTemplate
+from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.runnables import Runnable
 
 from ...llm import CapabilityRequestHandler, RequirementList
 from ...llm.langchain import IrisLangchainCompletionModel
 from ...pipeline import Pipeline
+from ...pipeline.prompt_registry import PromptRegistry
 
 logger = logging.getLogger(__name__)
 
@@ -17,7 +17,6 @@ class SummaryPipeline(Pipeline):
 
     llm: IrisLangchainCompletionModel
     pipeline: Runnable
-    prompt_str: str
     prompt: ChatPromptTemplate
 
     def __init__(self):
@@ -32,17 +31,8 @@ class SummaryPipeline(Pipeline):
         self.llm = IrisLangchainCompletionModel(
             request_handler=request_handler, max_tokens=1000
         )
-        # Load the prompt from a file
-        dirname = os.path.dirname(__file__)
-        with open(os.path.join(dirname, "../prompts/summary_prompt.txt"), "r") as file:
-            logger.info("Loading summary prompt...")
-            self.prompt_str = file.read()
-        # Create the prompt
-        self.prompt = ChatPromptTemplate.from_messages(
-            [
-                SystemMessagePromptTemplate.from_template(self.prompt_str),
-            ]
-        )
+        # Get the prompt from the registry
+        self.prompt = PromptRegistry().get_system_template("summary_prompt")
         # Create the pipeline
         self.pipeline = self.prompt | self.llm | StrOutputParser()
         self.tokens = []
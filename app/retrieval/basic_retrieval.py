@@ -1,14 +1,20 @@
 from abc import abstractmethod, ABC
 from typing import List, Optional
+from uuid import UUID
 from langsmith import traceable
 from weaviate import WeaviateClient
 from weaviate.classes.query import Filter
+from weaviate.collections import Collection
 from app.common.token_usage_dto import TokenUsageDTO
 from app.common.PipelineEnum import PipelineEnum
+from ..config import settings
 from ..common.message_converters import convert_iris_message_to_langchain_message
 from ..common.pyris_message import PyrisMessage
 from ..llm.langchain import IrisLangchainChatModel
 from ..pipeline import Pipeline
+from ..vector_database.database import VectorDatabase
+from .fused_search import fused_hybrid_search
+from .semantic_query_cache import SemanticQueryCache
 from app.llm import (
     BasicRequestHandler,
     CompletionArguments,
@@ -17,28 +23,21 @@ from app.llm import (
 )
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.prompts import ChatPromptTemplate, SystemMessagePromptTemplate
-import concurrent.futures
+import asyncio
 import logging
 
 logger = logging.getLogger(__name__)
 
 
-def merge_retrieved_chunks(
-    basic_retrieved_faq_chunks, hyde_retrieved_faq_chunks
-) -> List[dict]:
+def merge_retrieved_objects(*responses: list) -> list:
     """
-    Merge the retrieved chunks from the basic and hyde retrieval methods. This function ensures that for any
-    duplicate IDs, the properties from hyde_retrieved_faq_chunks will overwrite those from
-    basic_retrieved_faq_chunks.
+    Merge the objects returned by several searches, keeping the first occurrence of every object.
     """
-    merged_chunks = {}
-    for chunk in basic_retrieved_faq_chunks:
-        merged_chunks[chunk["id"]] = chunk["properties"]
-
-    for chunk in hyde_retrieved_faq_chunks:
-        merged_chunks[chunk["id"]] = chunk["properties"]
-
-    return [properties for uuid, properties in merged_chunks.items()]
+    merged = {}
+    for objects in responses:
+        for obj in objects:
+            merged.setdefault(obj.uuid, obj)
+    return list(merged.values())
 
 
 def _add_last_four_messages_to_prompt(
@@ -74,7 +73,7 @@ class BaseRetrieval(Pipeline, ABC):
         """Muss in der konkreten Implementierung überschrieben werden"""
         pass
 
-    def __init__(self, client: WeaviateClient, schema_init_func, **kwargs):
+    def __init__(self, client: WeaviateClient, collection: Collection, **kwargs):
         super().__init__(
             implementation_id=kwargs.get("implementation_id", "base_retrieval_pipeline")
         )
@@ -91,7 +90,8 @@ class BaseRetrieval(Pipeline, ABC):
         )
         self.llm_embedding = BasicRequestHandler("embedding-small")
         self.pipeline = self.llm | StrOutputParser()
-        self.collection = schema_init_func(client)
+        self.collection = collection
+        self.async_collection = VectorDatabase().get_async_collection(collection.name)
         self.tokens = []
 
     @traceable(name="Retrieval: Question Assessment")
@@ -126,8 +126,7 @@ class BaseRetrieval(Pipeline, ABC):
         except Exception as e:
             raise e
 
-    @traceable(name="Retrieval: Rewrite Student Query")
-    def rewrite_student_query(
+    def _create_rewrite_prompt(
         self,
         chat_history: list[PyrisMessage],
         student_query: str,
@@ -135,11 +134,7 @@ class BaseRetrieval(Pipeline, ABC):
         course_name: str,
         initial_prompt: str,
         rewrite_prompt: str,
-        pipeline_enum: PipelineEnum,
-    ) -> str:
-        """
-        Rewrite the student query.
-        """
+    ) -> ChatPromptTemplate:
         prompt = ChatPromptTemplate.from_messages(
             [
                 ("system", initial_prompt),
@@ -152,18 +147,53 @@ class BaseRetrieval(Pipeline, ABC):
             course_name=course_name,
             student_query=student_query,
         )
-        prompt = ChatPromptTemplate.from_messages(prompt_val)
-        try:
-            response = (prompt | self.pipeline).invoke({})
-            token_usage = self.llm.tokens
-            token_usage.pipeline = pipeline_enum
-            self.tokens.append(self.llm.tokens)
-            return response
-        except Exception as e:
-            raise e
+        return ChatPromptTemplate.from_messages(prompt_val)
+
+    @traceable(name="Retrieval: Rewrite Student Query")
+    async def arewrite_student_query(
+        self,
+        chat_history: list[PyrisMessage],
+        student_query: str,
+        course_language: str,
+        course_name: str,
+        initial_prompt: str,
+        rewrite_prompt: str,
+        pipeline_enum: PipelineEnum,
+    ) -> str:
+        """
+        Rewrite the student query on the event loop.
+        """
+        prompt = self._create_rewrite_prompt(
+            chat_history,
+            student_query,
+            course_language,
+            course_name,
+            initial_prompt,
+            rewrite_prompt,
+        )
+        response = await (prompt | self.llm).ainvoke({})
+        # Taken from the message, self.llm.tokens may already belong to a concurrent call
+        token_usage = response.response_metadata["token_usage"]
+        token_usage.pipeline = pipeline_enum
+        self.tokens.append(token_usage)
+        return response.content
+
+    def _create_filter(
+        self,
+        course_id: Optional[int],
+        base_url: Optional[str],
+        course_id_property: str,
+        base_url_property: str,
+    ):
+        filter_weaviate = None
+        if course_id:
+            filter_weaviate = Filter.by_property(course_id_property).equal(course_id)
+            if base_url:
+                filter_weaviate &= Filter.by_property(base_url_property).equal(base_url)
+        return filter_weaviate
 
     @traceable(name="Retrieval: Search in DB")
-    def search_in_db(
+    async def asearch_in_db(
         self,
         query: str,
         hybrid_factor: float,
@@ -175,18 +205,15 @@ class BaseRetrieval(Pipeline, ABC):
         base_url_property: str = "base_url",
     ):
         """
-        Search the database for the given query.
+        Search the database for the given query with the async Weaviate client.
         """
         logger.info(f"Searching in the database for query: {query}")
-        filter_weaviate = None
-
-        if course_id:
-            filter_weaviate = Filter.by_property(course_id_property).equal(course_id)
-            if base_url:
-                filter_weaviate &= Filter.by_property(base_url_property).equal(base_url)
+        filter_weaviate = self._create_filter(
+            course_id, base_url, course_id_property, base_url_property
+        )
 
-        vec = self.llm_embedding.embed(query)
-        return self.collection.query.hybrid(
+        vec = await self.llm_embedding.aembed(query)
+        return await self.async_collection.query.hybrid(
             query=query,
             alpha=hybrid_factor,
             vector=vec,
@@ -195,29 +222,20 @@ class BaseRetrieval(Pipeline, ABC):
             filters=filter_weaviate,
         )
 
-    @traceable(name="Retrieval: Run Parallel Rewrite Tasks")
-    def run_parallel_rewrite_tasks(
+    async def _arewrite_queries(
         self,
         chat_history: list[PyrisMessage],
         student_query: str,
-        result_limit: int,
         course_language: str,
+        course_name: Optional[str],
         initial_prompt: str,
         rewrite_prompt: str,
         hypothetical_answer_prompt: str,
         pipeline_enum: PipelineEnum,
-        course_name: Optional[str] = None,
-        course_id: Optional[int] = None,
-        base_url: Optional[str] = None,
-        problem_statement: Optional[str] = None,
-        exercise_title: Optional[str] = None,
-    ):
-        """
-        Run the rewrite tasks in parallel.
-        """
-        with concurrent.futures.ThreadPoolExecutor() as executor:
-            rewritten_query_future = executor.submit(
-                self.rewrite_student_query,
+    ) -> tuple[str, str]:
+        """Get the rewritten query and the hypothetical answer concurrently"""
+        return await asyncio.gather(
+            self.arewrite_student_query(
                 chat_history,
                 student_query,
                 course_language,
@@ -225,9 +243,8 @@ class BaseRetrieval(Pipeline, ABC):
                 initial_prompt,
                 rewrite_prompt,
                 pipeline_enum,
-            )
-            hypothetical_answer_query_future = executor.submit(
-                self.rewrite_student_query,
+            ),
+            self.arewrite_student_query(
                 chat_history,
                 student_query,
                 course_language,
@@ -235,35 +252,112 @@ class BaseRetrieval(Pipeline, ABC):
                 initial_prompt,
                 hypothetical_answer_prompt,
                 pipeline_enum,
-            )
-
-            rewritten_query = rewritten_query_future.result()
-            hypothetical_answer_query = hypothetical_answer_query_future.result()
+            ),
+        )
 
-        with concurrent.futures.ThreadPoolExecutor() as executor:
-            response_future = executor.submit(
-                self.search_in_db,
-                query=rewritten_query,
+    async def asearch_queries(
+        self,
+        queries: tuple[str, ...],
+        result_limit: int,
+        course_id: Optional[int] = None,
+        base_url: Optional[str] = None,
+    ) -> list:
+        """
+        Search for the rewritten query and the hypothetical answer and return the merged objects,
+        with a single fused hybrid query if retrieval.fused_search is enabled.
+        """
+        if settings.retrieval.fused_search:
+            return await fused_hybrid_search(
+                self.async_collection,
+                self.llm_embedding,
+                list(queries),
                 hybrid_factor=0.9,
                 result_limit=result_limit,
-                schema_properties=self.get_schema_properties(),
-                course_id=course_id,
-                base_url=base_url,
+                return_properties=self.get_schema_properties(),
+                filters=self._create_filter(
+                    course_id, base_url, "course_id", "base_url"
+                ),
+                rrf_k=settings.retrieval.rrf_k,
             )
-            response_hyde_future = executor.submit(
-                self.search_in_db,
-                query=hypothetical_answer_query,
-                hybrid_factor=0.9,
-                result_limit=result_limit,
-                schema_properties=self.get_schema_properties(),
-                course_id=course_id,
-                base_url=base_url,
+        responses = await asyncio.gather(
+            *(
+                self.asearch_in_db(
+                    query=query,
+                    hybrid_factor=0.9,
+                    result_limit=result_limit,
+                    schema_properties=self.get_schema_properties(),
+                    course_id=course_id,
+                    base_url=base_url,
+                )
+                for query in queries
             )
+        )
+        return merge_retrieved_objects(*(response.objects for response in responses))
+
+    async def afetch_by_ids(self, ids: List[UUID]) -> list:
+        """Fetch the objects with the given ids in the given order, missing objects are skipped"""
+        if not ids:
+            return []
+        response = await self.async_collection.query.fetch_objects_by_ids(
+            ids, limit=len(ids), return_properties=self.get_schema_properties()
+        )
+        objects_by_id = {obj.uuid: obj for obj in response.objects}
+        return [objects_by_id[id] for id in ids if id in objects_by_id]
+
+    @traceable(name="Retrieval: Retrieve Objects")
+    async def aretrieve_objects(
+        self,
+        chat_history: list[PyrisMessage],
+        student_query: str,
+        result_limit: int,
+        course_language: str,
+        initial_prompt: str,
+        rewrite_prompt: str,
+        hypothetical_answer_prompt: str,
+        pipeline_enum: PipelineEnum,
+        course_name: Optional[str] = None,
+        course_id: Optional[int] = None,
+        base_url: Optional[str] = None,
+        fast_path: bool = False,
+    ) -> list:
+        """
+        Rewrite the query, search and merge the results. The semantic query cache reuses the
+        rewrites and results of similar earlier queries of the course. On the fast path the
+        student query is searched as it is.
+        """
 
-            response = response_future.result()
-            response_hyde = response_hyde_future.result()
+        async def rewrite() -> tuple[str, ...]:
+            if fast_path:
+                return (student_query,)
+            return await self._arewrite_queries(
+                chat_history,
+                student_query,
+                course_language,
+                course_name,
+                initial_prompt,
+                rewrite_prompt,
+                hypothetical_answer_prompt,
+                pipeline_enum,
+            )
 
-        return response, response_hyde
+        cache = SemanticQueryCache()
+        return await cache.aretrieve(
+            cache.create_bucket_key(
+                self.implementation_id,
+                course_id,
+                base_url,
+                chat_history,
+                result_limit=result_limit,
+                course_name=course_name,
+                fast_path=fast_path,
+            ),
+            student_query,
+            rewrite=rewrite,
+            search=lambda queries: self.asearch_queries(
+                queries, result_limit, course_id, base_url
+            ),
+            fetch=self.afetch_by_ids,
+        )
 
     @abstractmethod
     def get_schema_properties(self) -> List[str]:
@@ -271,28 +365,3 @@ class BaseRetrieval(Pipeline, ABC):
         Abstract method to be implemented by subclasses to return the schema properties.
         """
         raise NotImplementedError
-
-    def fetch_course_language(
-        self, course_id: int, course_language_property: str = "course_language"
-    ) -> str:
-        """
-        Fetch the language of the course based on the course ID.
-        If no specific language is set, it defaults to English.
-        """
-        course_language = "english"
-
-        if course_id:
-            result = self.collection.query.fetch_objects(
-                filters=Filter.by_property("course_id").equal(course_id),
-                limit=1,
-                return_properties=[course_language_property],
-            )
-
-            if result.objects:
-                fetched_language = result.objects[0].properties.get(
-                    course_language_property
-                )
-                if fetched_language:
-                    course_language = fetched_language
-
-        return course_language
@@ -0,0 +1,111 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from pydantic import BaseModel
+from weaviate.classes.query import Filter
+
+from app.common import Singleton
+from app.common.background_loop import BackgroundEventLoop
+from app.config import settings
+from app.vector_database.database import VectorDatabase
+from app.vector_database.faq_schema import FaqSchema
+from app.vector_database.lecture_schema import LectureSchema
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_COURSE_LANGUAGE = "english"
+
+
+class CourseMetadata(BaseModel):
+    """What the chat pipelines need to know about the indexed content of a course"""
+
+    lecture_language: str = DEFAULT_COURSE_LANGUAGE
+    faq_language: str = DEFAULT_COURSE_LANGUAGE
+    has_lectures: bool = False
+    has_faqs: bool = False
+
+
+class CourseMetadataCache(metaclass=Singleton):
+    """
+    Cache of the course metadata, so chat requests do not query Weaviate for the course language
+    and for whether lectures and FAQs are indexed. A course is loaded with concurrent queries on
+    the background event loop and kept for the TTL, or until its lectures or FAQs change.
+    At most max_entries courses are kept, the least recently used ones are dropped first.
+    """
+
+    def __init__(self):
+        config = settings.retrieval.course_metadata
+        self.ttl = config.ttl
+        self.max_entries = config.max_entries
+        self.lock = threading.Lock()
+        self.entries: OrderedDict[int, tuple[float, CourseMetadata]] = OrderedDict()
+        self.generations: dict[int, int] = {}
+
+    def get(self, course_id: Optional[int]) -> CourseMetadata:
+        """Get the metadata of the course, loading it if it is not cached"""
+        if not course_id:
+            return CourseMetadata()
+        with self.lock:
+            entry = self.entries.get(course_id)
+            if entry is not None:
+                if entry[0] >= time.monotonic():
+                    self.entries.move_to_end(course_id)
+                    return entry[1]
+                del self.entries[course_id]
+            generation = self.generations.get(course_id, 0)
+
+        metadata = BackgroundEventLoop().run(self._aload(course_id))
+        with self.lock:
+            # Do not cache metadata loaded while the course changed
+            if self.ttl > 0 and self.generations.get(course_id, 0) == generation:
+                self.entries[course_id] = (time.monotonic() + self.ttl, metadata)
+                self.entries.move_to_end(course_id)
+                while len(self.entries) > self.max_entries:
+                    self.entries.popitem(last=False)
+        return metadata
+
+    async def _aload(self, course_id: int) -> CourseMetadata:
+        db = VectorDatabase()
+        lectures = db.get_async_collection(LectureSchema.COLLECTION_NAME.value)
+        faqs = db.get_async_collection(FaqSchema.COLLECTION_NAME.value)
+        lecture, faq = await asyncio.gather(
+            lectures.query.fetch_objects(
+                filters=Filter.by_property(LectureSchema.COURSE_ID.value).equal(
+                    course_id
+                ),
+                limit=1,
+                return_properties=[LectureSchema.COURSE_LANGUAGE.value],
+            ),
+            faqs.query.fetch_objects(
+                filters=Filter.by_property(FaqSchema.COURSE_ID.value).equal(course_id),
+                limit=1,
+                return_properties=[FaqSchema.COURSE_LANGUAGE.value],
+            ),
+        )
+
+        metadata = CourseMetadata(
+            has_lectures=len(lecture.objects) > 0,
+            has_faqs=len(faq.objects) > 0,
+        )
+        if lecture.objects:
+            metadata.lecture_language = (
+                lecture.objects[0].properties.get(LectureSchema.COURSE_LANGUAGE.value)
+                or DEFAULT_COURSE_LANGUAGE
+            )
+        if faq.objects:
+            metadata.faq_language = (
+                faq.objects[0].properties.get(FaqSchema.COURSE_LANGUAGE.value)
+                or DEFAULT_COURSE_LANGUAGE
+            )
+        logger.info(f"Loaded metadata of course {course_id}: {metadata}")
+        return metadata
+
+    def invalidate(self, course_id: int):
+        """Drop the metadata of the course, called when its lectures or FAQs change"""
+        with self.lock:
+            self.generations[course_id] = self.generations.get(course_id, 0) + 1
+            self.entries.pop(course_id, None)
@@ -3,7 +3,10 @@ from typing import List
 from langsmith import traceable
 from weaviate import WeaviateClient
 from app.common.PipelineEnum import PipelineEnum
-from .basic_retrieval import BaseRetrieval, merge_retrieved_chunks
+from app.common.background_loop import BackgroundEventLoop
+from .basic_retrieval import BaseRetrieval
+from .course_metadata_cache import CourseMetadataCache
+from .fast_path import RetrievalMetrics, get_fast_path_policy
 from ..common.pyris_message import PyrisMessage
 from ..pipeline.prompts.faq_retrieval_prompts import (
     faq_retriever_initial_prompt,
@@ -12,7 +15,9 @@ from ..pipeline.prompts.faq_retrieval_prompts import (
 from ..pipeline.prompts.lecture_retrieval_prompts import (
     rewrite_student_query_prompt,
 )
-from ..vector_database.faq_schema import FaqSchema, init_faq_schema
+from .retrieval_cache import RetrievalCache
+from ..vector_database.database import VectorDatabase
+from ..vector_database.faq_schema import FaqSchema
 
 logger = logging.getLogger(__name__)
 
@@ -20,7 +25,7 @@ logger = logging.getLogger(__name__)
 class FaqRetrieval(BaseRetrieval):
     def __init__(self, client: WeaviateClient, **kwargs):
         super().__init__(
-            client, init_faq_schema, implementation_id="faq_retrieval_pipeline"
+            client, VectorDatabase().faqs, implementation_id="faq_retrieval_pipeline"
         )
 
     def get_schema_properties(self) -> List[str]:
@@ -43,27 +48,57 @@ class FaqRetrieval(BaseRetrieval):
         exercise_title: str = None,
         base_url: str = None,
     ) -> List[dict]:
-        course_language = self.fetch_course_language(course_id)
-
-        response, response_hyde = self.run_parallel_rewrite_tasks(
-            chat_history=chat_history,
-            student_query=student_query,
+        cache = RetrievalCache()
+        key = cache.create_key(
+            "faq",
+            course_id,
+            base_url,
+            student_query,
+            chat_history,
             result_limit=result_limit,
-            course_language=course_language,
-            initial_prompt=faq_retriever_initial_prompt,
-            rewrite_prompt=rewrite_student_query_prompt,
-            hypothetical_answer_prompt=write_hypothetical_answer_prompt,
-            pipeline_enum=PipelineEnum.IRIS_FAQ_RETRIEVAL_PIPELINE,
             course_name=course_name,
-            course_id=course_id,
+        )
+        return cache.get_or_compute(
+            key,
+            lambda: self.retrieve(
+                chat_history=chat_history,
+                student_query=student_query,
+                result_limit=result_limit,
+                course_name=course_name,
+                course_id=course_id,
+            ),
         )
 
-        basic_retrieved_faqs: list[dict[str, dict]] = [
-            {"id": obj.uuid.int, "properties": obj.properties}
-            for obj in response.objects
-        ]
-        hyde_retrieved_faqs: list[dict[str, dict]] = [
-            {"id": obj.uuid.int, "properties": obj.properties}
-            for obj in response_hyde.objects
-        ]
-        return merge_retrieved_chunks(basic_retrieved_faqs, hyde_retrieved_faqs)
+    def retrieve(
+        self,
+        chat_history: list[PyrisMessage],
+        student_query: str,
+        result_limit: int,
+        course_name: str = None,
+        course_id: int = None,
+    ) -> List[dict]:
+        """
+        Retrieve FAQs from the database without the retrieval cache.
+        """
+        fast_path = get_fast_path_policy().applies(student_query, chat_history)
+        with RetrievalMetrics().measure(
+            self.implementation_id, "fast" if fast_path else "rewrite"
+        ):
+            course_language = CourseMetadataCache().get(course_id).faq_language
+
+            objects = BackgroundEventLoop().run(
+                self.aretrieve_objects(
+                    chat_history=chat_history,
+                    student_query=student_query,
+                    result_limit=result_limit,
+                    course_language=course_language,
+                    initial_prompt=faq_retriever_initial_prompt,
+                    rewrite_prompt=rewrite_student_query_prompt,
+                    hypothetical_answer_prompt=write_hypothetical_answer_prompt,
+                    pipeline_enum=PipelineEnum.IRIS_FAQ_RETRIEVAL_PIPELINE,
+                    course_name=course_name,
+                    course_id=course_id,
+                    fast_path=fast_path,
+                )
+            )
+            return [obj.properties for obj in objects]
@@ -1,25 +1,17 @@
-from weaviate.collections.classes.filters import Filter
+from app.retrieval.course_metadata_cache import CourseMetadataCache
 from app.vector_database.database import VectorDatabase
 from app.vector_database.faq_schema import FaqSchema
 
 
 def should_allow_faq_tool(db: VectorDatabase, course_id: int) -> bool:
     """
-    Checks if there are indexed faqs for the given course
+    Checks if there are indexed faqs for the given course, using the course metadata cache
 
     :param db: The vector database on which the faqs are indexed
     :param course_id: The course ID
     :return: True if there are indexed faqs for the course, False otherwise
     """
-    if course_id:
-        # Fetch the first object that matches the course ID with the language property
-        result = db.faqs.query.fetch_objects(
-            filters=Filter.by_property(FaqSchema.COURSE_ID.value).equal(course_id),
-            limit=1,
-            return_properties=[FaqSchema.COURSE_NAME.value],
-        )
-        return len(result.objects) > 0
-    return False
+    return CourseMetadataCache().get(course_id).has_faqs
 
 
 def format_faqs(retrieved_faqs):
@@ -0,0 +1,87 @@
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Optional
+
+from app.common import Singleton
+from app.common.pyris_message import PyrisMessage
+from app.config import FastPathSettings, settings
+
+WORD_PATTERN = re.compile(r"[\w'-]+", re.UNICODE)
+
+
+class FastPathPolicy:
+    """
+    Decides whether a student query can be searched as it is, without the rewrite and the
+    hypothetical answer. This is the case for short queries that do not refer to the chat
+    history, e.g. "what is recursion". Queries with referential words such as "it" or "that"
+    or continuations such as "and what about" need the chat history to be understood.
+    """
+
+    def __init__(self, config: FastPathSettings):
+        self.config = config
+        self.referential_words = {word.lower() for word in config.referential_words}
+        self.continuation_prefixes = tuple(
+            prefix.lower() for prefix in config.continuation_prefixes
+        )
+
+    def applies(
+        self, student_query: str, chat_history: Optional[list[PyrisMessage]]
+    ) -> bool:
+        if not self.config.enabled:
+            return False
+        words = WORD_PATTERN.findall(student_query.lower())
+        if not words or len(words) > self.config.max_words:
+            return False
+        if not chat_history:
+            # Without a chat history there is nothing to resolve
+            return True
+        if student_query.strip().lower().startswith(self.continuation_prefixes):
+            return False
+        return not any(word in self.referential_words for word in words)
+
+
+class RetrievalMetrics(metaclass=Singleton):
+    """Latency of the retrieval per pipeline and path, e.g. the fast path or the rewrite path"""
+
+    def __init__(self, max_samples: int = 1000):
+        self.max_samples = max_samples
+        self.lock = threading.Lock()
+        self.counts: dict[tuple[str, str], int] = {}
+        self.samples: dict[tuple[str, str], deque] = {}
+
+    def record(self, pipeline: str, path: str, seconds: float):
+        key = (pipeline, path)
+        with self.lock:
+            self.counts[key] = self.counts.get(key, 0) + 1
+            self.samples.setdefault(key, deque(maxlen=self.max_samples)).append(seconds)
+
+    @contextmanager
+    def measure(self, pipeline: str, path: str):
+        """Record the latency of the enclosed retrieval"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(pipeline, path, time.perf_counter() - start)
+
+    def get_stats(self) -> dict[str, dict[str, dict[str, float]]]:
+        """Get the number of retrievals and latency percentiles of the recent retrievals"""
+        stats = {}
+        with self.lock:
+            for (pipeline, path), samples in self.samples.items():
+                ordered = sorted(samples)
+                stats.setdefault(pipeline, {})[path] = {
+                    "count": self.counts[(pipeline, path)],
+                    "mean_ms": 1000 * sum(ordered) / len(ordered),
+                    "p50_ms": 1000 * ordered[len(ordered) // 2],
+                    "p95_ms": 1000 * ordered[int(len(ordered) * 0.95)],
+                    "max_ms": 1000 * ordered[-1],
+                }
+        return stats
+
+
+def get_fast_path_policy() -> FastPathPolicy:
+    return FastPathPolicy(settings.retrieval.fast_path)
@@ -0,0 +1,98 @@
+from typing import Hashable, Optional, Sequence, TypeVar
+
+import numpy as np
+from weaviate.collections import CollectionAsync
+
+from app.llm import RequestHandler
+
+T = TypeVar("T", bound=Hashable)
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[T]], k: int = 60) -> list[T]:
+    """
+    Fuse several rankings of the same candidates with reciprocal rank fusion.
+    Every ranking adds 1 / (k + rank) to the score of a candidate, the result is sorted by score.
+    """
+    scores: dict[T, float] = {}
+    for ranking in rankings:
+        for rank, candidate in enumerate(ranking, start=1):
+            scores[candidate] = scores.get(candidate, 0.0) + 1.0 / (k + rank)
+    return sorted(scores, key=lambda candidate: scores[candidate], reverse=True)
+
+
+def _normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def _rank_by_similarity(
+    query_vectors: Sequence[Sequence[float]],
+    object_vectors: Sequence[Optional[Sequence[float]]],
+) -> list[list[int]]:
+    """
+    Rank the objects by the cosine similarity of their vectors to every query vector, computed as
+    one matrix product. Objects without a vector are ranked last.
+    """
+    queries = _normalize_rows(np.asarray(query_vectors, dtype=np.float32))
+    similarities = np.full((len(queries), len(object_vectors)), -1.0, dtype=np.float32)
+    present = [i for i, vector in enumerate(object_vectors) if vector]
+    if present:
+        objects = _normalize_rows(
+            np.asarray([object_vectors[i] for i in present], dtype=np.float32)
+        )
+        similarities[:, present] = queries @ objects.T
+    return [[int(i) for i in np.argsort(-row, kind="stable")] for row in similarities]
+
+
+def _get_object_vector(obj) -> Optional[list[float]]:
+    vector = obj.vector
+    if isinstance(vector, dict):
+        vector = vector.get("default")
+    return vector or None
+
+
+async def fused_hybrid_search(
+    collection: CollectionAsync,
+    embedding_handler: RequestHandler,
+    queries: list[str],
+    hybrid_factor: float,
+    result_limit: int,
+    return_properties: list[str],
+    filters=None,
+    rrf_k: int = 60,
+) -> list:
+    """
+    Search for several queries, e.g. the rewritten query and the hypothetical answer, at once.
+    Weaviate cannot run several hybrid queries in one request, so the queries are embedded in one
+    call and a single hybrid query is sent with the combined text and the mean of the normalized
+    query vectors. The candidates are returned with their vectors and ranked locally against every
+    query vector; these rankings and the hybrid ranking are merged with reciprocal rank fusion.
+    Returns up to result_limit objects per query, without duplicates.
+    """
+    query_vectors = await embedding_handler.aembed_many(queries)
+    combined_vector = (
+        _normalize_rows(np.asarray(query_vectors, dtype=np.float32))
+        .mean(axis=0)
+        .tolist()
+    )
+
+    response = await collection.query.hybrid(
+        query="\n".join(queries),
+        alpha=hybrid_factor,
+        vector=combined_vector,
+        return_properties=return_properties,
+        limit=result_limit * len(queries),
+        filters=filters,
+        include_vector=True,
+    )
+    objects = response.objects
+    if not objects:
+        return []
+
+    # The hybrid ranking keeps the keyword part of the score
+    rankings = [list(range(len(objects)))]
+    rankings.extend(
+        _rank_by_similarity(query_vectors, [_get_object_vector(obj) for obj in objects])
+    )
+    return [objects[i] for i in reciprocal_rank_fusion(rankings, rrf_k)]
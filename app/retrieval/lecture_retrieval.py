@@ -1,11 +1,14 @@
 from asyncio.log import logger
-from typing import List
+from typing import List, Optional
+from uuid import UUID
 
 from langsmith import traceable
 from weaviate import WeaviateClient
 from weaviate.classes.query import Filter
 
+from app.common.background_loop import BackgroundEventLoop
 from app.common.token_usage_dto import TokenUsageDTO
+from app.config import settings
 from app.common.PipelineEnum import PipelineEnum
 from ..common.message_converters import convert_iris_message_to_langchain_message
 from ..common.pyris_message import PyrisMessage
@@ -18,8 +21,15 @@ from app.llm import (
     CapabilityRequestHandler,
     RequirementList,
 )
-from app.pipeline.shared.reranker_pipeline import RerankerPipeline
-from app.vector_database.lecture_schema import init_lecture_schema, LectureSchema
+from app.pipeline.shared.reranker_pipeline import create_reranker
+from app.retrieval.fused_search import fused_hybrid_search
+from app.retrieval.basic_retrieval import merge_retrieved_objects
+from app.retrieval.course_metadata_cache import CourseMetadataCache
+from app.retrieval.fast_path import RetrievalMetrics, get_fast_path_policy
+from app.retrieval.retrieval_cache import RetrievalCache
+from app.retrieval.semantic_query_cache import SemanticQueryCache
+from app.vector_database.database import VectorDatabase
+from app.vector_database.lecture_schema import LectureSchema
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.prompts import (
     ChatPromptTemplate,
@@ -36,25 +46,15 @@ from ..pipeline.prompts.lecture_retrieval_prompts import (
     rewrite_student_query_prompt_with_exercise_context,
     write_hypothetical_answer_with_exercise_context_prompt,
 )
-import concurrent.futures
+import asyncio
 
-
-def merge_retrieved_chunks(
-    basic_retrieved_lecture_chunks, hyde_retrieved_lecture_chunks
-) -> List[dict]:
-    """
-    Merge the retrieved chunks from the basic and hyde retrieval methods. This function ensures that for any
-    duplicate IDs, the properties from hyde_retrieved_lecture_chunks will overwrite those from
-    basic_retrieved_lecture_chunks.
-    """
-    merged_chunks = {}
-    for chunk in basic_retrieved_lecture_chunks:
-        merged_chunks[chunk["id"]] = chunk["properties"]
-
-    for chunk in hyde_retrieved_lecture_chunks:
-        merged_chunks[chunk["id"]] = chunk["properties"]
-
-    return [properties for uuid, properties in merged_chunks.items()]
+SEARCH_RETURN_PROPERTIES = [
+    LectureSchema.COURSE_ID.value,
+    LectureSchema.LECTURE_UNIT_NAME.value,
+    LectureSchema.LECTURE_UNIT_LINK.value,
+    LectureSchema.PAGE_NUMBER.value,
+    LectureSchema.PAGE_TEXT_CONTENT.value,
+]
 
 
 def _add_last_four_messages_to_prompt(
@@ -85,7 +85,9 @@ class LectureRetrieval(Pipeline):
 
     tokens: List[TokenUsageDTO]
 
-    def __init__(self, client: WeaviateClient, **kwargs):
+    def __init__(
+        self, client: WeaviateClient, reranker_mode: Optional[str] = None, **kwargs
+    ):
         super().__init__(implementation_id="lecture_retrieval_pipeline")
         request_handler = CapabilityRequestHandler(
             requirements=RequirementList(
@@ -100,8 +102,12 @@ class LectureRetrieval(Pipeline):
         )
         self.llm_embedding = BasicRequestHandler("embedding-small")
         self.pipeline = self.llm | StrOutputParser()
-        self.collection = init_lecture_schema(client)
-        self.reranker_pipeline = RerankerPipeline()
+        self.collection = VectorDatabase().lectures
+        self.async_collection = VectorDatabase().get_async_collection(
+            self.collection.name
+        )
+        self.reranker_mode = reranker_mode or settings.retrieval.reranker
+        self.reranker_pipeline = create_reranker(self.reranker_mode)
         self.tokens = []
 
     @traceable(name="Full Lecture Retrieval")
@@ -118,39 +124,79 @@ class LectureRetrieval(Pipeline):
     ) -> List[dict]:
         """
         Retrieve lecture data from the database.
+        Results are reused from the retrieval cache for repeated questions of the same course.
         """
-        course_language = self.fetch_course_language(course_id)
-
-        response, response_hyde = self.run_parallel_rewrite_tasks(
-            chat_history=chat_history,
-            student_query=student_query,
+        cache = RetrievalCache()
+        key = cache.create_key(
+            "lecture",
+            course_id,
+            base_url,
+            student_query,
+            chat_history,
             result_limit=result_limit,
-            course_language=course_language,
             course_name=course_name,
-            course_id=course_id,
-            base_url=base_url,
             problem_statement=problem_statement,
             exercise_title=exercise_title,
+            reranker=self.reranker_mode,
         )
-
-        basic_retrieved_lecture_chunks: list[dict[str, dict]] = [
-            {"id": obj.uuid.int, "properties": obj.properties}
-            for obj in response.objects
-        ]
-        hyde_retrieved_lecture_chunks: list[dict[str, dict]] = [
-            {"id": obj.uuid.int, "properties": obj.properties}
-            for obj in response_hyde.objects
-        ]
-        merged_chunks = merge_retrieved_chunks(
-            basic_retrieved_lecture_chunks, hyde_retrieved_lecture_chunks
+        return cache.get_or_compute(
+            key,
+            lambda: self.retrieve(
+                chat_history=chat_history,
+                student_query=student_query,
+                result_limit=result_limit,
+                course_name=course_name,
+                course_id=course_id,
+                base_url=base_url,
+                problem_statement=problem_statement,
+                exercise_title=exercise_title,
+            ),
         )
-        if len(merged_chunks) != 0:
-            selected_chunks_index = self.reranker_pipeline(
-                paragraphs=merged_chunks, query=student_query, chat_history=chat_history
+
+    def retrieve(
+        self,
+        chat_history: list[PyrisMessage],
+        student_query: str,
+        result_limit: int,
+        course_name: str = None,
+        course_id: int = None,
+        base_url: str = None,
+        problem_statement: str = None,
+        exercise_title: str = None,
+    ) -> List[dict]:
+        """
+        Retrieve lecture data from the database without the retrieval cache.
+        """
+        fast_path = get_fast_path_policy().applies(student_query, chat_history)
+        with RetrievalMetrics().measure(
+            self.implementation_id, "fast" if fast_path else "rewrite"
+        ):
+            course_language = CourseMetadataCache().get(course_id).lecture_language
+
+            objects = BackgroundEventLoop().run(
+                self.aretrieve_objects(
+                    chat_history=chat_history,
+                    student_query=student_query,
+                    result_limit=result_limit,
+                    course_language=course_language,
+                    course_name=course_name,
+                    course_id=course_id,
+                    base_url=base_url,
+                    problem_statement=problem_statement,
+                    exercise_title=exercise_title,
+                    fast_path=fast_path,
+                )
             )
-            if selected_chunks_index:
-                return [merged_chunks[int(i)] for i in selected_chunks_index]
-        return []
+            merged_chunks = [obj.properties for obj in objects]
+            if len(merged_chunks) != 0:
+                selected_chunks_index = self.reranker_pipeline(
+                    paragraphs=merged_chunks,
+                    query=student_query,
+                    chat_history=chat_history,
+                )
+                if selected_chunks_index:
+                    return [merged_chunks[int(i)] for i in selected_chunks_index]
+            return []
 
     @traceable(name="Basic Lecture Retrieval")
     def basic_lecture_retrieval(
@@ -164,19 +210,28 @@ class LectureRetrieval(Pipeline):
     ) -> list[dict[str, dict]]:
         """
         Basic retrieval for pipelines thaat need performance and fast answers.
+        Queries on the fast path are searched as they are, without assessment and rewrite.
         """
-        if not self.assess_question(chat_history, student_query):
-            return []
-
-        rewritten_query = self.rewrite_student_query(
-            chat_history, student_query, "course_language", course_name
-        )
-        response = self.search_in_db(
-            query=rewritten_query,
-            hybrid_factor=0.9,
-            result_limit=result_limit,
-            course_id=course_id,
-            base_url=base_url,
+        if get_fast_path_policy().applies(student_query, chat_history):
+            rewritten_query = student_query
+        else:
+            if not self.assess_question(chat_history, student_query):
+                return []
+            rewritten_query = BackgroundEventLoop().run(
+                self._ainvoke_rewrite(
+                    self._create_rewrite_student_query_prompt(
+                        chat_history, student_query, "course_language", course_name
+                    )
+                )
+            )
+        response = BackgroundEventLoop().run(
+            self.asearch_in_db(
+                query=rewritten_query,
+                hybrid_factor=0.9,
+                result_limit=result_limit,
+                course_id=course_id,
+                base_url=base_url,
+            )
         )
 
         basic_retrieved_lecture_chunks: list[dict[str, dict]] = [
@@ -213,17 +268,22 @@ class LectureRetrieval(Pipeline):
         except Exception as e:
             raise e
 
-    @traceable(name="Retrieval: Rewrite Student Query")
-    def rewrite_student_query(
+    async def _ainvoke_rewrite(self, prompt: ChatPromptTemplate) -> str:
+        response = await (prompt | self.llm).ainvoke({})
+        # Taken from the message, self.llm.tokens may already belong to a concurrent call
+        token_usage = response.response_metadata["token_usage"]
+        token_usage.pipeline = PipelineEnum.IRIS_LECTURE_RETRIEVAL_PIPELINE
+        self.tokens.append(token_usage)
+        logger.info(f"Response from retrieval pipeline: {response.content}")
+        return response.content
+
+    def _create_rewrite_student_query_prompt(
         self,
         chat_history: list[PyrisMessage],
         student_query: str,
         course_language: str,
         course_name: str,
-    ) -> str:
-        """
-        Rewrite the student query.
-        """
+    ) -> ChatPromptTemplate:
         prompt = ChatPromptTemplate.from_messages(
             [
                 ("system", lecture_retriever_initial_prompt),
@@ -238,19 +298,9 @@ class LectureRetrieval(Pipeline):
             course_name=course_name,
             student_query=student_query,
         )
-        prompt = ChatPromptTemplate.from_messages(prompt_val)
-        try:
-            response = (prompt | self.pipeline).invoke({})
-            token_usage = self.llm.tokens
-            token_usage.pipeline = PipelineEnum.IRIS_LECTURE_RETRIEVAL_PIPELINE
-            self.tokens.append(self.llm.tokens)
-            logger.info(f"Response from exercise chat pipeline: {response}")
-            return response
-        except Exception as e:
-            raise e
+        return ChatPromptTemplate.from_messages(prompt_val)
 
-    @traceable(name="Retrieval: Rewrite Student Query with Exercise Context")
-    def rewrite_student_query_with_exercise_context(
+    def _create_rewrite_student_query_with_exercise_context_prompt(
         self,
         chat_history: list[PyrisMessage],
         student_query: str,
@@ -258,10 +308,7 @@ class LectureRetrieval(Pipeline):
         course_name: str,
         exercise_name: str,
         problem_statement: str,
-    ) -> str:
-        """
-        Rewrite the student query to generate fitting lecture content and embed it.
-        """
+    ) -> ChatPromptTemplate:
         prompt = ChatPromptTemplate.from_messages(
             [
                 ("system", lecture_retrieval_initial_prompt_with_exercise_context),
@@ -278,29 +325,15 @@ class LectureRetrieval(Pipeline):
             problem_statement=problem_statement,
             student_query=student_query,
         )
-        prompt = ChatPromptTemplate.from_messages(prompt_val)
-        try:
-            response = (prompt | self.pipeline).invoke({})
-            token_usage = self.llm.tokens
-            token_usage.pipeline = PipelineEnum.IRIS_LECTURE_RETRIEVAL_PIPELINE
-            self.tokens.append(self.llm.tokens)
-            logger.info(f"Response from exercise chat pipeline: {response}")
-            return response
-        except Exception as e:
-            raise e
+        return ChatPromptTemplate.from_messages(prompt_val)
 
-    @traceable(name="Retrieval: Rewrite Elaborated Query")
-    def rewrite_elaborated_query(
+    def _create_rewrite_elaborated_query_prompt(
         self,
         chat_history: list[PyrisMessage],
         student_query: str,
         course_language: str,
         course_name: str,
-    ) -> str:
-        """
-        Rewrite the student query to generate fitting lecture content and embed it.
-        To extract more relevant content from the vector database.
-        """
+    ) -> ChatPromptTemplate:
         prompt = ChatPromptTemplate.from_messages(
             [
                 ("system", write_hypothetical_answer_prompt),
@@ -316,19 +349,9 @@ class LectureRetrieval(Pipeline):
             course_language=course_language,
             course_name=course_name,
         )
-        prompt = ChatPromptTemplate.from_messages(prompt_val)
-        try:
-            response = (prompt | self.pipeline).invoke({})
-            token_usage = self.llm.tokens
-            token_usage.pipeline = PipelineEnum.IRIS_LECTURE_RETRIEVAL_PIPELINE
-            self.tokens.append(self.llm.tokens)
-            logger.info(f"Response from retirval pipeline: {response}")
-            return response
-        except Exception as e:
-            raise e
+        return ChatPromptTemplate.from_messages(prompt_val)
 
-    @traceable(name="Retrieval: Rewrite Elaborated Query with Exercise Context")
-    def rewrite_elaborated_query_with_exercise_context(
+    def _create_rewrite_elaborated_query_with_exercise_context_prompt(
         self,
         chat_history: list[PyrisMessage],
         student_query: str,
@@ -336,11 +359,7 @@ class LectureRetrieval(Pipeline):
         course_name: str,
         exercise_name: str,
         problem_statement: str,
-    ) -> str:
-        """
-        Rewrite the student query to generate fitting lecture content and embed it.
-        To extract more relevant content from the vector database.
-        """
+    ) -> ChatPromptTemplate:
         prompt = ChatPromptTemplate.from_messages(
             [
                 ("system", write_hypothetical_answer_with_exercise_context_prompt),
@@ -359,29 +378,9 @@ class LectureRetrieval(Pipeline):
                 ("user", student_query),
             ]
         )
-        try:
-            response = (prompt | self.pipeline).invoke({})
-            token_usage = self.llm.tokens
-            token_usage.pipeline = PipelineEnum.IRIS_LECTURE_RETRIEVAL_PIPELINE
-            self.tokens.append(self.llm.tokens)
-            logger.info(f"Response from exercise chat pipeline: {response}")
-            return response
-        except Exception as e:
-            raise e
+        return prompt
 
-    @traceable(name="Retrieval: Search in DB")
-    def search_in_db(
-        self,
-        query: str,
-        hybrid_factor: float,
-        result_limit: int,
-        course_id: int = None,
-        base_url: str = None,
-    ):
-        """
-        Search the database for the given query.
-        """
-        logger.info(f"Searching in the database for query: {query}")
+    def _create_filter(self, course_id: int = None, base_url: str = None):
         # Initialize filter to None by default
         filter_weaviate = None
 
@@ -397,45 +396,44 @@ class LectureRetrieval(Pipeline):
                 filter_weaviate &= Filter.by_property(
                     LectureSchema.BASE_URL.value
                 ).equal(base_url)
+        return filter_weaviate
 
-        vec = self.llm_embedding.embed(query)
-        return_value = self.collection.query.hybrid(
+    @traceable(name="Retrieval: Search in DB")
+    async def asearch_in_db(
+        self,
+        query: str,
+        hybrid_factor: float,
+        result_limit: int,
+        course_id: int = None,
+        base_url: str = None,
+    ):
+        """
+        Search the database for the given query with the async Weaviate client.
+        """
+        logger.info(f"Searching in the database for query: {query}")
+        vec = await self.llm_embedding.aembed(query)
+        return await self.async_collection.query.hybrid(
             query=query,
             alpha=hybrid_factor,
             vector=vec,
-            return_properties=[
-                LectureSchema.COURSE_ID.value,
-                LectureSchema.LECTURE_UNIT_NAME.value,
-                LectureSchema.LECTURE_UNIT_LINK.value,
-                LectureSchema.PAGE_NUMBER.value,
-                LectureSchema.PAGE_TEXT_CONTENT.value,
-            ],
+            return_properties=SEARCH_RETURN_PROPERTIES,
             limit=result_limit,
-            filters=filter_weaviate,
+            filters=self._create_filter(course_id, base_url),
         )
-        return return_value
 
-    @traceable(name="Retrieval: Run Parallel Rewrite Tasks")
-    def run_parallel_rewrite_tasks(
+    async def _arewrite_queries(
         self,
         chat_history: list[PyrisMessage],
         student_query: str,
-        result_limit: int,
         course_language: str,
         course_name: str = None,
-        course_id: int = None,
-        base_url: str = None,
         problem_statement: str = None,
         exercise_title: str = None,
-    ):
-        """
-        Run the rewrite tasks in parallel.
-        """
+    ) -> tuple[str, str]:
+        """Get the rewritten query and the hypothetical answer concurrently"""
         if problem_statement:
-            with concurrent.futures.ThreadPoolExecutor() as executor:
-                # Schedule the rewrite tasks to run in parallel
-                rewritten_query_future = executor.submit(
-                    self.rewrite_student_query_with_exercise_context,
+            rewrite_prompt = (
+                self._create_rewrite_student_query_with_exercise_context_prompt(
                     chat_history,
                     student_query,
                     course_language,
@@ -443,8 +441,9 @@ class LectureRetrieval(Pipeline):
                     exercise_title,
                     problem_statement,
                 )
-                hypothetical_answer_query_future = executor.submit(
-                    self.rewrite_elaborated_query_with_exercise_context,
+            )
+            hypothetical_answer_prompt = (
+                self._create_rewrite_elaborated_query_with_exercise_context_prompt(
                     chat_history,
                     student_query,
                     course_language,
@@ -452,82 +451,115 @@ class LectureRetrieval(Pipeline):
                     exercise_title,
                     problem_statement,
                 )
-
-                # Get the results once both tasks are complete
-                rewritten_query: str = rewritten_query_future.result()
-                hypothetical_answer_query: str = (
-                    hypothetical_answer_query_future.result()
-                )
+            )
         else:
-            with concurrent.futures.ThreadPoolExecutor() as executor:
-                # Schedule the rewrite tasks to run in parallel
-                rewritten_query_future = executor.submit(
-                    self.rewrite_student_query,
-                    chat_history,
-                    student_query,
-                    course_language,
-                    course_name,
-                )
-                hypothetical_answer_query_future = executor.submit(
-                    self.rewrite_elaborated_query,
-                    chat_history,
-                    student_query,
-                    course_language,
-                    course_name,
-                )
+            rewrite_prompt = self._create_rewrite_student_query_prompt(
+                chat_history, student_query, course_language, course_name
+            )
+            hypothetical_answer_prompt = self._create_rewrite_elaborated_query_prompt(
+                chat_history, student_query, course_language, course_name
+            )
 
-                # Get the results once both tasks are complete
-                rewritten_query = rewritten_query_future.result()
-                hypothetical_answer_query = hypothetical_answer_query_future.result()
+        return await asyncio.gather(
+            self._ainvoke_rewrite(rewrite_prompt),
+            self._ainvoke_rewrite(hypothetical_answer_prompt),
+        )
 
-            # Execute the database search tasks
-        with concurrent.futures.ThreadPoolExecutor() as executor:
-            response_future = executor.submit(
-                self.search_in_db,
-                query=rewritten_query,
+    async def asearch_queries(
+        self,
+        queries: tuple[str, ...],
+        result_limit: int,
+        course_id: int = None,
+        base_url: str = None,
+    ) -> list:
+        """
+        Search for the rewritten query and the hypothetical answer and return the merged objects,
+        with a single fused hybrid query if retrieval.fused_search is enabled.
+        """
+        if settings.retrieval.fused_search:
+            return await fused_hybrid_search(
+                self.async_collection,
+                self.llm_embedding,
+                list(queries),
                 hybrid_factor=0.9,
                 result_limit=result_limit,
-                course_id=course_id,
-                base_url=base_url,
+                return_properties=SEARCH_RETURN_PROPERTIES,
+                filters=self._create_filter(course_id, base_url),
+                rrf_k=settings.retrieval.rrf_k,
             )
-            response_hyde_future = executor.submit(
-                self.search_in_db,
-                query=hypothetical_answer_query,
-                hybrid_factor=0.9,
-                result_limit=result_limit,
-                course_id=course_id,
-                base_url=base_url,
+        responses = await asyncio.gather(
+            *(
+                self.asearch_in_db(
+                    query=query,
+                    hybrid_factor=0.9,
+                    result_limit=result_limit,
+                    course_id=course_id,
+                    base_url=base_url,
+                )
+                for query in queries
             )
+        )
+        return merge_retrieved_objects(*(response.objects for response in responses))
 
-            # Get the results once both tasks are complete
-            response = response_future.result()
-            response_hyde = response_hyde_future.result()
-
-        return response, response_hyde
+    async def afetch_by_ids(self, ids: List[UUID]) -> list:
+        """Fetch the chunks with the given ids in the given order, missing chunks are skipped"""
+        if not ids:
+            return []
+        response = await self.async_collection.query.fetch_objects_by_ids(
+            ids, limit=len(ids), return_properties=SEARCH_RETURN_PROPERTIES
+        )
+        objects_by_id = {obj.uuid: obj for obj in response.objects}
+        return [objects_by_id[id] for id in ids if id in objects_by_id]
 
-    def fetch_course_language(self, course_id):
+    @traceable(name="Retrieval: Retrieve Lecture Chunks")
+    async def aretrieve_objects(
+        self,
+        chat_history: list[PyrisMessage],
+        student_query: str,
+        result_limit: int,
+        course_language: str,
+        course_name: str = None,
+        course_id: int = None,
+        base_url: str = None,
+        problem_statement: str = None,
+        exercise_title: str = None,
+        fast_path: bool = False,
+    ) -> list:
         """
-        Fetch the language of the course based on the course ID.
-        If no specific language is set, it defaults to English.
+        Rewrite the query, search and merge the results. The semantic query cache reuses the
+        rewrites and results of similar earlier queries of the course. On the fast path the
+        student query is searched as it is.
         """
-        course_language = "english"
 
-        if course_id:
-            # Fetch the first object that matches the course ID with the language property
-            result = self.collection.query.fetch_objects(
-                filters=Filter.by_property(LectureSchema.COURSE_ID.value).equal(
-                    course_id
-                ),
-                limit=1,  # We only need one object to check and retrieve the language
-                return_properties=[LectureSchema.COURSE_LANGUAGE.value],
+        async def rewrite() -> tuple[str, ...]:
+            if fast_path:
+                return (student_query,)
+            return await self._arewrite_queries(
+                chat_history,
+                student_query,
+                course_language,
+                course_name,
+                problem_statement,
+                exercise_title,
             )
 
-            # Check if the result has objects and retrieve the language
-            if result.objects:
-                fetched_language = result.objects[0].properties.get(
-                    LectureSchema.COURSE_LANGUAGE.value
-                )
-                if fetched_language:
-                    course_language = fetched_language
-
-        return course_language
+        cache = SemanticQueryCache()
+        return await cache.aretrieve(
+            cache.create_bucket_key(
+                self.implementation_id,
+                course_id,
+                base_url,
+                chat_history,
+                result_limit=result_limit,
+                course_name=course_name,
+                problem_statement=problem_statement,
+                exercise_title=exercise_title,
+                fast_path=fast_path,
+            ),
+            student_query,
+            rewrite=rewrite,
+            search=lambda queries: self.asearch_queries(
+                queries, result_limit, course_id, base_url
+            ),
+            fetch=self.afetch_by_ids,
+        )
@@ -0,0 +1,141 @@
+import copy
+import hashlib
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, List, Optional
+
+from app.common import Singleton
+from app.common.pyris_message import PyrisMessage
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_query(query: str) -> str:
+    """Normalize case, whitespace and trailing punctuation, which do not change the retrieval"""
+    query = re.sub(r"\s+", " ", query.strip().lower())
+    return query.rstrip("?!. ")
+
+
+def history_fingerprint(chat_history: Optional[list[PyrisMessage]], limit: int) -> str:
+    """Fingerprint of the last messages of the chat history, which the query rewrites use"""
+    fingerprint = hashlib.sha256()
+    messages = chat_history[-limit:] if chat_history and limit > 0 else []
+    for message in messages:
+        fingerprint.update(str(message.sender).encode("utf-8"))
+        for content in message.contents:
+            fingerprint.update(b"\0")
+            fingerprint.update(
+                str(getattr(content, "text_content", "")).encode("utf-8")
+            )
+        fingerprint.update(b"\1")
+    return fingerprint.hexdigest()
+
+
+class RetrievalCache(metaclass=Singleton):
+    """
+    In-memory cache of the chunks selected by the lecture and FAQ retrieval, so students of a course
+    asking the same question within the TTL do not trigger rewrites, searches and reranking again.
+    Entries of a course are dropped whenever its lectures or FAQs change. Every course has a
+    generation counter, results computed while the course changed are not cached.
+    """
+
+    def __init__(self):
+        config = settings.retrieval.cache
+        self.enabled = config.enabled and config.ttl > 0
+        self.ttl = config.ttl
+        self.max_entries = config.max_entries
+        self.history_messages = config.history_messages
+        self.lock = threading.Lock()
+        self.entries: OrderedDict[tuple, tuple[float, List[dict]]] = OrderedDict()
+        self.generations: dict[Optional[int], int] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def create_key(
+        self,
+        kind: str,
+        course_id: Optional[int],
+        base_url: Optional[str],
+        student_query: str,
+        chat_history: Optional[list[PyrisMessage]],
+        **parameters,
+    ) -> tuple:
+        """
+        Key of a retrieval, the kind (e.g. "lecture") and the further parameters that influence the
+        result, e.g. the result limit or the exercise, are part of the key.
+        """
+        return (
+            kind,
+            course_id,
+            base_url,
+            normalize_query(student_query),
+            history_fingerprint(chat_history, self.history_messages),
+            tuple(sorted((name, str(value)) for name, value in parameters.items())),
+        )
+
+    def get(self, key: tuple) -> Optional[List[dict]]:
+        if not self.enabled:
+            return None
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self.entries[key]
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return copy.deepcopy(entry[1])
+
+    def put(self, key: tuple, chunks: List[dict], generation: int):
+        """Cache the chunks, unless the course changed since the given generation"""
+        if not self.enabled:
+            return
+        with self.lock:
+            if self.generations.get(key[1], 0) != generation:
+                return
+            self.entries[key] = (time.monotonic() + self.ttl, copy.deepcopy(chunks))
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def get_generation(self, course_id: Optional[int]) -> int:
+        with self.lock:
+            return self.generations.get(course_id, 0)
+
+    def get_or_compute(
+        self, key: tuple, compute: Callable[[], List[dict]]
+    ) -> List[dict]:
+        """Get the cached chunks or compute and cache them"""
+        chunks = self.get(key)
+        if chunks is not None:
+            return chunks
+        generation = self.get_generation(key[1])
+        chunks = compute()
+        self.put(key, chunks, generation)
+        return chunks
+
+    def invalidate_course(self, course_id: int):
+        """Drop all cached retrievals of the course, called when its lectures or FAQs change"""
+        with self.lock:
+            self.generations[course_id] = self.generations.get(course_id, 0) + 1
+            stale = [key for key in self.entries if key[1] == course_id]
+            for key in stale:
+                del self.entries[key]
+        if stale:
+            logger.info(
+                f"Invalidated {len(stale)} cached retrievals of course {course_id}"
+            )
+
+    def get_stats(self) -> dict[str, int]:
+        """Get the hit and miss counters and the number of cached retrievals"""
+        with self.lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self.entries),
+            }
@@ -0,0 +1,239 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, List, Optional
+from uuid import UUID
+
+import numpy as np
+
+from app.common import Singleton
+from app.common.pyris_message import PyrisMessage
+from app.config import settings
+from app.llm import BasicRequestHandler
+from app.retrieval.retrieval_cache import history_fingerprint
+
+logger = logging.getLogger(__name__)
+
+
+class SemanticCacheEntry:
+    """Rewritten queries and retrieved chunks of an earlier student query"""
+
+    def __init__(
+        self,
+        query_vector: np.ndarray,
+        queries: tuple[str, ...],
+        chunk_ids: List[UUID],
+        expires_at: float,
+    ):
+        self.query_vector = query_vector
+        self.queries = queries
+        self.chunk_ids = chunk_ids
+        self.expires_at = expires_at
+
+
+class SemanticCacheBucket:
+    """Entries of one course and retrieval context with a matrix of their normalized vectors"""
+
+    def __init__(self):
+        self.entries: List[SemanticCacheEntry] = []
+        self.matrix: Optional[np.ndarray] = None
+
+    def prune(self, now: float) -> int:
+        """Drop the expired entries and return their number"""
+        count = len(self.entries)
+        self.entries = [entry for entry in self.entries if entry.expires_at >= now]
+        if len(self.entries) != count:
+            self.matrix = None
+        return count - len(self.entries)
+
+    def nearest(
+        self, query_vector: np.ndarray
+    ) -> tuple[Optional[SemanticCacheEntry], float]:
+        if not self.entries:
+            return None, 0.0
+        if self.matrix is None:
+            self.matrix = np.vstack([entry.query_vector for entry in self.entries])
+        similarities = self.matrix @ query_vector
+        best = int(np.argmax(similarities))
+        return self.entries[best], float(similarities[best])
+
+    def add(self, entry: SemanticCacheEntry, max_entries: int) -> int:
+        """Add the entry, dropping the oldest ones above max_entries, and return their number"""
+        self.entries.append(entry)
+        dropped = max(0, len(self.entries) - max_entries)
+        if dropped:
+            self.entries = self.entries[dropped:]
+        self.matrix = None
+        return dropped
+
+
+class SemanticQueryCache(metaclass=Singleton):
+    """
+    Cache of the query rewrites and retrieved chunk ids, looked up by the similarity of the raw
+    student query to earlier queries of the same course. A paraphrase of an earlier question
+    reuses its chunks, or at least its rewritten query and hypothetical answer, so both rewrite
+    calls are skipped. The query embeddings of a course are compared exhaustively as one NumPy
+    product, which is exact and fast for the bounded number of entries per context. The contexts
+    are kept in least recently used order and dropped when the total number of entries is exceeded.
+    """
+
+    def __init__(self):
+        config = settings.retrieval.semantic_cache
+        self.enabled = config.enabled
+        self.similarity_threshold = config.similarity_threshold
+        self.ttl = config.ttl
+        self.max_entries_per_context = config.max_entries_per_context
+        self.max_entries = config.max_entries
+        self.history_messages = settings.retrieval.cache.history_messages
+        self.llm_embedding = BasicRequestHandler("embedding-small")
+        self.lock = threading.Lock()
+        self.buckets: OrderedDict[tuple, SemanticCacheBucket] = OrderedDict()
+        self.entry_count = 0
+        self.generations: dict[Optional[int], int] = {}
+        self.chunk_hits = 0
+        self.query_hits = 0
+        self.misses = 0
+
+    def create_bucket_key(
+        self,
+        kind: str,
+        course_id: Optional[int],
+        base_url: Optional[str],
+        chat_history: Optional[list[PyrisMessage]],
+        **parameters,
+    ) -> tuple:
+        """
+        Key of the queries that are compared with each other. Only queries of the same course,
+        with the same recent chat history and the same further parameters are similar.
+        """
+        return (
+            kind,
+            course_id,
+            base_url,
+            history_fingerprint(chat_history, self.history_messages),
+            tuple(sorted((name, str(value)) for name, value in parameters.items())),
+        )
+
+    def _lookup(
+        self, bucket_key: tuple, query_vector: np.ndarray
+    ) -> Optional[SemanticCacheEntry]:
+        with self.lock:
+            bucket = self.buckets.get(bucket_key)
+            if bucket is None:
+                return None
+            self.entry_count -= bucket.prune(time.monotonic())
+            if not bucket.entries:
+                del self.buckets[bucket_key]
+                return None
+            self.buckets.move_to_end(bucket_key)
+            entry, similarity = bucket.nearest(query_vector)
+        if entry is not None and similarity >= self.similarity_threshold:
+            logger.info(f"Semantic query cache hit with similarity {similarity:.3f}")
+            return entry
+        return None
+
+    def _add(
+        self,
+        bucket_key: tuple,
+        generation: int,
+        query_vector: np.ndarray,
+        queries: tuple[str, ...],
+        chunk_ids: List[UUID],
+    ):
+        with self.lock:
+            if self.generations.get(bucket_key[1], 0) != generation:
+                return
+            bucket = self.buckets.setdefault(bucket_key, SemanticCacheBucket())
+            self.buckets.move_to_end(bucket_key)
+            self.entry_count += 1 - bucket.add(
+                SemanticCacheEntry(
+                    query_vector, queries, chunk_ids, time.monotonic() + self.ttl
+                ),
+                self.max_entries_per_context,
+            )
+            if self.entry_count > self.max_entries:
+                self._evict()
+
+    def _evict(self):
+        """Drop expired entries, then the least recently used contexts above max_entries"""
+        now = time.monotonic()
+        for bucket_key in list(self.buckets):
+            bucket = self.buckets[bucket_key]
+            self.entry_count -= bucket.prune(now)
+            if not bucket.entries:
+                del self.buckets[bucket_key]
+        while self.entry_count > self.max_entries and len(self.buckets) > 1:
+            _, bucket = self.buckets.popitem(last=False)
+            self.entry_count -= len(bucket.entries)
+
+    async def aretrieve(
+        self,
+        bucket_key: tuple,
+        student_query: str,
+        rewrite: Callable[[], Awaitable[tuple[str, ...]]],
+        search: Callable[[tuple[str, ...]], Awaitable[list]],
+        fetch: Callable[[List[UUID]], Awaitable[list]],
+    ) -> list:
+        """
+        Retrieve the objects for the student query, reusing the results of a similar earlier query.
+            :param rewrite: Creates the queries, e.g. the rewritten query and the hypothetical answer
+            :param search: Searches the objects for the queries
+            :param fetch: Fetches objects by their ids, in the given order
+            :return: The retrieved objects
+        """
+        if not self.enabled:
+            return await search(await rewrite())
+
+        with self.lock:
+            generation = self.generations.get(bucket_key[1], 0)
+        query_vector = np.asarray(
+            await self.llm_embedding.aembed(student_query), dtype=np.float32
+        )
+        norm = np.linalg.norm(query_vector)
+        if norm > 0:
+            query_vector /= norm
+
+        entry = self._lookup(bucket_key, query_vector)
+        if entry is not None:
+            objects = await fetch(entry.chunk_ids)
+            if len(objects) == len(entry.chunk_ids):
+                with self.lock:
+                    self.chunk_hits += 1
+                return objects
+            # Some chunks are gone, search again but keep the rewrites
+            with self.lock:
+                self.query_hits += 1
+            queries = entry.queries
+        else:
+            with self.lock:
+                self.misses += 1
+            queries = await rewrite()
+
+        objects = await search(queries)
+        self._add(
+            bucket_key,
+            generation,
+            query_vector,
+            queries,
+            [obj.uuid for obj in objects],
+        )
+        return objects
+
+    def invalidate_course(self, course_id: int):
+        """Drop all cached queries of the course, called when its lectures or FAQs change"""
+        with self.lock:
+            self.generations[course_id] = self.generations.get(course_id, 0) + 1
+            for bucket_key in [key for key in self.buckets if key[1] == course_id]:
+                self.entry_count -= len(self.buckets.pop(bucket_key).entries)
+
+    def get_stats(self) -> dict[str, int]:
+        """Get the hit and miss counters and the number of cached queries"""
+        with self.lock:
+            return {
+                "chunk_hits": self.chunk_hits,
+                "query_hits": self.query_hits,
+                "misses": self.misses,
+                "entries": self.entry_count,
+                "contexts": len(self.buckets),
+            }
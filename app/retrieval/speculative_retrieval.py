@@ -0,0 +1,98 @@
+import logging
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, List, Optional
+
+from app.common import Singleton
+from app.common.token_usage_dto import TokenUsageDTO
+from app.config import settings
+from app.pipeline.pipeline_pool import ChatRunContext
+
+logger = logging.getLogger(__name__)
+
+
+class SpeculativeRetrievalExecutor(metaclass=Singleton):
+    """Threads running the retrievals that are started before the agent asks for them"""
+
+    def __init__(self):
+        self.executor = ThreadPoolExecutor(
+            max_workers=settings.retrieval.speculative.workers,
+            thread_name_prefix="speculative-retrieval",
+        )
+
+    def submit(self, retrieve: Callable[[], List[dict]]) -> Future:
+        return self.executor.submit(retrieve)
+
+
+class SpeculativeRetrieval:
+    """
+    A retrieval of a chat agent tool that can be started when the request arrives, in parallel to
+    the prompt assembly and the first agent step. The tool then takes the result of the started
+    retrieval instead of running it after the agent decided to use the tool. If the retrieval was
+    not started, or it failed, the tool runs it directly.
+    get_tokens returns the LLM tokens the retrieval used, they are billed whether its result was
+    used or not.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        retrieve: Callable[[], List[dict]],
+        get_tokens: Callable[[], List[TokenUsageDTO]],
+    ):
+        self.name = name
+        self.retrieve = retrieve
+        self.get_tokens = get_tokens
+        self.future: Optional[Future] = None
+        self.discarded = False
+
+    def start(self):
+        """Start the retrieval in the background"""
+        if self.future is None:
+            self.future = SpeculativeRetrievalExecutor().submit(self.retrieve)
+
+    def result(self) -> List[dict]:
+        """Get the result of the started retrieval, or run the retrieval if it was not started"""
+        if self.future is not None and not self.future.cancelled():
+            try:
+                return self.future.result()
+            except Exception as e:
+                logger.warning(
+                    f"Speculative {self.name} retrieval failed, retrying", exc_info=e
+                )
+        return self.retrieve()
+
+    def discard(self, run_context: ChatRunContext):
+        """
+        Called at the end of the run, after its final status update. A retrieval that did not
+        start yet is cancelled. A running one is not awaited, the pipeline pool keeps the pipeline
+        until it is done, as it uses the retrievers of the pipeline that the next run must not
+        share. The tokens of the retrieval are reported as soon as it is done.
+        """
+        if self.discarded:
+            return
+        self.discarded = True
+        future = self.future
+        self.future = None
+        if future is not None and not future.cancel() and not future.done():
+            run_context.pending.append(future)
+            future.add_done_callback(
+                lambda _: self._on_discarded_done(future, run_context)
+            )
+            return
+        self._report_tokens(run_context)
+
+    def _on_discarded_done(self, future: Future, run_context: ChatRunContext):
+        if future.exception() is not None:
+            logger.debug(
+                f"Unused speculative {self.name} retrieval failed",
+                exc_info=future.exception(),
+            )
+        self._report_tokens(run_context)
+
+    def _report_tokens(self, run_context: ChatRunContext):
+        try:
+            tokens = self.get_tokens()
+            if tokens:
+                run_context.callback.report_tokens(tokens)
+        except Exception as e:
+            logger.error(f"Error reporting the {self.name} retrieval tokens: {e}")
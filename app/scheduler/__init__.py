@@ -0,0 +1 @@
+from ..scheduler.job_scheduler import JobScheduler, JobFeature, JobPriority
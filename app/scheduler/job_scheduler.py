@@ -0,0 +1,240 @@
+import logging
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from enum import Enum, IntEnum
+from typing import Callable
+
+from sentry_sdk import capture_exception
+
+from ..common import Singleton
+from ..common.custom_exceptions import JobQueueFullException
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class JobFeature(str, Enum):
+    """The features that get their own worker pool in the job scheduler"""
+
+    EXERCISE_CHAT = "exercise_chat"
+    COURSE_CHAT = "course_chat"
+    TEXT_EXERCISE_CHAT = "text_exercise_chat"
+    LECTURE_CHAT = "lecture_chat"
+    COMPETENCY_EXTRACTION = "competency_extraction"
+    REWRITING = "rewriting"
+    INCONSISTENCY_CHECK = "inconsistency_check"
+    LECTURE_INGESTION = "lecture_ingestion"
+    LECTURE_DELETION = "lecture_deletion"
+    FAQ_INGESTION = "faq_ingestion"
+    FAQ_DELETION = "faq_deletion"
+
+
+class JobPriority(IntEnum):
+    """Priority classes of jobs, lower values are scheduled first"""
+
+    INTERACTIVE = 0
+    GENERATION = 1
+    BACKGROUND = 2
+
+
+feature_priorities = {
+    JobFeature.EXERCISE_CHAT: JobPriority.INTERACTIVE,
+    JobFeature.COURSE_CHAT: JobPriority.INTERACTIVE,
+    JobFeature.TEXT_EXERCISE_CHAT: JobPriority.INTERACTIVE,
+    JobFeature.LECTURE_CHAT: JobPriority.INTERACTIVE,
+    JobFeature.COMPETENCY_EXTRACTION: JobPriority.GENERATION,
+    JobFeature.REWRITING: JobPriority.GENERATION,
+    JobFeature.INCONSISTENCY_CHECK: JobPriority.GENERATION,
+    JobFeature.LECTURE_INGESTION: JobPriority.BACKGROUND,
+    JobFeature.LECTURE_DELETION: JobPriority.BACKGROUND,
+    JobFeature.FAQ_INGESTION: JobPriority.BACKGROUND,
+    JobFeature.FAQ_DELETION: JobPriority.BACKGROUND,
+}
+
+
+class PriorityGate:
+    """
+    Limits the number of jobs running across all worker pools.
+    A job may only start if no job of a higher priority is waiting, and lower priorities
+    cannot use the slots reserved for the priorities above them.
+    """
+
+    def __init__(self, max_concurrent_jobs: int, reserved: dict[JobPriority, int]):
+        self._condition = threading.Condition()
+        self._running = {priority: 0 for priority in JobPriority}
+        self._waiting = {priority: 0 for priority in JobPriority}
+        self.limits = {
+            priority: max(
+                1,
+                max_concurrent_jobs
+                - sum(
+                    reserved.get(higher, 0)
+                    for higher in JobPriority
+                    if higher < priority
+                ),
+            )
+            for priority in JobPriority
+        }
+
+    def _can_start(self, priority: JobPriority) -> bool:
+        if any(self._waiting[higher] for higher in JobPriority if higher < priority):
+            return False
+        return sum(self._running.values()) < self.limits[priority]
+
+    def acquire(self, priority: JobPriority):
+        """Block until a job of the given priority may start"""
+        with self._condition:
+            self._waiting[priority] += 1
+            try:
+                self._condition.wait_for(lambda: self._can_start(priority))
+            finally:
+                self._waiting[priority] -= 1
+            self._running[priority] += 1
+            # Lower priorities might have been blocked only by this waiting job
+            self._condition.notify_all()
+
+    def release(self, priority: JobPriority):
+        with self._condition:
+            self._running[priority] -= 1
+            self._condition.notify_all()
+
+    def stats(self) -> dict:
+        with self._condition:
+            return {
+                priority.name.lower(): {
+                    "running": self._running[priority],
+                    "waiting": self._waiting[priority],
+                    "limit": self.limits[priority],
+                }
+                for priority in JobPriority
+            }
+
+
+class WorkerPool:
+    """
+    A fixed number of worker threads with a bounded number of waiting jobs.
+    Jobs that do not fit into the queue are rejected instead of piling up.
+    """
+
+    feature: JobFeature
+    priority: JobPriority
+    max_workers: int
+    queue_size: int
+
+    def __init__(
+        self,
+        feature: JobFeature,
+        max_workers: int,
+        queue_size: int,
+        gate: PriorityGate,
+    ):
+        self.feature = feature
+        self.priority = feature_priorities[feature]
+        self.gate = gate
+        self.max_workers = max_workers
+        self.queue_size = queue_size
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix=f"{feature.value}-worker"
+        )
+        # One slot per running or waiting job
+        self._slots = threading.BoundedSemaphore(max_workers + queue_size)
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._running = 0
+
+    def try_submit(self, fn: Callable, *args) -> bool:
+        """Submit a job to the pool. Returns False if the pool is saturated."""
+        if not self._slots.acquire(blocking=False):
+            return False
+        with self._lock:
+            self._queued += 1
+        self._executor.submit(self._run, fn, *args)
+        return True
+
+    def _run(self, fn: Callable, *args):
+        self.gate.acquire(self.priority)
+        with self._lock:
+            self._queued -= 1
+            self._running += 1
+        try:
+            fn(*args)
+        except Exception as e:
+            logger.error(f"Unhandled error in {self.feature.value} job: {e}")
+            logger.error(traceback.format_exc())
+            capture_exception(e)
+        finally:
+            with self._lock:
+                self._running -= 1
+            self.gate.release(self.priority)
+            self._slots.release()
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queued
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "priority": self.priority.name.lower(),
+                "running": self._running,
+                "queued": self._queued,
+                "max_workers": self.max_workers,
+                "queue_size": self.queue_size,
+            }
+
+
+class JobScheduler(metaclass=Singleton):
+    """
+    Central scheduler for all background jobs started by the pipeline and webhook endpoints.
+    Every feature has its own worker pool, so one busy feature cannot exhaust the threads of another.
+    All pools share a priority gate, so interactive chat jobs are never starved by background jobs.
+    """
+
+    gate: PriorityGate
+    pools: dict[JobFeature, WorkerPool]
+
+    def __init__(self):
+        config = settings.scheduler
+        self.gate = PriorityGate(
+            config.max_concurrent_jobs,
+            {
+                JobPriority[name.upper()]: count
+                for name, count in config.reserved_workers.items()
+            },
+        )
+        self.pools = {
+            feature: WorkerPool(
+                feature,
+                max_workers=config.workers.get(feature.value, config.default_workers),
+                queue_size=config.queue_size,
+                gate=self.gate,
+            )
+            for feature in JobFeature
+        }
+        self.retry_after = config.retry_after
+
+    def submit(self, feature: JobFeature, fn: Callable, *args):
+        """
+        Submit a job to the worker pool of the given feature.
+        Raises a JobQueueFullException if the pool has no free capacity left.
+        """
+        pool = self.pools[feature]
+        if not pool.try_submit(fn, *args):
+            logger.warning(
+                f"Rejecting {feature.value} job, queue is full ({pool.queue_depth} waiting)"
+            )
+            raise JobQueueFullException(retry_after=self.retry_after)
+
+    def get_queue_depth(self, feature: JobFeature) -> int:
+        """Get the number of jobs waiting for a worker of the given feature"""
+        return self.pools[feature].queue_depth
+
+    def get_stats(self) -> dict[str, dict]:
+        """Get the current utilisation of all worker pools and priority classes"""
+        return {
+            "priorities": self.gate.stats(),
+            "features": {
+                feature.value: pool.stats() for feature, pool in self.pools.items()
+            },
+        }
@@ -1,9 +1,12 @@
 import logging
 import weaviate
+from weaviate import WeaviateAsyncClient
 
 from .faq_schema import init_faq_schema
 from .lecture_schema import init_lecture_schema
 from weaviate.classes.query import Filter
+from weaviate.collections import Collection, CollectionAsync
+from app.common.background_loop import BackgroundEventLoop
 from app.config import settings
 import threading
 
@@ -12,11 +15,17 @@ logger = logging.getLogger(__name__)
 
 class VectorDatabase:
     """
-    Class to interact with the Weaviate vector database
+    Class to interact with the Weaviate vector database.
+    The client and the collection handles are shared by all instances. The schemas are
+    initialized and migrated only once, normally at application startup.
+    The async client used by the retrieval runs on the shared background event loop.
     """
 
     _lock = threading.Lock()
     _client_instance = None
+    _async_client_instance: WeaviateAsyncClient = None
+    _lectures: Collection = None
+    _faqs: Collection = None
 
     def __init__(self):
         with VectorDatabase._lock:
@@ -27,9 +36,45 @@ class VectorDatabase:
                     grpc_port=settings.weaviate.grpc_port,
                 )
                 logger.info("Weaviate client initialized")
+            if VectorDatabase._lectures is None or VectorDatabase._faqs is None:
+                VectorDatabase._lectures = init_lecture_schema(
+                    VectorDatabase._client_instance
+                )
+                VectorDatabase._faqs = init_faq_schema(VectorDatabase._client_instance)
+                logger.info("Weaviate schemas initialized")
         self.client = VectorDatabase._client_instance
-        self.lectures = init_lecture_schema(self.client)
-        self.faqs = init_faq_schema(self.client)
+        self.lectures = VectorDatabase._lectures
+        self.faqs = VectorDatabase._faqs
+
+    @staticmethod
+    async def _connect_async_client() -> WeaviateAsyncClient:
+        client = weaviate.use_async_with_local(
+            host=settings.weaviate.host,
+            port=settings.weaviate.port,
+            grpc_port=settings.weaviate.grpc_port,
+        )
+        await client.connect()
+        return client
+
+    def get_async_collection(self, collection_name: str) -> CollectionAsync:
+        """
+        Get the handle of a collection for the async client, which is connected on first use.
+        The handle must only be used on the background event loop.
+        """
+        with VectorDatabase._lock:
+            if not VectorDatabase._async_client_instance:
+                VectorDatabase._async_client_instance = BackgroundEventLoop().run(
+                    self._connect_async_client()
+                )
+                logger.info("Weaviate async client initialized")
+        return VectorDatabase._async_client_instance.collections.get(collection_name)
+
+    @staticmethod
+    def close_async_client():
+        with VectorDatabase._lock:
+            if VectorDatabase._async_client_instance:
+                BackgroundEventLoop().run(VectorDatabase._async_client_instance.close())
+                VectorDatabase._async_client_instance = None
 
     def delete_collection(self, collection_name):
         """
@@ -38,6 +83,10 @@ class VectorDatabase:
         if self.client.collections.exists(collection_name):
             if self.client.collections.delete(collection_name):
                 logger.info(f"Collection {collection_name} deleted")
+                # The schemas are initialized again by the next VectorDatabase instance
+                with VectorDatabase._lock:
+                    VectorDatabase._lectures = None
+                    VectorDatabase._faqs = None
             else:
                 logger.error(f"Collection {collection_name} failed to delete")
 
@@ -23,6 +23,7 @@ class LectureSchema(Enum):
     LECTURE_UNIT_LINK = "lecture_unit_link"
     PAGE_TEXT_CONTENT = "page_text_content"
     PAGE_NUMBER = "page_number"
+    PAGE_FINGERPRINT = "page_fingerprint"
     BASE_URL = "base_url"
 
 
@@ -62,6 +63,20 @@ def init_lecture_schema(client: WeaviateClient) -> Collection:
                 )
             )
 
+        # Check and add 'page_fingerprint' property if missing
+        if not any(
+            property.name == LectureSchema.PAGE_FINGERPRINT.value
+            for property in properties
+        ):
+            collection.config.add_property(
+                Property(
+                    name=LectureSchema.PAGE_FINGERPRINT.value,
+                    description="The hash of the content the slide chunk was created from",
+                    data_type=DataType.TEXT,
+                    index_searchable=False,
+                )
+            )
+
         return collection
 
     return client.collections.create(
@@ -135,6 +150,12 @@ def init_lecture_schema(client: WeaviateClient) -> Collection:
                 data_type=DataType.INT,
                 index_searchable=False,
             ),
+            Property(
+                name=LectureSchema.PAGE_FINGERPRINT.value,
+                description="The hash of the content the slide chunk was created from",
+                data_type=DataType.TEXT,
+                index_searchable=False,
+            ),
             Property(
                 name=LectureSchema.BASE_URL.value,
                 description="The base url of the website where the lecture slides are hosted",
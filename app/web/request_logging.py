@@ -0,0 +1,98 @@
+import logging
+import random
+import time
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.config import RequestLoggingSettings
+
+logger = logging.getLogger(__name__)
+
+
+class RequestLoggingMiddleware:
+    """
+    Pure ASGI middleware that logs request metadata (route, size, latency and status).
+    Request and response bodies are passed through unchanged and are never buffered.
+    For routes configured in payload_routes, the first max_payload_bytes of both bodies
+    are captured while they stream through and logged at DEBUG level.
+    """
+
+    def __init__(self, app: ASGIApp, config: RequestLoggingSettings):
+        self.app = app
+        self.config = config
+
+    def _should_log_payload(self, path: str) -> bool:
+        return any(path.startswith(route) for route in self.config.payload_routes)
+
+    def _append_preview(self, preview: bytearray, body: bytes):
+        remaining = self.config.max_payload_bytes - len(preview)
+        if remaining > 0 and body:
+            preview.extend(memoryview(body)[:remaining])
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        log_payload = self._should_log_payload(scope["path"])
+        request_size = 0
+        response_size = 0
+        status_code = 500
+        request_preview = bytearray()
+        response_preview = bytearray()
+
+        async def receive_wrapper() -> Message:
+            nonlocal request_size
+            message = await receive()
+            if message["type"] == "http.request":
+                body = message.get("body", b"")
+                request_size += len(body)
+                if log_payload:
+                    self._append_preview(request_preview, body)
+            return message
+
+        async def send_wrapper(message: Message):
+            nonlocal status_code, response_size
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            elif message["type"] == "http.response.body":
+                body = message.get("body", b"")
+                response_size += len(body)
+                if log_payload:
+                    self._append_preview(response_preview, body)
+            await send(message)
+
+        try:
+            await self.app(scope, receive_wrapper, send_wrapper)
+        finally:
+            # Errors are always logged, successful requests only for the sampled share
+            if status_code >= 500 or random.random() < self.config.sample_rate:
+                route = scope.get("route")
+                logger.info(
+                    "%s %s %d request_bytes=%d response_bytes=%d duration_ms=%.1f",
+                    scope["method"],
+                    getattr(route, "path", scope["path"]),
+                    status_code,
+                    request_size,
+                    response_size,
+                    (time.perf_counter() - start) * 1000,
+                )
+                if log_payload:
+                    logger.debug(
+                        "%s request payload: %s",
+                        scope["path"],
+                        _format(request_preview, request_size),
+                    )
+                    logger.debug(
+                        "%s response payload: %s",
+                        scope["path"],
+                        _format(response_preview, response_size),
+                    )
+
+
+def _format(preview: bytearray, size: int) -> str:
+    text = preview.decode("utf-8", errors="replace")
+    if size > len(preview):
+        text += f"... ({size - len(preview)} more bytes)"
+    return text
@@ -1,6 +1,12 @@
 from fastapi import APIRouter, status, Response, Depends
 
 from app.dependencies import TokenValidator
+from app.llm.embedding_cache import EmbeddingCache
+from app.llm.llm_manager import LlmManager
+from app.retrieval.fast_path import RetrievalMetrics
+from app.retrieval.retrieval_cache import RetrievalCache
+from app.retrieval.semantic_query_cache import SemanticQueryCache
+from app.scheduler import JobScheduler
 
 router = APIRouter(prefix="/api/v1/health", tags=["health"])
 
@@ -13,3 +19,61 @@ def health_check():
     return Response(
         status_code=status.HTTP_200_OK, content=b"[]", media_type="application/json"
     )
+
+
+@router.get(
+    "/scheduler",
+    dependencies=[Depends(TokenValidator())],
+)
+def scheduler_status():
+    """
+    Get the number of running and queued jobs per feature.
+    """
+    return JobScheduler().get_stats()
+
+
+@router.get(
+    "/llm-pools",
+    dependencies=[Depends(TokenValidator())],
+)
+def llm_pool_status():
+    """
+    Get the connection pool utilisation of the llm clients.
+    """
+    return LlmManager().get_pool_stats()
+
+
+@router.get(
+    "/embedding-cache",
+    dependencies=[Depends(TokenValidator())],
+)
+def embedding_cache_status():
+    """
+    Get the hit and miss counters of the embedding cache.
+    """
+    return EmbeddingCache().get_stats()
+
+
+@router.get(
+    "/retrieval-cache",
+    dependencies=[Depends(TokenValidator())],
+)
+def retrieval_cache_status():
+    """
+    Get the hit and miss counters of the retrieval cache and the semantic query cache.
+    """
+    return {
+        "exact": RetrievalCache().get_stats(),
+        "semantic": SemanticQueryCache().get_stats(),
+    }
+
+
+@router.get(
+    "/retrieval-latency",
+    dependencies=[Depends(TokenValidator())],
+)
+def retrieval_latency_status():
+    """
+    Get the latency of the lecture and FAQ retrieval per path, the fast path or the rewrite path.
+    """
+    return RetrievalMetrics().get_stats()
@@ -1,6 +1,5 @@
 import logging
 import traceback
-from threading import Thread
 
 from sentry_sdk import capture_exception
 
@@ -29,6 +28,7 @@ from app.web.status.status_update import (
     RewritingCallback,
 )
 from app.pipeline.chat.course_chat_pipeline import CourseChatPipeline
+from app.pipeline.pipeline_pool import PipelinePool
 from app.dependencies import TokenValidator
 from app.domain import FeatureDTO
 from app.pipeline.competency_extraction_pipeline import CompetencyExtractionPipeline
@@ -39,6 +39,7 @@ from app.domain.text_exercise_chat_pipeline_execution_dto import (
 from app.pipeline.text_exercise_chat_pipeline import TextExerciseChatPipeline
 from app.web.status.status_update import TextExerciseChatCallback
 from app.pipeline.chat_gpt_wrapper_pipeline import ChatGPTWrapperPipeline
+from app.scheduler import JobScheduler, JobFeature
 
 router = APIRouter(prefix="/api/v1/pipelines", tags=["pipelines"])
 logger = logging.getLogger(__name__)
@@ -53,9 +54,6 @@ def run_exercise_chat_pipeline_worker(
             base_url=dto.settings.artemis_base_url,
             initial_stages=dto.initial_stages,
         )
-        pipeline = ExerciseChatAgentPipeline(
-            callback=callback, variant=variant, event=event
-        )
     except Exception as e:
         logger.error(f"Error preparing exercise chat pipeline: {e}")
         logger.error(traceback.format_exc())
@@ -63,7 +61,10 @@ def run_exercise_chat_pipeline_worker(
         return
 
     try:
-        pipeline(dto=dto)
+        with PipelinePool().checkout(
+            ExerciseChatAgentPipeline, variant, callback, event
+        ) as pipeline:
+            pipeline(dto=dto)
     except Exception as e:
         logger.error(f"Error running exercise chat pipeline: {e}")
         logger.error(traceback.format_exc())
@@ -108,12 +109,17 @@ def run_exercise_chat_pipeline(
     ),
 ):
     if variant == "chat-gpt-wrapper":
-        thread = Thread(target=run_chatgpt_wrapper_pipeline_worker, args=(dto, variant))
+        JobScheduler().submit(
+            JobFeature.EXERCISE_CHAT, run_chatgpt_wrapper_pipeline_worker, dto, variant
+        )
     else:
-        thread = Thread(
-            target=run_exercise_chat_pipeline_worker, args=(dto, variant, event)
+        JobScheduler().submit(
+            JobFeature.EXERCISE_CHAT,
+            run_exercise_chat_pipeline_worker,
+            dto,
+            variant,
+            event,
         )
-    thread.start()
 
 
 def run_course_chat_pipeline_worker(dto, variant, event):
@@ -123,7 +129,6 @@ def run_course_chat_pipeline_worker(dto, variant, event):
             base_url=dto.settings.artemis_base_url,
             initial_stages=dto.initial_stages,
         )
-        pipeline = CourseChatPipeline(callback=callback, variant=variant, event=event)
     except Exception as e:
         logger.error(f"Error preparing exercise chat pipeline: {e}")
         logger.error(traceback.format_exc())
@@ -131,7 +136,10 @@ def run_course_chat_pipeline_worker(dto, variant, event):
         return
 
     try:
-        pipeline(dto=dto)
+        with PipelinePool().checkout(
+            CourseChatPipeline, variant, callback, event
+        ) as pipeline:
+            pipeline(dto=dto)
     except Exception as e:
         logger.error(f"Error running exercise chat pipeline: {e}")
         logger.error(traceback.format_exc())
@@ -150,8 +158,9 @@ def run_course_chat_pipeline(
         description="Course Chat Pipeline Execution DTO"
     ),
 ):
-    thread = Thread(target=run_course_chat_pipeline_worker, args=(dto, variant, event))
-    thread.start()
+    JobScheduler().submit(
+        JobFeature.COURSE_CHAT, run_course_chat_pipeline_worker, dto, variant, event
+    )
 
 
 def run_text_exercise_chat_pipeline_worker(dto, variant):
@@ -216,8 +225,12 @@ def run_lecture_chat_pipeline_worker(dto, variant):
 def run_text_exercise_chat_pipeline(
     variant: str, dto: TextExerciseChatPipelineExecutionDTO
 ):
-    thread = Thread(target=run_text_exercise_chat_pipeline_worker, args=(dto, variant))
-    thread.start()
+    JobScheduler().submit(
+        JobFeature.TEXT_EXERCISE_CHAT,
+        run_text_exercise_chat_pipeline_worker,
+        dto,
+        variant,
+    )
 
 
 @router.post(
@@ -226,8 +239,9 @@ def run_text_exercise_chat_pipeline(
     dependencies=[Depends(TokenValidator())],
 )
 def run_lecture_chat_pipeline(variant: str, dto: LectureChatPipelineExecutionDTO):
-    thread = Thread(target=run_lecture_chat_pipeline_worker, args=(dto, variant))
-    thread.start()
+    JobScheduler().submit(
+        JobFeature.LECTURE_CHAT, run_lecture_chat_pipeline_worker, dto, variant
+    )
 
 
 def run_competency_extraction_pipeline_worker(
@@ -262,10 +276,12 @@ def run_competency_extraction_pipeline_worker(
 def run_competency_extraction_pipeline(
     variant: str, dto: CompetencyExtractionPipelineExecutionDTO
 ):
-    thread = Thread(
-        target=run_competency_extraction_pipeline_worker, args=(dto, variant)
+    JobScheduler().submit(
+        JobFeature.COMPETENCY_EXTRACTION,
+        run_competency_extraction_pipeline_worker,
+        dto,
+        variant,
     )
-    thread.start()
 
 
 def run_rewriting_pipeline_worker(dto: RewritingPipelineExecutionDTO, variant: str):
@@ -302,8 +318,9 @@ def run_rewriting_pipeline_worker(dto: RewritingPipelineExecutionDTO, variant: s
 def run_rewriting_pipeline(variant: str, dto: RewritingPipelineExecutionDTO):
     variant = variant.lower()
     logger.info(f"Rewriting pipeline started with variant: {variant} and dto: {dto}")
-    thread = Thread(target=run_rewriting_pipeline_worker, args=(dto, variant))
-    thread.start()
+    JobScheduler().submit(
+        JobFeature.REWRITING, run_rewriting_pipeline_worker, dto, variant
+    )
 
 
 def run_inconsistency_check_pipeline_worker(
@@ -335,8 +352,12 @@ def run_inconsistency_check_pipeline_worker(
 def run_inconsistency_check_pipeline(
     variant: str, dto: InconsistencyCheckPipelineExecutionDTO
 ):
-    thread = Thread(target=run_inconsistency_check_pipeline_worker, args=(dto, variant))
-    thread.start()
+    JobScheduler().submit(
+        JobFeature.INCONSISTENCY_CHECK,
+        run_inconsistency_check_pipeline_worker,
+        dto,
+        variant,
+    )
 
 
 @router.get("/{feature}/variants")
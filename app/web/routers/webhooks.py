@@ -1,10 +1,14 @@
 import traceback
 from asyncio.log import logger
-from threading import Thread, Semaphore
 
+from pydantic import ValidationError
 from sentry_sdk import capture_exception
 
-from fastapi import APIRouter, status, Depends
+from fastapi import APIRouter, status, Depends, Request
+from fastapi.exceptions import RequestValidationError
+from starlette.concurrency import run_in_threadpool
+
+from app.common.custom_exceptions import JobQueueFullException
 from app.dependencies import TokenValidator
 from app.domain.ingestion.ingestion_pipeline_execution_dto import (
     IngestionPipelineExecutionDto,
@@ -17,40 +21,54 @@ from ...domain.ingestion.deletionPipelineExecutionDto import (
     LecturesDeletionExecutionDto,
     FaqDeletionExecutionDto,
 )
+from ...ingestion.pdf_upload import StreamingPdfUpload
 from ...pipeline.faq_ingestion_pipeline import FaqIngestionPipeline
-from ...pipeline.lecture_ingestion_pipeline import LectureIngestionPipeline
+from ...pipeline.lecture_ingestion_pipeline import (
+    LectureIngestionPipeline,
+    cleanup_temporary_file,
+)
+from ...retrieval.course_metadata_cache import CourseMetadataCache
+from ...retrieval.retrieval_cache import RetrievalCache
+from ...retrieval.semantic_query_cache import SemanticQueryCache
+from ...scheduler import JobScheduler, JobFeature
 from ...vector_database.database import VectorDatabase
 
 router = APIRouter(prefix="/api/v1/webhooks", tags=["webhooks"])
 
-semaphore = Semaphore(5)
+
+def invalidate_retrieval_caches(course_id: int):
+    """
+    Drop the cached retrievals and metadata of a course after its lectures or FAQs changed
+    """
+    RetrievalCache().invalidate_course(course_id)
+    SemanticQueryCache().invalidate_course(course_id)
+    CourseMetadataCache().invalidate(course_id)
 
 
 def run_lecture_update_pipeline_worker(dto: IngestionPipelineExecutionDto):
     """
     Run the exercise chat pipeline in a separate thread
     """
-    with semaphore:
-        try:
-            callback = IngestionStatusCallback(
-                run_id=dto.settings.authentication_token,
-                base_url=dto.settings.artemis_base_url,
-                initial_stages=dto.initial_stages,
-                lecture_unit_id=dto.lecture_unit.lecture_unit_id,
-            )
-            db = VectorDatabase()
-            client = db.get_client()
-            pipeline = LectureIngestionPipeline(
-                client=client, dto=dto, callback=callback
-            )
-            pipeline()
-
-        except Exception as e:
-            logger.error(f"Error Ingestion pipeline: {e}")
-            logger.error(traceback.format_exc())
-            capture_exception(e)
-        finally:
-            semaphore.release()
+    try:
+        callback = IngestionStatusCallback(
+            run_id=dto.settings.authentication_token,
+            base_url=dto.settings.artemis_base_url,
+            initial_stages=dto.initial_stages,
+            lecture_unit_id=dto.lecture_unit.lecture_unit_id,
+        )
+        db = VectorDatabase()
+        client = db.get_client()
+        pipeline = LectureIngestionPipeline(client=client, dto=dto, callback=callback)
+        pipeline()
+
+    except Exception as e:
+        logger.error(f"Error Ingestion pipeline: {e}")
+        logger.error(traceback.format_exc())
+        capture_exception(e)
+    finally:
+        invalidate_retrieval_caches(dto.lecture_unit.course_id)
+        if dto.lecture_unit.pdf_file_path:
+            cleanup_temporary_file(dto.lecture_unit.pdf_file_path)
 
 
 def run_lecture_deletion_pipeline_worker(dto: LecturesDeletionExecutionDto):
@@ -70,57 +88,58 @@ def run_lecture_deletion_pipeline_worker(dto: LecturesDeletionExecutionDto):
     except Exception as e:
         logger.error(f"Error while deleting lectures: {e}")
         logger.error(traceback.format_exc())
+    finally:
+        for course_id in {unit.course_id for unit in dto.lecture_units}:
+            invalidate_retrieval_caches(course_id)
 
 
 def run_faq_update_pipeline_worker(dto: FaqIngestionPipelineExecutionDto):
     """
     Run the exercise chat pipeline in a separate thread
     """
-    with semaphore:
-        try:
-            callback = FaqIngestionStatus(
-                run_id=dto.settings.authentication_token,
-                base_url=dto.settings.artemis_base_url,
-                initial_stages=dto.initial_stages,
-                faq_id=dto.faq.faq_id,
-            )
-            db = VectorDatabase()
-            client = db.get_client()
-            pipeline = FaqIngestionPipeline(client=client, dto=dto, callback=callback)
-            pipeline()
-
-        except Exception as e:
-            logger.error(f"Error Faq Ingestion pipeline: {e}")
-            logger.error(traceback.format_exc())
-            capture_exception(e)
-        finally:
-            semaphore.release()
+    try:
+        callback = FaqIngestionStatus(
+            run_id=dto.settings.authentication_token,
+            base_url=dto.settings.artemis_base_url,
+            initial_stages=dto.initial_stages,
+            faq_id=dto.faq.faq_id,
+        )
+        db = VectorDatabase()
+        client = db.get_client()
+        pipeline = FaqIngestionPipeline(client=client, dto=dto, callback=callback)
+        pipeline()
+
+    except Exception as e:
+        logger.error(f"Error Faq Ingestion pipeline: {e}")
+        logger.error(traceback.format_exc())
+        capture_exception(e)
+    finally:
+        invalidate_retrieval_caches(dto.faq.course_id)
 
 
 def run_faq_delete_pipeline_worker(dto: FaqDeletionExecutionDto):
     """
     Run the faq deletion in a separate thread
     """
-    with semaphore:
-        try:
-            callback = FaqIngestionStatus(
-                run_id=dto.settings.authentication_token,
-                base_url=dto.settings.artemis_base_url,
-                initial_stages=dto.initial_stages,
-                faq_id=dto.faq.faq_id,
-            )
-            db = VectorDatabase()
-            client = db.get_client()
-            # Hier würd dann die Methode zum entfernen aus der Datenbank kommen
-            pipeline = FaqIngestionPipeline(client=client, dto=None, callback=callback)
-            pipeline.delete_faq(dto.faq.faq_id, dto.faq.course_id)
-
-        except Exception as e:
-            logger.error(f"Error Ingestion pipeline: {e}")
-            logger.error(traceback.format_exc())
-            capture_exception(e)
-        finally:
-            semaphore.release()
+    try:
+        callback = FaqIngestionStatus(
+            run_id=dto.settings.authentication_token,
+            base_url=dto.settings.artemis_base_url,
+            initial_stages=dto.initial_stages,
+            faq_id=dto.faq.faq_id,
+        )
+        db = VectorDatabase()
+        client = db.get_client()
+        # Hier würd dann die Methode zum entfernen aus der Datenbank kommen
+        pipeline = FaqIngestionPipeline(client=client, dto=None, callback=callback)
+        pipeline.delete_faq(dto.faq.faq_id, dto.faq.course_id)
+
+    except Exception as e:
+        logger.error(f"Error Ingestion pipeline: {e}")
+        logger.error(traceback.format_exc())
+        capture_exception(e)
+    finally:
+        invalidate_retrieval_caches(dto.faq.course_id)
 
 
 @router.post(
@@ -128,12 +147,37 @@ def run_faq_delete_pipeline_worker(dto: FaqDeletionExecutionDto):
     status_code=status.HTTP_202_ACCEPTED,
     dependencies=[Depends(TokenValidator())],
 )
-def lecture_ingestion_webhook(dto: IngestionPipelineExecutionDto):
+async def lecture_ingestion_webhook(request: Request):
     """
-    Webhook endpoint to trigger the exercise chat pipeline
+    Webhook endpoint to trigger the lecture ingestion pipeline.
+    Expects an IngestionPipelineExecutionDto as JSON body. The body is streamed and the
+    base64 encoded PDF is decoded directly into a temporary file instead of into memory.
     """
-    thread = Thread(target=run_lecture_update_pipeline_worker, args=(dto,))
-    thread.start()
+    upload = StreamingPdfUpload()
+    try:
+        async for chunk in request.stream():
+            await run_in_threadpool(upload.feed, chunk)
+        dto = IngestionPipelineExecutionDto.model_validate_json(upload.finish())
+    except ValidationError as e:
+        upload.discard()
+        raise RequestValidationError(e.errors())
+    except ValueError as e:
+        # Truncated JSON or invalid base64 data are client errors like a failed validation
+        upload.discard()
+        raise RequestValidationError(
+            [{"type": "value_error", "loc": ("body",), "msg": str(e), "input": None}]
+        )
+    except Exception:
+        upload.discard()
+        raise
+    dto.lecture_unit.pdf_file_path = upload.pdf_file_path
+    try:
+        JobScheduler().submit(
+            JobFeature.LECTURE_INGESTION, run_lecture_update_pipeline_worker, dto
+        )
+    except JobQueueFullException:
+        upload.discard()
+        raise
 
 
 @router.post(
@@ -145,8 +189,9 @@ def lecture_deletion_webhook(dto: LecturesDeletionExecutionDto):
     """
     Webhook endpoint to trigger the lecture deletion
     """
-    thread = Thread(target=run_lecture_deletion_pipeline_worker, args=(dto,))
-    thread.start()
+    JobScheduler().submit(
+        JobFeature.LECTURE_DELETION, run_lecture_deletion_pipeline_worker, dto
+    )
 
 
 @router.post(
@@ -158,8 +203,7 @@ def faq_ingestion_webhook(dto: FaqIngestionPipelineExecutionDto):
     """
     Webhook endpoint to trigger the faq ingestion pipeline
     """
-    thread = Thread(target=run_faq_update_pipeline_worker, args=(dto,))
-    thread.start()
+    JobScheduler().submit(JobFeature.FAQ_INGESTION, run_faq_update_pipeline_worker, dto)
     return
 
 
@@ -172,6 +216,5 @@ def faq_deletion_webhook(dto: FaqDeletionExecutionDto):
     """
     Webhook endpoint to trigger the faq deletion pipeline
     """
-    thread = Thread(target=run_faq_delete_pipeline_worker, args=(dto,))
-    thread.start()
+    JobScheduler().submit(JobFeature.FAQ_DELETION, run_faq_delete_pipeline_worker, dto)
     return
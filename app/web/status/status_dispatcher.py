@@ -0,0 +1,174 @@
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from sentry_sdk import capture_exception
+from urllib3.util.retry import Retry
+
+from app.common import Singleton
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class _StatusUpdate:
+    def __init__(self, url: str, payload: dict, coalesce_key, due: float):
+        self.url = url
+        self.payload = payload
+        self.coalesce_key = coalesce_key
+        # Monotonic time at which the update is sent at the latest
+        self.due = due
+
+
+class _RunQueue:
+    def __init__(self):
+        self.updates: deque[_StatusUpdate] = deque()
+        self.timer: Optional[threading.Timer] = None
+        self.draining = False
+
+
+class StatusDispatcher(metaclass=Singleton):
+    """
+    Delivers status updates to Artemis in the background.
+    Pipelines only enqueue a snapshot of their status and continue immediately.
+    Updates of the same run are sent one after another in the order they were enqueued,
+    updates of different runs are sent concurrently on a shared thread pool.
+    Intermediate in-progress updates of a stage can be coalesced, so bursts only send the latest one.
+    Every Artemis base URL gets its own session, so connections are kept alive and reused.
+    """
+
+    def __init__(self):
+        self.config = settings.status_updates
+        self.executor = ThreadPoolExecutor(
+            max_workers=self.config.workers, thread_name_prefix="status-dispatcher"
+        )
+        self.lock = threading.Lock()
+        self.sessions: dict[str, requests.Session] = {}
+        # Pending updates per run_id, a run is only present while it has pending updates
+        self.queues: dict[str, _RunQueue] = {}
+
+    def enqueue(self, url: str, run_id: str, payload: dict, coalesce_key=None):
+        """
+        Schedule a status update for delivery without blocking the caller.
+        Updates with a coalesce_key are held back for the configured coalesce window,
+        and a following update with the same key replaces the held one.
+        Updates without a key are sent immediately together with everything held before them.
+        """
+        now = time.monotonic()
+        window = self.config.coalesce_window
+        with self.lock:
+            run = self.queues.get(run_id)
+            if run is None:
+                run = _RunQueue()
+                self.queues[run_id] = run
+            if coalesce_key is not None and window > 0:
+                last = run.updates[-1] if run.updates else None
+                if last is not None and last.coalesce_key == coalesce_key:
+                    last.url = url
+                    last.payload = payload
+                    return
+                run.updates.append(
+                    _StatusUpdate(url, payload, coalesce_key, now + window)
+                )
+            else:
+                for update in run.updates:
+                    update.due = now
+                run.updates.append(_StatusUpdate(url, payload, None, now))
+            self._schedule(run_id, run)
+
+    def _schedule(self, run_id: str, run: _RunQueue):
+        """Start draining a run now or once its first update is due, must hold the lock"""
+        if run.draining:
+            return
+        delay = run.updates[0].due - time.monotonic()
+        if delay <= 0:
+            if run.timer is not None:
+                run.timer.cancel()
+                run.timer = None
+            run.draining = True
+            self.executor.submit(self._drain, run_id)
+        elif run.timer is None:
+            run.timer = threading.Timer(delay, self._on_timer, args=(run_id,))
+            run.timer.daemon = True
+            run.timer.start()
+
+    def _on_timer(self, run_id: str):
+        with self.lock:
+            run = self.queues.get(run_id)
+            if run is None:
+                return
+            run.timer = None
+            self._schedule(run_id, run)
+
+    def _drain(self, run_id: str):
+        """Send the due updates of a run in order, until its queue is empty or it has to wait"""
+        while True:
+            with self.lock:
+                run = self.queues[run_id]
+                if not run.updates:
+                    del self.queues[run_id]
+                    return
+                if run.updates[0].due > time.monotonic():
+                    run.draining = False
+                    self._schedule(run_id, run)
+                    return
+                update = run.updates.popleft()
+            self._send(update.url, run_id, update.payload)
+
+    def _send(self, url: str, run_id: str, payload: dict):
+        try:
+            self._get_session(url).post(
+                url,
+                headers={
+                    "Content-Type": "application/json",
+                    "Authorization": f"Bearer {run_id}",
+                },
+                json=payload,
+                timeout=self.config.timeout,
+            ).raise_for_status()
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Error sending status update: {e}")
+            capture_exception(e)
+        except Exception as e:
+            # Any error escaping here would stop draining the run for good
+            logger.error(f"Unexpected error sending status update: {e}", exc_info=e)
+            capture_exception(e)
+
+    def _get_session(self, url: str) -> requests.Session:
+        parts = urlsplit(url)
+        base_url = f"{parts.scheme}://{parts.netloc}"
+        with self.lock:
+            session = self.sessions.get(base_url)
+            if session is None:
+                session = self._create_session()
+                self.sessions[base_url] = session
+            return session
+
+    def _create_session(self) -> requests.Session:
+        retry = Retry(
+            total=self.config.max_retries,
+            backoff_factor=self.config.backoff_factor,
+            status_forcelist=[429, 500, 502, 503, 504],
+            allowed_methods=None,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=self.config.pool_size,
+            max_retries=retry,
+        )
+        session = requests.Session()
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def pending(self) -> int:
+        """Get the number of status updates waiting to be sent"""
+        with self.lock:
+            return sum(len(run.updates) for run in self.queues.values())
@@ -3,7 +3,6 @@ from typing import Optional, List
 
 from sentry_sdk import capture_exception, capture_message
 
-import requests
 from abc import ABC
 
 from app.common.token_usage_dto import TokenUsageDTO
@@ -29,6 +28,7 @@ from app.domain.chat.exercise_chat.exercise_chat_status_update_dto import (
     ExerciseChatStatusUpdateDTO,
 )
 from app.domain.status.status_update_dto import StatusUpdateDTO
+from app.web.status.status_dispatcher import StatusDispatcher
 import logging
 
 logger = logging.getLogger(__name__)
@@ -59,21 +59,17 @@ class StatusCallback(ABC):
         self.stage = stage
         self.current_stage_index = current_stage_index
 
-    def on_status_update(self):
-        """Send a status update to the Artemis API."""
-        try:
-            print(self.status.dict(by_alias=True))
-            requests.post(
-                self.url,
-                headers={
-                    "Content-Type": "application/json",
-                    "Authorization": f"Bearer {self.run_id}",
-                },
-                json=self.status.model_dump(by_alias=True),
-            ).raise_for_status()
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Error sending status update: {e}")
-            capture_exception(e)
+    def on_status_update(self, coalesce: bool = False):
+        """
+        Send a status update to the Artemis API in the background.
+        If coalesce is set, the update may be replaced by a later in-progress update of the same stage.
+        """
+        StatusDispatcher().enqueue(
+            self.url,
+            self.run_id,
+            self.status.model_dump(by_alias=True),
+            coalesce_key=self.current_stage_index if coalesce else None,
+        )
 
     def get_next_stage(self):
         """Return the next stage in the status, or None if there are no more stages."""
@@ -92,10 +88,10 @@ class StatusCallback(ABC):
         if self.stage.state == StageStateEnum.NOT_STARTED:
             self.stage.state = StageStateEnum.IN_PROGRESS
             self.stage.message = message
-            self.on_status_update()
+            self.on_status_update(coalesce=True)
         elif self.stage.state == StageStateEnum.IN_PROGRESS:
             self.stage.message = message
-            self.on_status_update()
+            self.on_status_update(coalesce=True)
         else:
             raise ValueError(
                 "Invalid state transition to in_progress. current state is ",
@@ -168,6 +164,17 @@ class StatusCallback(ABC):
                 f"Error occurred in job {self.run_id} in stage {self.stage.name}: {message}"
             )
 
+    def report_tokens(self, tokens: List[TokenUsageDTO]):
+        """
+        Send tokens that were used outside the stages, e.g. by background work of the run that
+        finished after its final status update. The update only carries these tokens.
+        """
+        self.status.result = None
+        if hasattr(self.status, "suggestions"):
+            self.status.suggestions = None
+        self.status.tokens = tokens
+        self.on_status_update()
+
     def skip(self, message: Optional[str] = None, start_next_stage: bool = True):
         """
         Transition the current stage to SKIPPED and update the status.